@@ -0,0 +1,180 @@
+# answer_cache.py
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from dotenv import load_dotenv
+
+from startup_profile import startup_step
+
+load_dotenv()
+
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "./answer_cache.sqlite")
+# Ελάχιστη ομοιότητα συνημιτόνου για να θεωρηθούν δύο ερωτήσεις ίδιες
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class AnswerCache:
+    """
+    Semantic cache απαντήσεων: μια ερώτηση ταιριάζει με αποθηκευμένη αν τα embeddings τους
+    έχουν ομοιότητα συνημιτόνου >= threshold (και ίδιο mode). Η αναζήτηση γίνεται πριν από
+    την ανάκτηση, που είναι και αυτό που γλιτώνει· ότι το context άλλαξε το μαθαίνει η cache
+    από το invalidate των scripts εισαγωγής. Λήξη με TTL, αποβολή LRU, αποθήκευση σε SQLite.
+    """
+
+    def __init__(self, path=ANSWER_CACHE_PATH, threshold=ANSWER_CACHE_THRESHOLD,
+                 ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(answers)")]
+        if "context_hash" in columns:
+            # Παλιότερη μορφή με context_hash: η cache είναι αναλώσιμη, ξεκινά από την αρχή
+            self._conn.execute("DROP TABLE answers")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, mode TEXT NOT NULL, query TEXT NOT NULL,"
+            " embedding BLOB NOT NULL, answer TEXT NOT NULL,"
+            " created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        # Η γενιά αλλάζει σε κάθε invalidate, ώστε να το αντιλαμβάνονται και άλλες διεργασίες
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+        # id -> entry, με τη λιγότερο πρόσφατα χρησιμοποιημένη πρώτη
+        self._entries = OrderedDict()
+        self._matrix = None
+        self._matrix_ids = []
+        with self._lock:
+            self._load()
+
+    def _generation(self):
+        return self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    def _load(self):
+        self._entries.clear()
+        self._matrix = None
+        self._loaded_generation = self._generation()
+        rows = self._conn.execute(
+            "SELECT id, mode, query, embedding, answer, created_at"
+            " FROM answers ORDER BY last_used"
+        ).fetchall()
+        for entry_id, mode, query, blob, answer, created_at in rows:
+            self._entries[entry_id] = {
+                "mode": mode, "query": query, "answer": answer,
+                "created_at": created_at, "vector": np.frombuffer(blob, dtype=np.float32),
+            }
+        self._expire()
+
+    def lookup(self, query_embedding, mode):
+        """Επιστρέφει την αποθηκευμένη απάντηση για μια αρκετά όμοια ερώτηση, αλλιώς None."""
+        with self._lock:
+            if self._generation() != self._loaded_generation:
+                self._load()
+            self._expire()
+            entry_id = self._best_match(_unit(query_embedding), mode)
+            if entry_id is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(entry_id)
+            self._conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (time.time(), entry_id))
+            self._conn.commit()
+            return self._entries[entry_id]["answer"]
+
+    def store(self, query, query_embedding, mode, answer):
+        now = time.time()
+        vector = _unit(query_embedding)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO answers (mode, query, embedding, answer, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (mode, query, vector.tobytes(), answer, now, now),
+            )
+            self._entries[cursor.lastrowid] = {
+                "mode": mode, "query": query, "answer": answer,
+                "created_at": now, "vector": vector,
+            }
+            while len(self._entries) > self.max_entries:
+                oldest_id, _ = self._entries.popitem(last=False)
+                self._conn.execute("DELETE FROM answers WHERE id = ?", (oldest_id,))
+            self._conn.commit()
+            self._matrix = None
+
+    def invalidate(self):
+        """Αδειάζει την cache (π.χ. μετά από νέα εισαγωγή δεδομένων στον γράφο ή στη Chroma)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+            self._conn.commit()
+            self._load()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _best_match(self, vector, mode):
+        if not self._entries:
+            return None
+        if self._matrix is None:
+            self._matrix_ids = list(self._entries)
+            self._matrix = np.vstack([self._entries[i]["vector"] for i in self._matrix_ids])
+        similarities = self._matrix @ vector
+        for index in np.argsort(-similarities):
+            if similarities[index] < self.threshold:
+                return None
+            entry = self._entries[self._matrix_ids[index]]
+            if entry["mode"] == mode:
+                return self._matrix_ids[index]
+        return None
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        expired = [i for i, entry in self._entries.items() if entry["created_at"] < cutoff]
+        if not expired:
+            return
+        for entry_id in expired:
+            del self._entries[entry_id]
+        self._conn.execute("DELETE FROM answers WHERE created_at < ?", (cutoff,))
+        self._conn.commit()
+        self._matrix = None
+
+
+_cache = None
+_init_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    global _cache
+    with _init_lock:
+        if _cache is None:
+            with startup_step("init answer cache"):
+                _cache = AnswerCache()
+        return _cache
+
+
+def invalidate_answer_cache():
+    """Hook για τα scripts εισαγωγής: οι αποθηκευμένες απαντήσεις δεν ισχύουν πια."""
+    get_answer_cache().invalidate()
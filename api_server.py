@@ -0,0 +1,345 @@
+# api_server.py
+#
+# Headless HTTP API over the retrieval modes and answer generation, for load testing
+# and for running several stateless replicas behind a load balancer.
+#
+#   python api_server.py --port 8000
+#
+#   POST /search  {"query": "...", "mode": "hybrid", "top_k": 5}
+#   POST /answer  {"query": "...", "mode": "hybrid", "top_k": 5}
+#   GET  /health
+#   GET  /metrics  (Prometheus, from tracing.py)
+#
+# Modes: graph, hybrid, simple, hybrid_simple, cascade.
+
+import asyncio
+import functools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from answer_cache import get_answer_cache
+from embedding_cache import embed_texts
+from hybrid_rag import enhanced_hybrid_search, cascade_search
+from llm_response import generate_response
+from query_neo4j import get_graph_data, hybrid_search
+from simple_rag import simple_rag_query, get_collection
+from tracing import start_trace, span, metrics
+
+load_dotenv()
+
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+# Requests processed at the same time; the rest wait in a bounded queue
+API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "8"))
+API_MAX_QUEUE = int(os.getenv("API_MAX_QUEUE", "64"))
+API_REQUEST_TIMEOUT = float(os.getenv("API_REQUEST_TIMEOUT", "60"))
+API_MAX_BODY_BYTES = 64 * 1024
+# Query embeddings arriving within this window are sent to OpenAI as one request
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "10"))
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "64"))
+
+# Same mode names as app2, so the answer cache is shared between the UI and the API
+MODES = {
+    "graph": "Graph RAG (Text-Only)",
+    "hybrid": "Hybrid Graph (Text+Vector)",
+    "simple": "Simple RAG (ChromaDB)",
+    "hybrid_simple": "Hybrid Simple + Graph",
+    "cascade": "Cascade (Full-text → Vector)",
+}
+
+_STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+                504: "Gateway Timeout"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class EmbeddingBatcher:
+    """
+    Συγκεντρώνει τα query embeddings των ταυτόχρονων αιτημάτων: όσα φτάνουν μέσα σε
+    window_ms (ή μέχρι max_batch) στέλνονται με μία κλήση embed_texts, που περνά και από
+    την embedding cache. Ένα αίτημα περιμένει το πολύ window_ms επιπλέον.
+    """
+
+    def __init__(self, executor, window_ms=EMBED_BATCH_WINDOW_MS, max_batch=EMBED_MAX_BATCH):
+        self.executor = executor
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        self.batches = 0
+        self.texts = 0
+
+    async def embed(self, text):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        self.batches += 1
+        self.texts += len(batch)
+        try:
+            vectors = await loop.run_in_executor(self.executor, embed_texts, [text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+
+def _retrieve(query, mode, top_k, query_embedding):
+    """Οι ίδιες κλήσεις ανάκτησης με το app2, ανά mode (τρέχει σε νήμα του executor)."""
+    if mode == "graph":
+        return get_graph_data(query)
+    if mode == "hybrid":
+        return hybrid_search(query, top_k=top_k, user_embedding=query_embedding)
+    if mode == "simple":
+        docs = simple_rag_query(query, get_collection(), top_k, query_embedding=query_embedding)
+        return [{"node_1": d, "relationship": "—", "node_2": ""} for d in docs]
+    if mode == "hybrid_simple":
+        return enhanced_hybrid_search(query, top_k=top_k, query_embedding=query_embedding)
+    if mode == "cascade":
+        return cascade_search(query, top_k=top_k, query_embedding=query_embedding)[0]
+    raise HTTPError(400, f"Unknown mode '{mode}'. Use one of: {', '.join(MODES)}")
+
+
+def _search(query, mode, top_k, query_embedding):
+    with start_trace("api.search", mode=mode) as trace:
+        results = _retrieve(query, mode, top_k, query_embedding)
+    return {"mode": mode, "results": results, "total_ms": trace.total_ms, "timings": trace.breakdown()}
+
+
+def _answer(query, mode, top_k, query_embedding):
+    with start_trace("api.answer", mode=mode) as trace:
+        answer_cache = get_answer_cache()
+        with span("answer_cache.lookup") as lookup_span:
+            answer = answer_cache.lookup(query_embedding, MODES[mode])
+            lookup_span["hit"] = cached = answer is not None
+        results = []
+        if answer is None:
+            results = _retrieve(query, mode, top_k, query_embedding)
+            answer = generate_response(query, results)
+            if results:
+                answer_cache.store(query, query_embedding, MODES[mode], answer)
+    return {"mode": mode, "answer": answer, "cached": cached, "results": results,
+            "total_ms": trace.total_ms, "timings": trace.breakdown()}
+
+
+class APIServer:
+    def __init__(self, max_concurrency=API_MAX_CONCURRENCY, max_queue=API_MAX_QUEUE,
+                 request_timeout=API_REQUEST_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.request_timeout = request_timeout
+        # Blocking retrieval / LLM calls; the Neo4j driver and its pool are shared by all threads
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="api")
+        self.embed_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="api-embed")
+        self.batcher = EmbeddingBatcher(self.embed_executor)
+        self._semaphore = None
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    async def _query(self, body, fn, needs_embedding):
+        """
+        Bounded concurrency with backpressure: at most max_concurrency requests run, at most
+        max_queue wait, and the rest get 503 at once instead of piling up. A request waits from
+        the moment it arrives until it holds a slot, its query embedding included (batched with
+        the other requests that arrived with it), so under overload the 503 comes before any
+        paid embedding call.
+        A request that times out answers 504 at once, but its slot stays taken until its
+        worker thread really finishes, so a slow backend cannot pile up more than
+        max_concurrency calls.
+        """
+        query = str(body.get("query") or "").strip()
+        mode = body.get("mode", "hybrid")
+        top_k = body.get("top_k", 5)
+        if not query:
+            raise HTTPError(400, "Field 'query' is required.")
+        if mode not in MODES:
+            raise HTTPError(400, f"Unknown mode '{mode}'. Use one of: {', '.join(MODES)}")
+        if not isinstance(top_k, int) or not 1 <= top_k <= 50:
+            raise HTTPError(400, "Field 'top_k' must be an integer between 1 and 50.")
+
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPError(503, "Server busy, retry later.", {"Retry-After": "1"})
+        self.waiting += 1
+        try:
+            query_embedding = await self.batcher.embed(query) if needs_embedding else None
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, query, mode, top_k, query_embedding)
+        work = loop.run_in_executor(self.executor, call)
+        work.add_done_callback(self._finished)
+        try:
+            # shield: on timeout wait_for cancels only the wrapper, the thread's future stays pending
+            return await asyncio.wait_for(asyncio.shield(work), timeout=self.request_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(504, f"Request exceeded {self.request_timeout:.0f}s.")
+
+    def _finished(self, work):
+        """Done-callback of a request's executor call: only now is its slot free again."""
+        self.active -= 1
+        self._semaphore.release()
+        if not work.cancelled():
+            work.exception()  # already raised to the caller, or dropped after a 504
+
+    async def search(self, body):
+        return await self._query(body, _search, needs_embedding=body.get("mode", "hybrid") != "graph")
+
+    async def answer(self, body):
+        # The answer cache is keyed by the query embedding, so every mode needs it here; for
+        # graph (and cascade without escalation) that embedding is the cost of the cache probe
+        return await self._query(body, _answer, needs_embedding=True)
+
+    def health(self):
+        return {"status": "ok", "active": self.active, "waiting": self.waiting, "rejected": self.rejected,
+                "max_concurrency": self.max_concurrency, "max_queue": self.max_queue,
+                "embedding_batches": self.batcher.batches, "embedded_queries": self.batcher.texts}
+
+    async def dispatch(self, method, path, body):
+        routes = {"/search": self.search, "/answer": self.answer}
+        if path in routes:
+            if method != "POST":
+                raise HTTPError(405, "Use POST.")
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                raise HTTPError(400, "Body must be JSON.")
+            if not isinstance(payload, dict):
+                raise HTTPError(400, "Body must be a JSON object.")
+            return 200, await routes[path](payload), "application/json"
+        if path == "/health":
+            return 200, self.health(), "application/json"
+        if path == "/metrics":
+            return 200, metrics.render(), "text/plain; version=0.0.4; charset=utf-8"
+        raise HTTPError(404, f"No route for {path}.")
+
+    async def handle_connection(self, reader, writer):
+        """HTTP/1.1 with keep-alive; one request at a time per connection."""
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                    if not request_line:
+                        break
+                    header_lines = []
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        header_lines.append(line)
+                except (ValueError, asyncio.LimitOverrunError):
+                    # A line past the StreamReader limit: the rest of the stream cannot be framed
+                    await self._write(writer, 400, {"error": "Request line or header too long."},
+                                      "application/json", False)
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._write(writer, 400, {"error": "Malformed request line."}, "application/json", False)
+                    break
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              and version.upper() == "HTTP/1.1")
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # Without a valid length the body cannot be framed, so the connection closes too
+                    await self._write(writer, 400, {"error": "Invalid Content-Length."}, "application/json", False)
+                    break
+                if length > API_MAX_BODY_BYTES:
+                    await self._write(writer, 413, {"error": "Body too large."}, "application/json", False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                start = time.perf_counter()
+                extra_headers = {}
+                try:
+                    status, payload, content_type = await self.dispatch(method, target.split("?")[0], body)
+                except HTTPError as e:
+                    status, payload, content_type = e.status, {"error": str(e)}, "application/json"
+                    extra_headers = e.headers
+                except Exception as e:
+                    print(f"❌ API error on {method} {target}: {e}")
+                    status, payload, content_type = 500, {"error": "Internal error."}, "application/json"
+                extra_headers["X-Response-Time-Ms"] = f"{(time.perf_counter() - start) * 1000:.1f}"
+                await self._write(writer, status, payload, content_type, keep_alive, extra_headers)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write(writer, status, payload, content_type, keep_alive, extra_headers=None):
+        body = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+        body = body.encode("utf-8")
+        lines = [f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}",
+                 f"Content-Type: {content_type}",
+                 f"Content-Length: {len(body)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{name}: {value}" for name, value in (extra_headers or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host=API_HOST, port=API_PORT):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"🚀 MITOS API on http://{host}:{port} (concurrency {self.max_concurrency}, "
+              f"queue {self.max_queue}, embedding window {EMBED_BATCH_WINDOW_MS:.0f}ms)")
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Headless HTTP API for the MITOS retrieval modes.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--concurrency", type=int, default=API_MAX_CONCURRENCY)
+    parser.add_argument("--queue", type=int, default=API_MAX_QUEUE)
+    args = parser.parse_args()
+    try:
+        asyncio.run(APIServer(args.concurrency, args.queue).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
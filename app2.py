@@ -1,20 +1,44 @@
-import streamlit as st
+from startup_profile import startup_step, format_startup_report
+
+# Every import is timed; heavy resources (Neo4j driver, Chroma, LLM, CSVs, node list)
+# are created lazily on first use, so a Streamlit rerun only re-executes this script.
+with startup_step("import streamlit"):
+    import streamlit as st
+    import streamlit.components.v1 as components
 import os
 from dotenv import load_dotenv
-from neo4j_connector import neo4j_db  # Using the existing Neo4j connection
-from pyvis.network import Network
-import streamlit.components.v1 as components
-from query_neo4j import get_graph_data, hybrid_search
-from simple_rag import simple_rag_query, init_chroma_collection
-from hybrid_rag import hybrid_simple_graph_search
-from llm_response import generate_response
-from Levenshtein import ratio
-from hybrid_rag import enhanced_hybrid_search
+with startup_step("import neo4j_connector"):
+    from neo4j_connector import neo4j_db  # Using the existing Neo4j connection
+with startup_step("import pyvis"):
+    from pyvis.network import Network
+with startup_step("import query_neo4j"):
+    from query_neo4j import get_graph_data, get_node_neighborhood, hybrid_search
+with startup_step("import simple_rag"):
+    from simple_rag import simple_rag_query, get_collection
+with startup_step("import hybrid_rag"):
+    from hybrid_rag import hybrid_simple_graph_search
+    from hybrid_rag import enhanced_hybrid_search
+    from hybrid_rag import cascade_search
+with startup_step("import llm_response"):
+    from llm_response import generate_response_stream
+with startup_step("import caches"):
+    from embedding_cache import embed_text
+    from answer_cache import get_answer_cache
+    from graph_cache import graph_cached
+with startup_step("import node_suggest"):
+    from node_suggest import suggest_nodes
+with startup_step("import tracing"):
+    from tracing import start_trace, span, start_metrics_server
+with startup_step("import conversation_memory"):
+    from conversation_memory import ConversationMemory
 
 
 # Load environment variables
 load_dotenv()
 
+# Modes whose answers are graph triples; only these keep a per-session working subgraph
+MEMORY_MODES = ("Graph RAG (Text-Only)", "Hybrid Graph (Text+Vector)", "Cascade (Full-text → Vector)")
+
 def safe_rerun():
     """Reruns the Streamlit app if possible."""
     if hasattr(st, "experimental_rerun"):
@@ -58,6 +82,7 @@ def show_impressive_title():
 # Neo4j Query Helpers
 ############################################
 
+@graph_cached
 def get_topic_list():
     query = """
         MATCH (t:TOPIC)
@@ -67,6 +92,7 @@ def get_topic_list():
     """
     return [r["topicName"] for r in neo4j_db.query(query)]
 
+@graph_cached
 def get_node_list_by_topic(selected_topic: str):
     if selected_topic:
         query = """
@@ -95,46 +121,39 @@ class KnowledgeGraphRAG:
         self.driver = neo4j_db.driver
 
     def create_3d_graph_for_node(self, selected_node: str):
-        query = """
-            MATCH (n)-[r]-(m)
-            WHERE n.name = $selected_node AND m.name IS NOT NULL
-            RETURN n.name AS source, type(r) AS relationship, m.name AS target
-        """
-        records = neo4j_db.query(query, {"selected_node": selected_node})
-        if not records:
-            return None
-
-        net = Network(height="600px", width="100%", directed=True, notebook=False)
-        net.barnes_hut()
-        net.add_node(selected_node, label=selected_node, color="#FF5733", size=25)
-        for rec in records:
-            net.add_node(rec["source"], label=rec["source"])
-            net.add_node(rec["target"], label=rec["target"])
-            net.add_edge(rec["source"], rec["target"], title=rec["relationship"])
-        net.repulsion(node_distance=200, central_gravity=0.3,
-                      spring_length=100, spring_strength=0.05)
-        net.set_options("""
-        var options = {
-          "interaction": {
-            "navigationButtons": true,
-            "zoomView": true
-          }
-        }
-        """)
-        return net.generate_html(notebook=False)
+        # The HTML is cached process-wide, so reruns neither query Neo4j nor rebuild the graph;
+        # with GRAPH_BACKEND=replica a miss reads the neighbourhood from the local snapshot
+        return _graph_html_for_node(selected_node)
+
+@graph_cached
+def _graph_html_for_node(selected_node: str):
+    records = get_node_neighborhood(selected_node)
+    if not records:
+        return None
+
+    net = Network(height="600px", width="100%", directed=True, notebook=False)
+    net.barnes_hut()
+    net.add_node(selected_node, label=selected_node, color="#FF5733", size=25)
+    for rec in records:
+        net.add_node(rec["source"], label=rec["source"])
+        net.add_node(rec["target"], label=rec["target"])
+        net.add_edge(rec["source"], rec["target"], title=rec["relationship"])
+    net.repulsion(node_distance=200, central_gravity=0.3,
+                  spring_length=100, spring_strength=0.05)
+    net.set_options("""
+    var options = {
+      "interaction": {
+        "navigationButtons": true,
+        "zoomView": true
+      }
+    }
+    """)
+    return net.generate_html(notebook=False)
 
 ############################################
 # RAG + Suggestion Helpers
 ############################################
 
-collection = init_chroma_collection()
-ALL_NODES = [r["nodeName"] for r in neo4j_db.query("MATCH (n:PROCESS) RETURN DISTINCT n.name AS nodeName")]
-
-def suggest_nodes(query, candidates, limit=5):
-    scores = [(cand, ratio(query, cand)) for cand in candidates]
-    scores.sort(key=lambda x: x[1], reverse=True)
-    return [cand for cand, _ in scores[:limit]]
-
 def paste_suggestion_to_buffer(node_name: str):
     """Callback: store into the 'buffer' that our chat_input logic will pick up."""
     st.session_state["chat_input"] = node_name
@@ -143,8 +162,27 @@ def paste_suggestion_to_buffer(node_name: str):
 # Main
 ############################################
 
+def render_timing_breakdown(trace):
+    """Χρόνοι ανά στάδιο του τελευταίου ερωτήματος (από το trace), με εσοχή για τα εμφωλευμένα."""
+    lines = [f"{'total':<40} {trace.total_ms:9.1f} ms"]
+    for s in trace.breakdown():
+        extra = []
+        if s.get("rows") is not None:
+            extra.append(f"{s['rows']} rows")
+        if s.get("prompt_tokens"):
+            extra.append(f"{s['prompt_tokens']} prompt tokens")
+        if s.get("ttft_ms") is not None:
+            extra.append(f"TTFT {s['ttft_ms']:.0f} ms")
+        if s.get("error"):
+            extra.append(f"❌ {s['error']}")
+        label = "  " * s["depth"] + s["stage"]
+        lines.append(f"{label:<40} {s['duration_ms']:9.1f} ms  {', '.join(extra)}")
+    with st.expander("⏱️ Timing breakdown"):
+        st.code("\n".join(lines))
+
 def main():
     st.set_page_config(page_title="Chatbot with Knowledge Graph Visualization", layout="wide")
+    start_metrics_server()
     show_impressive_title()
 
     # --- Sidebar ---
@@ -153,7 +191,8 @@ def main():
             "Graph RAG (Text-Only)",
             "Hybrid Graph (Text+Vector)",
             "Simple RAG (ChromaDB)",
-            "Hybrid Simple + Graph"
+            "Hybrid Simple + Graph",
+            "Cascade (Full-text → Vector)"
         ], index=0)
 
         st.markdown("---")
@@ -178,8 +217,14 @@ def main():
 
         if st.button("Reset Conversation"):
             st.session_state["messages"] = []
+            st.session_state["memory"] = ConversationMemory()
             safe_rerun()
 
+        with st.expander("⏱️ Startup report"):
+            st.code(format_startup_report())
+
+        show_timings = st.checkbox("⏱️ Show timing breakdown", value=False)
+
     # --- Graph Visualization ---
     st.markdown("### 🌐 Knowledge Graph Visualization")
     if sel_node:
@@ -199,6 +244,13 @@ def main():
         st.session_state["messages"] = []
     if "chat_input" not in st.session_state:
         st.session_state["chat_input"] = ""
+    if "memory" not in st.session_state:
+        st.session_state["memory"] = ConversationMemory()
+    memory = st.session_state["memory"]
+    # Triples retrieved in another mode are not this mode's context
+    if st.session_state.get("memory_mode") != mode:
+        memory.clear()
+        st.session_state["memory_mode"] = mode
 
     # Show history
     for msg in st.session_state["messages"]:
@@ -219,33 +271,80 @@ def main():
         with st.chat_message("user"):
             st.write(user_input)
 
-        with st.spinner("Processing your query..."):
-            if mode == "Graph RAG (Text-Only)":
-                data = get_graph_data(user_input)
-            elif mode == "Hybrid Graph (Text+Vector)":
-                data = hybrid_search(user_input, top_k=5)
-            elif mode == "Simple RAG (ChromaDB)":
-                docs = simple_rag_query(user_input, collection)
-                data = [{"node_1": d, "relationship": "—", "node_2": ""} for d in docs]
-            elif mode == "Hybrid Simple + Graph":
-                data = enhanced_hybrid_search(user_input, top_k=5)
-            else:
-                data = []
-
-            if not data:
-                st.info("⚠️ Δεν εντοπίστηκε σχετική πληροφορία στη βάση γνώσης. Παρακαλώ διατυπώστε ερώτηση σχετική με δημόσιες υπηρεσίες.")
-                answer = "⚠️ Η ερώτησή σας δεν αντιστοιχεί σε κάποια διαθέσιμη διοικητική υπηρεσία ή διαδικασία."
-                suggestions = suggest_nodes(user_input, ALL_NODES, limit=5)
-                for s in suggestions:
-                    st.button(label=s, key=f"suggest_{s}", on_click=paste_suggestion_to_buffer, args=(s,))
-                answer = "Παρακαλώ επιλέξτε μία από τις παραπάνω προτάσεις για καλύτερη αναζήτηση."
+        with start_trace("chat", mode=mode) as trace:
+            # A follow-up is answered from this session's working subgraph; the shared answer
+            # cache only applies to questions that stand on their own
+            with span("memory.route") as route_span:
+                follow_up = route_span["follow_up"] = mode in MEMORY_MODES and memory.is_follow_up(user_input)
+            data = []
+            if follow_up:
+                with span("memory.recall") as recall_span:
+                    data, memory_stats = memory.recall(user_input)
+                    recall_span["rows"] = len(data)
+                st.caption(f"🧠 {memory_stats['source']}: {memory_stats['matched']} matching triples, "
+                           f"{memory_stats['expanded']} fetched, {memory_stats['memory_triples']} in memory")
+                # Nothing usable in the working subgraph: retrieve as for a new question
+                follow_up = bool(data)
+
+            answer_cache = get_answer_cache()
+            answer = query_embedding = None
+            if not follow_up:
+                # A semantically equivalent earlier question skips both retrieval and the LLM.
+                # Graph RAG (Text-Only) and Cascade embed the question only for this probe (Cascade
+                # reuses it if it escalates); one embedding call against a possible LLM call saved.
+                with span("embedding"):
+                    query_embedding = embed_text(user_input)
+                with span("answer_cache.lookup") as lookup_span:
+                    answer = answer_cache.lookup(query_embedding, mode)
+                    lookup_span["hit"] = answer is not None
+
+            if not follow_up and answer is None:
+                with st.spinner("Processing your query..."):
+                    if mode == "Graph RAG (Text-Only)":
+                        data = get_graph_data(user_input)
+                    elif mode == "Hybrid Graph (Text+Vector)":
+                        data = hybrid_search(user_input, top_k=5, user_embedding=query_embedding)
+                    elif mode == "Simple RAG (ChromaDB)":
+                        docs = simple_rag_query(user_input, get_collection(), query_embedding=query_embedding)
+                        data = [{"node_1": d, "relationship": "—", "node_2": ""} for d in docs]
+                    elif mode == "Hybrid Simple + Graph":
+                        data = enhanced_hybrid_search(user_input, top_k=5, query_embedding=query_embedding)
+                    elif mode == "Cascade (Full-text → Vector)":
+                        data, cascade_stats = cascade_search(user_input, top_k=5, query_embedding=query_embedding)
+                        st.caption(" → ".join(f"{s['stage']} {s['ms']:.0f}ms ({s['rows']})"
+                                              for s in cascade_stats["stages"]))
+                    else:
+                        data = []
+
+                    if mode in MEMORY_MODES:
+                        memory.remember(data)
+                    if not data:
+                        st.info("⚠️ Δεν εντοπίστηκε σχετική πληροφορία στη βάση γνώσης. Παρακαλώ διατυπώστε ερώτηση σχετική με δημόσιες υπηρεσίες.")
+                        answer = "⚠️ Η ερώτησή σας δεν αντιστοιχεί σε κάποια διαθέσιμη διοικητική υπηρεσία ή διαδικασία."
+                        suggestions = suggest_nodes(user_input, limit=5)
+                        for s in suggestions:
+                            st.button(label=s, key=f"suggest_{s}", on_click=paste_suggestion_to_buffer, args=(s,))
+                        answer = "Παρακαλώ επιλέξτε μία από τις παραπάνω προτάσεις για καλύτερη αναζήτηση."
+
+            if data:
+                # Render tokens as they arrive instead of waiting for the full answer
+                with st.chat_message("assistant"):
+                    placeholder = st.empty()
+                    answer = ""
+                    for token in generate_response_stream(user_input, data):
+                        answer += token
+                        placeholder.markdown(answer + "▌")
+                    placeholder.markdown(answer)
+                if not follow_up:
+                    answer_cache.store(user_input, query_embedding, mode, answer)
             else:
-                answer = generate_response(user_input, data)
+                with st.chat_message("assistant"):
+                    st.write(answer)
 
+        if show_timings:
+            render_timing_breakdown(trace)
 
         st.session_state["messages"].append({"role": "assistant", "content": answer})
-        with st.chat_message("assistant"):
-            st.write(answer)
 
 
 if __name__ == "__main__":
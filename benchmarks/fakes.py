@@ -0,0 +1,475 @@
+# benchmarks/fakes.py
+#
+# Deterministic in-process stand-ins for Neo4j, the OpenAI embeddings, Chroma and the
+# chat model, over a synthetic MITOS-shaped graph. Every stand-in can sleep to imitate
+# the network / service latency of the real dependency, so the retrieval code paths
+# run unchanged and offline. Used by benchmarks/retrieval.py.
+
+import bisect
+import hashlib
+import math
+import threading
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+from greek_text import normalize_name
+
+FAKE_EMBEDDING_DIM = 256
+
+# Latency (seconds) of each stand-in under the "realistic" profile; multiplied by --latency-scale
+LATENCY_PROFILE = {
+    "neo4j_round_trip": 0.004,
+    "neo4j_per_row": 0.00002,
+    "embedding": 0.12,
+    "chroma_query": 0.015,
+    "llm_first_token": 0.6,
+    "llm_per_token": 0.015,
+}
+
+ACTIONS = ["Έκδοση", "Ανανέωση", "Αίτηση για", "Χορήγηση", "Βεβαίωση", "Εγγραφή σε",
+           "Δήλωση", "Μεταβίβαση", "Αντικατάσταση", "Διαγραφή από"]
+OBJECTS = ["πιστοποιητικού γέννησης", "άδειας οδήγησης", "διαβατηρίου", "επιδόματος μητρότητας",
+           "άδειας διαμονής", "ληξιαρχικής πράξης γάμου", "φορολογικής ενημερότητας",
+           "πιστοποιητικού οικογενειακής κατάστασης", "ΑΜΚΑ", "επιδόματος ανεργίας",
+           "σύνταξης γήρατος", "άδειας λειτουργίας καταστήματος", "αντιγράφου ποινικού μητρώου",
+           "κάρτας αναπηρίας", "δημοτικότητας", "άδειας άσκησης επαγγέλματος", "επιδόματος στέγασης",
+           "βεβαίωσης σπουδών", "κάρτας ανεργίας", "ληξιαρχικής πράξης θανάτου"]
+ORGANIZATIONS = ["Δήμος Αθηναίων", "Δήμος Θεσσαλονίκης", "ΑΑΔΕ", "e-ΕΦΚΑ", "ΔΥΠΑ", "Περιφέρεια Αττικής",
+                 "Υπουργείο Εσωτερικών", "Υπουργείο Μεταφορών", "ΚΕΠ", "Ελληνική Αστυνομία",
+                 "ΟΠΕΚΑ", "Υπουργείο Παιδείας"]
+DOCUMENTS = ["Αστυνομική ταυτότητα", "Αποδεικτικό διεύθυνσης", "Πρόσφατη φωτογραφία", "Παράβολο",
+             "Υπεύθυνη δήλωση", "Ιατρική γνωμάτευση", "Εκκαθαριστικό σημείωμα", "Βεβαίωση εργοδότη",
+             "Πιστοποιητικό οικογενειακής κατάστασης", "Διαβατήριο", "Βεβαίωση ΑΦΜ", "Εξουσιοδότηση"]
+STEPS = ["Υποβολή αίτησης", "Έλεγχος δικαιολογητικών", "Πληρωμή παραβόλου", "Έκδοση απόφασης",
+         "Παραλαβή εγγράφου", "Ραντεβού σε υπηρεσία"]
+TOPICS = ["Οικογένεια", "Εργασία και ασφάλιση", "Υγεία", "Φορολογία", "Μεταφορές", "Εκπαίδευση",
+          "Επιχειρήσεις", "Πολίτης και κράτος"]
+
+# Fixed corpus: questions phrased the way citizens type them, some matching service names
+# directly, some only loosely, and a few with no answer in the catalogue
+QUERIES = [
+    "Έκδοση πιστοποιητικού γέννησης",
+    "Πώς μπορώ να εκδώσω πιστοποιητικό γέννησης;",
+    "Ανανέωση άδειας οδήγησης",
+    "Τι δικαιολογητικά χρειάζομαι για διαβατήριο;",
+    "επίδομα μητρότητας",
+    "Αίτηση για επίδομα ανεργίας στη ΔΥΠΑ",
+    "φορολογική ενημερότητα ΑΑΔΕ",
+    "Πού εκδίδω αντίγραφο ποινικού μητρώου;",
+    "Εγγραφή σε δημοτικότητα",
+    "ληξιαρχική πράξη γάμου",
+    "Πώς παίρνω σύνταξη γήρατος από τον e-ΕΦΚΑ;",
+    "άδεια λειτουργίας καταστήματος",
+    "Χορήγηση ΑΜΚΑ",
+    "κάρτα αναπηρίας δικαιολογητικά",
+    "Μεταβίβαση άδειας άσκησης επαγγέλματος",
+    "Βεβαίωση σπουδών Υπουργείο Παιδείας",
+    "Πόσο κοστίζει το παράβολο για άδεια διαμονής;",
+    "επίδομα στέγασης ΟΠΕΚΑ",
+    "Δήλωση ληξιαρχικής πράξης θανάτου",
+    "Ποια είναι η καλύτερη συνταγή για μουσακά;",
+]
+
+
+def sleep_for(seconds):
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+def _tokens(text):
+    return normalize_name(text).split()
+
+
+def fake_embedding(text, dim=FAKE_EMBEDDING_DIM):
+    """
+    Deterministic embedding by feature hashing of words and character trigrams of the
+    normalized text: texts that share words land close together, as with a real model.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in _tokens(text):
+        padded = f" {token} "
+        for feature in [token] + [padded[i:i + 3] for i in range(len(padded) - 2)]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % dim] += 1.0 if (value >> 63) else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class FakeEmbedder:
+    """embed_text / embed_texts stand-in: fake_embedding plus the latency of one API call."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def embed_text(self, text, model=None):
+        return self.embed_texts([text])[0]
+
+    def embed_texts(self, texts, model=None):
+        self.calls += 1
+        sleep_for(self.latency)
+        return [fake_embedding(t).tolist() for t in texts]
+
+
+class SyntheticGraph:
+    """
+    A MITOS-shaped graph: PROCESS nodes (services) linked to their steps, required documents,
+    the providing organization and a topic. Organizations, documents and topics are shared
+    hubs, as in the real catalogue, so multi-hop expansion fans out the same way.
+    """
+
+    def __init__(self, services=1000, seed=0):
+        rng = np.random.default_rng(seed)
+        self.names, self.labels = [], []
+        self.edges = []                     # (start, type, end)
+        self.adjacency = defaultdict(list)  # node -> [edge index]
+        self._by_name = {}
+        self.service_texts = []
+
+        topics = [self._node(t, "TOPIC") for t in TOPICS]
+        organizations = [self._node(o, "ORGANIZATION") for o in ORGANIZATIONS]
+        documents = [self._node(d, "DOCUMENT") for d in DOCUMENTS]
+
+        for i in range(services):
+            action = ACTIONS[i % len(ACTIONS)]
+            obj = OBJECTS[(i // len(ACTIONS)) % len(OBJECTS)]
+            org = int(rng.integers(len(organizations)))
+            name = f"{action} {obj}"
+            if i >= len(ACTIONS) * len(OBJECTS):
+                name += f" ({ORGANIZATIONS[org]}, {i})"
+            service = self._node(name, "PROCESS")
+            self._edge(service, "PROVIDED_BY", organizations[org])
+            self._edge(service, "BELONGS_TO", topics[int(rng.integers(len(topics)))])
+            required = rng.choice(len(documents), size=int(rng.integers(2, 5)), replace=False)
+            for d in required:
+                self._edge(service, "REQUIRES", documents[d])
+            steps = STEPS[:int(rng.integers(3, len(STEPS) + 1))]
+            for k, step in enumerate(steps, start=1):
+                self._edge(service, "HAS_STEP", self._node(f"Βήμα {k}: {step} — {name}", "STEP"))
+            self.service_texts.append(
+                f"Υπηρεσία: {name} | Φορέας: {ORGANIZATIONS[org]} | "
+                f"Δικαιολογητικά: {', '.join(DOCUMENTS[d] for d in required)} | "
+                f"Βήματα: {', '.join(steps)}"
+            )
+
+        self.embeddings = np.stack([fake_embedding(n) for n in self.names])
+        self.document_embeddings = np.stack([fake_embedding(t) for t in self.service_texts])
+        self._normalized = [normalize_name(n) for n in self.names]
+        self._postings = defaultdict(set)
+        for node, name in enumerate(self._normalized):
+            for token in name.split():
+                self._postings[token].add(node)
+
+    def _node(self, name, label):
+        node = len(self.names)
+        self.names.append(name)
+        self.labels.append(label)
+        self._by_name[name] = node
+        return node
+
+    def _edge(self, start, rel_type, end):
+        self.edges.append((start, rel_type, end))
+        self.adjacency[start].append(len(self.edges) - 1)
+        self.adjacency[end].append(len(self.edges) - 1)
+
+    def __len__(self):
+        return len(self.names)
+
+    # --- lookups used by FakeNeo4j ---
+
+    def contains(self, text, limit=None):
+        """Exact substring over every name: the label-less CONTAINS scan."""
+        hits = [node for node, name in enumerate(self.names) if text in name]
+        return hits[:limit] if limit is not None else hits
+
+    def _name_indexes(self):
+        # Built on first use: sorted names for range seeks, trigram postings like a text index
+        if not hasattr(self, "_sorted_names"):
+            self._sorted_names = sorted((name, node) for node, name in enumerate(self._normalized))
+            self._trigrams = defaultdict(set)
+            for node, name in enumerate(self._normalized):
+                for i in range(len(name) - 2):
+                    self._trigrams[name[i:i + 3]].add(node)
+
+    def normalized_contains(self, text, limit=None):
+        """name_norm CONTAINS text via trigram postings (text index stand-in)."""
+        self._name_indexes()
+        if len(text) < 3:
+            hits = [node for node, name in enumerate(self._normalized) if text in name]
+        else:
+            postings = sorted((self._trigrams.get(text[i:i + 3], set()) for i in range(len(text) - 2)), key=len)
+            candidates = set.intersection(*postings) if postings[0] else set()
+            hits = sorted(node for node in candidates if text in self._normalized[node])
+        return hits[:limit] if limit is not None else hits
+
+    def normalized_prefix(self, text, limit=None):
+        """name_norm STARTS WITH text via a sorted list (range index stand-in)."""
+        self._name_indexes()
+        hits = []
+        for name, node in self._sorted_names[bisect.bisect_left(self._sorted_names, (text,)):]:
+            if not name.startswith(text) or (limit is not None and len(hits) >= limit):
+                break
+            hits.append(node)
+        return hits
+
+    def token_match(self, tokens, limit=None):
+        """Nodes containing any of the tokens, ranked by how many they contain, then by name length."""
+        counts = defaultdict(int)
+        for token in tokens:
+            for node in self.normalized_contains(token):
+                counts[node] += 1
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], len(self._normalized[item[0]]), item[0]))
+        ranked = [(node, float(count)) for node, count in ranked]
+        return ranked[:limit] if limit is not None else ranked
+
+    def full_text(self, query, limit=None):
+        """BM25-like scoring over word tokens, ordered by score (Lucene stand-in)."""
+        scores = defaultdict(float)
+        for token in set(_tokens(query)):
+            postings = self._postings.get(token)
+            if postings:
+                idf = math.log(1 + len(self.names) / len(postings))
+                for node in postings:
+                    scores[node] += idf / math.sqrt(len(self._normalized[node].split()))
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit is not None else ranked
+
+    def vector(self, embedding, k):
+        scores = self.embeddings @ np.asarray(embedding, dtype=np.float32)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return [(int(i), float(scores[i])) for i in top[np.argsort(-scores[top])]]
+
+    def subgraph_edges(self, start, max_level=3):
+        """Edges reached by a breadth-first walk of up to max_level hops (apoc subgraphAll stand-in)."""
+        seen_nodes, seen_edges = {start}, set()
+        frontier = deque([(start, 0)])
+        while frontier:
+            node, level = frontier.popleft()
+            if level == max_level:
+                continue
+            for e in self.adjacency[node]:
+                if e in seen_edges:
+                    continue
+                seen_edges.add(e)
+                yield e
+                s, _, t = self.edges[e]
+                other = t if s == node else s
+                if other not in seen_nodes:
+                    seen_nodes.add(other)
+                    frontier.append((other, level + 1))
+
+
+def _node_id(node):
+    return f"4:fake:{node}"
+
+
+def _parse_id(element_id):
+    return int(element_id.rsplit(":", 1)[1])
+
+
+class FakeNeo4j:
+    """
+    Stand-in for Neo4jConnector. Recognises the Cypher statements issued by query_neo4j,
+    hybrid_rag, graph_cache, graph_replica, conversation_memory and app2 by distinctive
+    substrings and answers them from the SyntheticGraph. Unknown statements raise, so a
+    changed query is noticed rather than silently benchmarked against the wrong data.
+    """
+
+    def __init__(self, graph, round_trip=0.0, per_row=0.0):
+        self.graph = graph
+        self.round_trip = round_trip
+        self.per_row = per_row
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _respond(self, rows):
+        with self._lock:
+            self.calls += 1
+        sleep_for(self.round_trip + self.per_row * len(rows))
+        return rows
+
+    def query(self, cypher_query, parameters=None):
+        return self._respond(self._dispatch(cypher_query, parameters or {}))
+
+    def stream(self, cypher_query, parameters=None):
+        yield from self.query(cypher_query, parameters)
+
+    read = query
+
+    def write(self, cypher_query, parameters=None):
+        return self.query(cypher_query, parameters)
+
+    def _dispatch(self, cypher, params):
+        if "GraphVersion" in cypher:
+            return [{"version": 0}]
+        if "SHOW INDEXES" in cypher:
+            return [{"indexed": True}]
+        if "AS backfilled" in cypher:
+            return [{"backfilled": True}]
+        if "AS relationships" in cypher:
+            return [{"nodes": len(self.graph.names), "relationships": len(self.graph.edges)}]
+        if "UNWIND $queries" in cypher:
+            return self._many(cypher, params)
+        if "UNWIND $names" in cypher:
+            return self._seed_rows([(self.graph._by_name[name["name"]], 1.0) for name in params["names"]
+                                    if name["name"] in self.graph._by_name])
+        if "UNWIND $frontier" in cypher:
+            return self._expand_hop(params["frontier"], params["fanout"])
+        if "$selected_node" in cypher:
+            return self._neighborhood(params["selected_node"])
+        if "MATCH (a)-[r]->(b)" in cypher:
+            return [{"start": _node_id(s), "type": t, "end": _node_id(e)} for s, t, e in self.graph.edges]
+        if cypher.startswith("MATCH (n) RETURN elementId(n)"):
+            return [{"id": _node_id(n), "name": name} for n, name in enumerate(self.graph.names)]
+        if "UNION" in cypher:
+            hits = params["hits"] if "UNWIND $hits" in cypher else None
+            seeds = self._hybrid_seeds(hits, params.get("user_embedding"), params["user_query"], params["top_k"])
+            if "apoc.path.subgraphAll" in cypher:
+                return self._subgraph_rows(seeds, limit=100)
+            return self._seed_rows(seeds)
+        if "mitosFullTextIndex" in cypher:
+            return self._seed_rows(self.graph.full_text(params["user_query"], params["top_k"]))
+        if "MATCH (startNode" in cypher:
+            if "apoc.path.subgraphAll" in cypher:
+                return self._subgraph_rows(self._lookup_seeds(cypher, params), limit=200)
+            return self._seed_rows(self._lookup_seeds(cypher, params, params["max_seeds"]))
+        raise NotImplementedError(f"FakeNeo4j does not recognise this query:\n{cypher}")
+
+    def _many(self, cypher, params):
+        """The batched *_many statements: the single-query answer per q, each row tagged with q.key."""
+        subgraph = "apoc.path.subgraphAll" in cypher
+        rows = []
+        for q in params["queries"]:
+            if "UNION" in cypher:
+                seeds = self._hybrid_seeds(q.get("hits"), q.get("embedding"), q["text"], params["top_k"])
+                found = self._subgraph_rows(seeds, limit=100) if subgraph else self._seed_rows(seeds)
+            elif "mitosFullTextIndex" in cypher:
+                found = self._seed_rows(self.graph.full_text(q["text"], params["top_k"]))
+            elif "MATCH (startNode" in cypher:
+                if subgraph:
+                    found = self._subgraph_rows(self._lookup_seeds(cypher, q), limit=200)
+                else:
+                    found = self._seed_rows(self._lookup_seeds(cypher, q, params["max_seeds"]))
+            else:
+                raise NotImplementedError(f"FakeNeo4j does not recognise this query:\n{cypher}")
+            rows.extend(dict(row, key=q["key"]) for row in found)
+        return rows
+
+    def _lookup_seeds(self, cypher, params, limit=None):
+        """Start nodes of get_graph_data for each SEED_LOOKUP mode, as (node, score)."""
+        if "AS token" in cypher:
+            return self.graph.token_match(params["tokens"], limit)
+        if "lookup <> ''" in cypher and not params["lookup"]:
+            return []
+        if "name_norm STARTS WITH" in cypher:
+            return [(n, 1.0) for n in self.graph.normalized_prefix(params["lookup"], limit)]
+        if "name_norm CONTAINS" in cypher:
+            return [(n, 1.0) for n in self.graph.normalized_contains(params["lookup"], limit)]
+        return [(n, 1.0) for n in self.graph.contains(params["user_query"], limit)]
+
+    def _seed_rows(self, seeds):
+        return [{"id": _node_id(n), "name": self.graph.names[n], "score": s} for n, s in seeds]
+
+    def _hybrid_seeds(self, hits, embedding, text, top_k):
+        if hits is not None:
+            vector_hits = [(_parse_id(h["id"]), h["score"]) for h in hits]
+        else:
+            vector_hits = self.graph.vector(embedding, top_k)
+        merged = vector_hits + self.graph.full_text(text)
+        merged.sort(key=lambda hit: -hit[1])
+        return merged[:top_k]
+
+    def _subgraph_rows(self, seeds, limit):
+        rows, seen = [], set()
+        for node, _ in seeds:
+            for e in self.graph.subgraph_edges(node):
+                _, rel_type, end = self.graph.edges[e]
+                key = (node, rel_type, end)
+                if key in seen:
+                    continue
+                seen.add(key)
+                rows.append({"node_1": self.graph.names[node], "relationship": rel_type,
+                             "node_2": self.graph.names[end]})
+                if len(rows) >= limit:
+                    return rows
+        return rows
+
+    def _expand_hop(self, frontier, fanout):
+        rows = []
+        for f in sorted(frontier, key=lambda f: (f["seed"], f["pos"])):
+            node = _parse_id(f["id"])
+            by_type = defaultdict(list)
+            for e in self.graph.adjacency[node]:
+                start, rel_type, end = self.graph.edges[e]
+                other = end if start == node else start
+                by_type[rel_type].append((self.graph.names[other], e, other))
+            for rel_type in sorted(by_type):
+                kept = []
+                for _, e, other in sorted(by_type[rel_type])[:fanout]:
+                    start, _, end = self.graph.edges[e]
+                    kept.append({"seed": f["seed"], "node_1": self.graph.names[start],
+                                 "relationship": rel_type, "node_2": self.graph.names[end],
+                                 "edge_id": f"5:fake:{e}", "next_id": _node_id(other)})
+                # ORDER BY f.seed, f.pos, relationship, node_2, edge_id
+                rows.extend(sorted(kept, key=lambda row: (row["node_2"], _parse_id(row["edge_id"]))))
+        return rows
+
+    def _neighborhood(self, name):
+        node = self.graph._by_name.get(name)
+        if node is None:
+            return []
+        rows = []
+        for e in self.graph.adjacency[node]:
+            start, rel_type, end = self.graph.edges[e]
+            rows.append({"source": name, "relationship": rel_type,
+                         "target": self.graph.names[end if start == node else start]})
+        return rows
+
+
+class FakeCollection:
+    """Chroma collection stand-in: one document per service, cosine top-k over fake embeddings."""
+
+    def __init__(self, graph, latency=0.0):
+        self.graph = graph
+        self.latency = latency
+
+    def query(self, query_embeddings=None, query_texts=None, n_results=5):
+        if query_embeddings is None:
+            query_embeddings = [fake_embedding(t) for t in query_texts]
+        sleep_for(self.latency)
+        documents = []
+        for embedding in query_embeddings:
+            scores = self.graph.document_embeddings @ np.asarray(embedding, dtype=np.float32)
+            top = np.argsort(-scores)[:n_results]
+            documents.append([self.graph.service_texts[i] for i in top])
+        return {"documents": documents}
+
+
+class _Chunk:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """ChatOpenAI stand-in: a fixed Greek answer, streamed word by word with the configured latency."""
+
+    ANSWER = ("Για την υπηρεσία που αναζητάτε απαιτούνται τα δικαιολογητικά που αναφέρονται παραπάνω. "
+              "Η αίτηση υποβάλλεται στον αρμόδιο φορέα και η απόφαση εκδίδεται μετά τον έλεγχο. ") * 4
+
+    def __init__(self, first_token=0.0, per_token=0.0):
+        self.first_token = first_token
+        self.per_token = per_token
+
+    def stream(self, prompt):
+        sleep_for(self.first_token)
+        for i, word in enumerate(self.ANSWER.split(" ")):
+            if i:
+                sleep_for(self.per_token)
+            yield _Chunk(word + " ")
+
+    def predict(self, prompt):
+        return "".join(chunk.content for chunk in self.stream(prompt))
@@ -0,0 +1,81 @@
+# benchmarks/graph_replica.py
+#
+# Graph retrieval served by Neo4j (FakeNeo4j with the round-trip latency of LATENCY_PROFILE,
+# scaled by --latency-scale) against the in-process CSR replica (graph_replica.py), over a
+# synthetic MITOS-shaped graph. The replica is exported from the fake of each size first; the budgeted
+# expansion must come back identical from both backends and the neighbourhoods with the
+# same rows (Cypher gives them no order). The subgraph mode returns any LIMIT rows of the
+# subgraph, as apoc.path.subgraphAll does, so it is timed only.
+#
+#   python -m benchmarks.graph_replica
+#   python -m benchmarks.graph_replica --services 1000 20000 --latency-scale 0
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.fakes import QUERIES, SyntheticGraph
+
+
+def _unordered(results):
+    return [sorted(tuple(row.values()) for row in rows) for rows in results]
+
+
+def measure(fn, inputs, repeat):
+    latencies, results = [], []
+    for _ in range(repeat):
+        results = []
+        for value in inputs:
+            start = time.perf_counter()
+            results.append(fn(value))
+            latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    return {"p50_ms": float(np.percentile(latencies, 50)), "p95_ms": float(np.percentile(latencies, 95))}, results
+
+
+def run(services, args):
+    from benchmarks.retrieval import install_fakes
+    import graph_replica
+    import query_neo4j
+
+    graph = SyntheticGraph(services=services)
+    install_fakes(graph, latency_scale=args.latency_scale)
+    graph_replica.GRAPH_REPLICA_DIR = tempfile.mkdtemp(prefix="graph_replica-")
+    graph_replica._replica = graph_replica._counts = None  # nothing carried over from the previous size
+    start = time.perf_counter()
+    graph_replica.export_graph_replica()
+    print(f"📦 {len(graph):,} nodes exported in {time.perf_counter() - start:.2f} s")
+
+    names = graph.names[::max(1, len(graph) // 50)]
+    cases = {
+        "get_graph_data subgraph": (lambda q: query_neo4j.get_graph_data(q, expansion="subgraph"), QUERIES, None),
+        "get_graph_data budgeted": (lambda q: query_neo4j.get_graph_data(q, expansion="budgeted"), QUERIES, list),
+        "hybrid_search budgeted": (lambda q: query_neo4j.hybrid_search(q, expansion="budgeted"), QUERIES, list),
+        "node neighbourhood": (query_neo4j.get_node_neighborhood, names, _unordered),
+    }
+    for label, (fn, inputs, compare) in cases.items():
+        results = {}
+        for backend in ("neo4j", "replica"):
+            query_neo4j.GRAPH_BACKEND = backend
+            fn(inputs[0])  # loads the replica / warms the caches outside the measurement
+            timing, results[backend] = measure(fn, inputs, args.repeat)
+            print(f"{label:<26} {backend:<8} p50 {timing['p50_ms']:8.3f} ms  p95 {timing['p95_ms']:8.3f} ms")
+        if compare is not None and compare(results["neo4j"]) != compare(results["replica"]):
+            print(f"❌ {label}: the replica returned different rows")
+    query_neo4j.GRAPH_BACKEND = "neo4j"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Neo4j against the local graph replica.")
+    parser.add_argument("--services", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for services in args.services:
+        run(services, args)
+
+
+if __name__ == "__main__":
+    main()
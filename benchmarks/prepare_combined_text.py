@@ -0,0 +1,87 @@
+# benchmarks/prepare_combined_text.py
+#
+# Timing comparison of the grouped prepare_combined_text against the original
+# per-service scan, on a synthetic MITOS-shaped catalogue.
+#
+#   python -m benchmarks.prepare_combined_text --rows 100000
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from mitos_text import columns_to_embed, prepare_combined_text
+
+
+def prepare_combined_text_rowwise(dataframes, columns_to_embed):
+    """The original implementation: filter every table per service and walk the rows."""
+    combined_text_per_service = {}
+
+    for service_id in dataframes['services']['service_id'].unique():
+        texts = []
+        for table, cols in columns_to_embed.items():
+            df = dataframes[table]
+            relevant_rows = df[df['service_id'] == service_id]
+            for _, row in relevant_rows.iterrows():
+                row_text = " | ".join(row[col] for col in cols if pd.notnull(row[col]))
+                texts.append(row_text)
+        combined_text_per_service[service_id] = " ".join(texts)
+
+    return combined_text_per_service
+
+
+def synthetic_catalogue(total_rows, services, seed=42):
+    """Builds the eight MITOS tables with roughly total_rows rows and ~10% missing cells."""
+    rng = np.random.default_rng(seed)
+    service_ids = [f"svc-{i:06d}" for i in range(services)]
+    child_tables = [t for t in columns_to_embed if t != 'services']
+    rows_per_table = max((total_rows - services) // len(child_tables), 1)
+
+    def column(name, n):
+        values = np.array([f"{name} κείμενο {i}" for i in range(n)], dtype=object)
+        values[rng.random(n) < 0.1] = None
+        return values
+
+    dataframes = {'services': pd.DataFrame(
+        {'service_id': service_ids,
+         **{col: column(col, services) for col in columns_to_embed['services']}}
+    )}
+    for table in child_tables:
+        dataframes[table] = pd.DataFrame(
+            {'service_id': rng.choice(service_ids, size=rows_per_table),
+             **{col: column(col, rows_per_table) for col in columns_to_embed[table]}}
+        )
+    return dataframes
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000, help="total rows across all tables")
+    parser.add_argument("--services", type=int, default=5_000)
+    parser.add_argument("--skip-rowwise", action="store_true", help="only time the grouped version")
+    args = parser.parse_args()
+
+    dataframes = synthetic_catalogue(args.rows, args.services)
+    print(f"📦 Synthetic catalogue: {sum(len(df) for df in dataframes.values()):,} rows, "
+          f"{args.services:,} services")
+
+    grouped, grouped_time = _timed(prepare_combined_text, dataframes, columns_to_embed)
+    print(f"⚡ grouped:  {grouped_time:8.2f}s")
+
+    if not args.skip_rowwise:
+        rowwise, rowwise_time = _timed(prepare_combined_text_rowwise, dataframes, columns_to_embed)
+        print(f"🐢 row-wise: {rowwise_time:8.2f}s  ({rowwise_time / grouped_time:.0f}x slower)")
+        mismatches = [sid for sid in rowwise if rowwise[sid] != grouped.get(sid)]
+        print("✅ Identical text per service." if not mismatches
+              else f"❌ {len(mismatches)} services differ, e.g. {mismatches[:3]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# benchmarks/retrieval.py
+#
+# Offline latency / throughput benchmark of the retrieval modes. Neo4j, the OpenAI
+# embeddings, Chroma and the chat model are replaced by the deterministic stand-ins in
+# benchmarks/fakes.py over a synthetic MITOS-shaped graph, so it runs without network
+# access. The stand-ins sleep for a "realistic" service latency, scaled by
+# --latency-scale (0 measures the Python code paths alone).
+#
+#   python -m benchmarks.retrieval
+#   python -m benchmarks.retrieval --latency-scale 0 --repeat 5 --output benchmarks/results.jsonl
+#   python -m benchmarks.retrieval --expansion budgeted --concurrency 8
+#   python -m benchmarks.retrieval --batch 500 --only
+#
+# --output appends one JSON line per run, so results can be tracked over time. --batch N
+# compares N sequential calls with one call of the batched *_many variant.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.fakes import (LATENCY_PROFILE, QUERIES, FakeCollection, FakeEmbedder, FakeLLM,
+                              FakeNeo4j, SyntheticGraph)
+
+
+def install_fakes(graph, latency_scale=1.0, expansion="subgraph"):
+    """Points the shared connector, Chroma collection, embedding function and LLM at the stand-ins."""
+    # simple_rag checks for a key at import; nothing here ever reaches OpenAI
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    import neo4j_connector
+    import query_neo4j
+    import simple_rag
+    import llm_response
+
+    latency = {name: value * latency_scale for name, value in LATENCY_PROFILE.items()}
+    neo4j_connector._connector = FakeNeo4j(graph, latency["neo4j_round_trip"], latency["neo4j_per_row"])
+    simple_rag._collection = FakeCollection(graph, latency["chroma_query"])
+    llm_response._llm = FakeLLM(latency["llm_first_token"], latency["llm_per_token"])
+    # The uncached path: every query pays for an embedding call
+    embedder = FakeEmbedder(latency["embedding"])
+    query_neo4j.embed_text = embedder.embed_text
+    query_neo4j.embed_texts = embedder.embed_texts
+    query_neo4j.EXPANSION_MODE = expansion
+    query_neo4j.VECTOR_BACKEND = "neo4j"
+    query_neo4j.GRAPH_BACKEND = "neo4j"
+
+
+def targets(top_k=5):
+    from query_neo4j import get_graph_data, hybrid_search
+    from simple_rag import simple_rag_query, get_collection
+    from hybrid_rag import hybrid_simple_graph_search, enhanced_hybrid_search
+    from llm_response import generate_response_stream
+
+    def answer(query):
+        data = hybrid_search(query, top_k=top_k)
+        return list(generate_response_stream(query, data))
+
+    return {
+        "get_graph_data": get_graph_data,
+        "hybrid_search": lambda q: hybrid_search(q, top_k=top_k),
+        "simple_rag_query": lambda q: simple_rag_query(q, get_collection(), top_k),
+        "hybrid_simple_graph_search": lambda q: hybrid_simple_graph_search(q, top_k=top_k),
+        "enhanced_hybrid_search": lambda q: enhanced_hybrid_search(q, top_k=top_k),
+        "answer (hybrid_search + LLM stream)": answer,
+    }
+
+
+def batch_targets(top_k=5):
+    """(one query, many queries) pairs of the functions that have a batched variant."""
+    from query_neo4j import (full_text_search, full_text_search_many, get_graph_data, get_graph_data_many,
+                             hybrid_search, hybrid_search_many)
+
+    return {
+        "full_text_search": (lambda q: full_text_search(q, top_k), lambda qs: full_text_search_many(qs, top_k)),
+        "get_graph_data": (get_graph_data, get_graph_data_many),
+        "hybrid_search": (lambda q: hybrid_search(q, top_k=top_k),
+                          lambda qs: hybrid_search_many(qs, top_k=top_k)),
+    }
+
+
+def batch_queries(graph, size):
+    """`size` distinct queries: the corpus followed by service names of the synthetic graph."""
+    services = [name for name, label in zip(graph.names, graph.labels) if label == "PROCESS"]
+    return list(dict.fromkeys(QUERIES + services))[:size]
+
+
+def run_batch(one, many, queries):
+    """Wall time and Neo4j round-trips of sequential calls vs one batched call over the same queries."""
+    import neo4j_connector
+
+    db = neo4j_connector._connector
+    calls, start = db.calls, time.perf_counter()
+    sequential = [one(q) for q in queries]
+    sequential_s, sequential_calls = time.perf_counter() - start, db.calls - calls
+
+    calls, start = db.calls, time.perf_counter()
+    batched = many(queries)
+    batched_s, batched_calls = time.perf_counter() - start, db.calls - calls
+    return {
+        "queries": len(queries),
+        "sequential_s": sequential_s,
+        "batched_s": batched_s,
+        "speedup": sequential_s / batched_s if batched_s else None,
+        "sequential_round_trips": sequential_calls,
+        "batched_round_trips": batched_calls,
+        "mismatches": sum(rows != batched[q] for q, rows in zip(queries, sequential)),
+    }
+
+
+def run_target(fn, queries, repeat, concurrency):
+    """Calls fn over the corpus `repeat` times on `concurrency` threads; one warm-up pass first."""
+    for query in queries:
+        fn(query)
+
+    def timed(query):
+        start = time.perf_counter()
+        try:
+            rows = len(fn(query))
+            error = False
+        except Exception as e:
+            print(f"❌ {query!r}: {e}")
+            rows, error = 0, True
+        return time.perf_counter() - start, rows, error
+
+    calls = [q for _ in range(repeat) for q in queries]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(timed, calls))
+    wall = time.perf_counter() - start
+
+    latencies = np.array([s[0] for s in samples]) * 1000
+    return {
+        "calls": len(samples),
+        "errors": sum(s[2] for s in samples),
+        "rows_mean": float(np.mean([s[1] for s in samples])),
+        "mean_ms": float(latencies.mean()),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "throughput_qps": len(samples) / wall,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the retrieval modes.")
+    parser.add_argument("--services", type=int, default=1000, help="services in the synthetic graph")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the query corpus")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="multiplier for the simulated service latency (0 = none)")
+    parser.add_argument("--expansion", choices=["subgraph", "budgeted"], default="subgraph")
+    parser.add_argument("--only", nargs="*", help="run only these targets")
+    parser.add_argument("--batch", type=int, default=0,
+                        help="also compare this many sequential calls with one *_many call")
+    parser.add_argument("--output", help="append the results as one JSON line to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the log lines printed by the retrievers")
+    args = parser.parse_args()
+
+    graph = SyntheticGraph(services=args.services)
+    install_fakes(graph, args.latency_scale, args.expansion)
+    print(f"📦 Synthetic graph: {len(graph):,} nodes, {len(graph.edges):,} edges; "
+          f"{len(QUERIES)} queries x {args.repeat}, concurrency {args.concurrency}, "
+          f"latency x{args.latency_scale}, expansion {args.expansion}")
+
+    results = {}
+    for name, fn in targets().items():
+        if args.only and name not in args.only:
+            continue
+        with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO()):
+            result = results[name] = run_target(fn, QUERIES, args.repeat, args.concurrency)
+        print(f"{name:<38} p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  "
+              f"p99 {result['p99_ms']:8.1f} ms  {result['throughput_qps']:7.1f} q/s  "
+              f"rows {result['rows_mean']:5.1f}" + (f"  errors {result['errors']}" if result["errors"] else ""))
+
+    batches = {}
+    if args.batch:
+        queries = batch_queries(graph, args.batch)
+        for name, (one, many) in batch_targets().items():
+            with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO()):
+                result = batches[name] = run_batch(one, many, queries)
+            print(f"{name + '_many':<38} {result['queries']} queries: sequential {result['sequential_s']:7.2f} s "
+                  f"({result['sequential_round_trips']} round-trips), batched {result['batched_s']:6.2f} s "
+                  f"({result['batched_round_trips']}), x{result['speedup']:.1f}"
+                  + (f"  mismatches {result['mismatches']}" if result["mismatches"] else ""))
+
+    if args.output:
+        run = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "verbose")},
+            "results": results,
+            "batches": batches,
+        }
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(run, ensure_ascii=False) + "\n")
+        print(f"📝 Results appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/seed_lookup.py
+#
+# Latency and hit rate of the get_graph_data start-node lookup (SEED_LOOKUP modes)
+# against graph size. Offline, FakeNeo4j answers "scan" with a pass over every name and
+# the name_norm modes with index stand-ins (trigram postings for the text index, a sorted
+# list for the range index), so the numbers show how each mode scales, not Neo4j's
+# absolute latency. With --neo4j the real database is measured and the plan operator of
+# every mode is printed, to confirm that the name_norm modes are index seeks.
+#
+#   python -m benchmarks.seed_lookup
+#   python -m benchmarks.seed_lookup --services 1000 5000 20000 --repeat 5
+#   python -m benchmarks.seed_lookup --neo4j
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.fakes import QUERIES, SyntheticGraph
+
+
+def measure(lookup, mode, queries, repeat):
+    latencies, found = [], []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            seeds = lookup(query, mode)
+            latencies.append(time.perf_counter() - start)
+            found.append(len(seeds))
+    latencies = np.array(latencies) * 1000
+    return {"p50_ms": float(np.percentile(latencies, 50)), "p95_ms": float(np.percentile(latencies, 95)),
+            "seeds_mean": float(np.mean(found)), "hit_rate": float(np.mean(np.array(found) > 0))}
+
+
+def _report(label, result, extra=""):
+    print(f"{label:<28} p50 {result['p50_ms']:8.3f} ms  p95 {result['p95_ms']:8.3f} ms  "
+          f"seeds {result['seeds_mean']:5.1f}  hit rate {result['hit_rate']:4.0%}{extra}")
+
+
+def _queries(graph):
+    # The corpus plus keyword-style lookups typed without accents / in lower case
+    services = [name for name, label in zip(graph.names, graph.labels) if label == "PROCESS"][:20]
+    return QUERIES + services + [name.lower().replace("ό", "ο").replace("ή", "η") for name in services]
+
+
+def run_synthetic(args):
+    from benchmarks.retrieval import install_fakes
+    from query_neo4j import SEED_LOOKUP_MODES, find_seeds
+
+    for services in args.services:
+        graph = SyntheticGraph(services=services)
+        install_fakes(graph, latency_scale=0)
+        queries = _queries(graph)
+        for mode in SEED_LOOKUP_MODES:
+            find_seeds(queries[0], mode)  # builds the index stand-ins outside the measurement
+            _report(f"{len(graph):>7,} nodes  {mode}", measure(find_seeds, mode, queries, args.repeat))
+
+
+def _plan_operators(cypher, params):
+    from neo4j_connector import get_neo4j_db
+
+    db = get_neo4j_db()
+    with db.driver.session(database=db.database) as session:
+        plan = session.run("EXPLAIN " + cypher, params).consume().plan
+    operators, stack = [], [plan]
+    while stack:
+        node = stack.pop()
+        operators.append(node["operatorType"] if isinstance(node, dict) else node.operator_type)
+        stack.extend(node.get("children", []) if isinstance(node, dict) else node.children)
+    return [op.split("@")[0] for op in operators if "Scan" in op or "Seek" in op]
+
+
+def run_neo4j(args):
+    from neo4j_connector import neo4j_db
+    from query_neo4j import MAX_SEEDS, SEED_LOOKUP_MODES, _seed_match, find_seeds, seed_lookup_params
+
+    nodes = neo4j_db.read("MATCH (n) RETURN count(n) AS nodes")[0]["nodes"]
+    names = [r["name"] for r in neo4j_db.read(
+        "MATCH (n:Node) WHERE n.name IS NOT NULL RETURN n.name AS name LIMIT 20")]
+    queries = QUERIES + names + [name.lower() for name in names]
+    for mode in SEED_LOOKUP_MODES:
+        cypher = _seed_match(mode) + "\nRETURN elementId(startNode) AS id LIMIT $max_seeds"
+        operators = _plan_operators(cypher, dict(seed_lookup_params(queries[0]), max_seeds=MAX_SEEDS))
+        _report(f"{nodes:>7,} nodes  {mode}", measure(find_seeds, mode, queries, args.repeat),
+                f"  plan: {', '.join(operators)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed-lookup latency against graph size.")
+    parser.add_argument("--services", type=int, nargs="+", default=[1000, 5000, 20000],
+                        help="synthetic graph sizes, in services")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--neo4j", action="store_true", help="measure the configured Neo4j database instead")
+    args = parser.parse_args()
+    run_neo4j(args) if args.neo4j else run_synthetic(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# benchmarks/vector_index.py
+#
+# Recall, latency and memory of the local vector index settings (float32 / float16 /
+# int8, PCA, full-precision re-ranking, exact and IVF) against exact float32 search.
+# "scanned" is the memory every query touches; "rerank" the full-precision copy on disk,
+# of which only k * RERANK_OVERSAMPLE rows are read per query. With --neo4j the Neo4j
+# vector_index is measured as well, using the node embeddings already stored in the database.
+# The synthetic noise is isotropic, so PCA recall here is a lower bound: real ada-002
+# embeddings concentrate most of their variance in far fewer directions.
+#
+#   python -m benchmarks.vector_index --count 50000
+#   python -m benchmarks.vector_index --count 50000 --pca 256
+#   python -m benchmarks.vector_index --neo4j --queries 50
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from local_vector_index import LocalVectorIndex, build_index
+
+
+def clustered_vectors(count, dim, clusters=256, seed=0):
+    """Embeddings-like data: unit vectors scattered around random topic centres."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    vectors = centres[labels] + 0.6 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _percentile_ms(samples, q):
+    return float(np.percentile(samples, q)) * 1000
+
+
+def measure(search, queries, truth, k):
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(query)
+        latencies.append(time.perf_counter() - start)
+        recalls.append(len(set(found[:k]) & set(expected)) / len(expected))
+    return float(np.mean(recalls)), _percentile_ms(latencies, 50), _percentile_ms(latencies, 95)
+
+
+def _report(label, recall, p50, p95, footprint=None, rerank_bytes=None):
+    size = f"scanned {footprint / 2**20:8.1f} MiB" if footprint is not None else ""
+    if rerank_bytes:
+        size += f"   rerank {rerank_bytes / 2**20:8.1f} MiB"
+    print(f"{label:<34} recall@k {recall:6.3f}   p50 {p50:8.2f} ms   p95 {p95:8.2f} ms   {size}")
+
+
+def run_synthetic(args):
+    vectors = clustered_vectors(args.count, args.dim)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(args.count, size=args.queries, replace=False)]
+    # Perturb the queries (noise norm ~0.5) so they are not copies of indexed vectors
+    queries = queries + (0.5 / np.sqrt(args.dim)) * rng.standard_normal(queries.shape).astype(np.float32)
+    truth = [list(np.argsort(-(vectors @ q))[:args.k]) for q in queries]
+    ids = [str(i) for i in range(args.count)]
+
+    print(f"📦 {args.count:,} vectors x {args.dim} dims, {args.queries} queries, k={args.k}")
+    # (dtype, ivf_lists, pca_components, rerank)
+    settings = [(dtype, 0, 0, False) for dtype in ("float32", "float16", "int8")]
+    settings += [("int8", 0, 0, True)]
+    if args.pca:
+        settings += [("float32", 0, args.pca, False), ("int8", 0, args.pca, False), ("int8", 0, args.pca, True)]
+    settings += [("float32", args.ivf_lists, 0, False), ("int8", args.ivf_lists, 0, True)]
+    for dtype, ivf_lists, pca_components, rerank in settings:
+        with tempfile.TemporaryDirectory() as directory:
+            build_index(directory, ids, ids, vectors, dtype=dtype, ivf_lists=ivf_lists,
+                        pca_components=pca_components, rerank=rerank)
+            index = LocalVectorIndex(directory)
+            recall, p50, p95 = measure(
+                lambda q: list(index.search_rows(q, k=args.k, nprobe=args.nprobe)[0]), queries, truth, args.k)
+            label = f"local {dtype}" + (f" pca{pca_components}" if pca_components else "")
+            label += f" ivf{ivf_lists}/{args.nprobe}" if ivf_lists else " exact"
+            label += " +rerank" if rerank else ""
+            _report(label, recall, p50, p95, index.footprint, index.full.nbytes if index.full is not None else None)
+            del index
+
+
+def run_neo4j(args):
+    from neo4j_connector import neo4j_db
+    from local_vector_index import get_local_vector_index
+
+    index = get_local_vector_index()
+    rng = np.random.default_rng(1)
+    rows = rng.choice(len(index), size=min(args.queries, len(index)), replace=False)
+    queries = [np.asarray(index.vectors[r], dtype=np.float32) for r in rows]
+    if index.scales is not None:
+        queries = [q * index.scales[r] for q, r in zip(queries, rows)]
+    truth = [[index.ids[r] for r in index.search_rows(q, k=args.k)[0]] for q in queries]
+
+    def neo4j_search(query):
+        records = neo4j_db.stream(
+            "CALL db.index.vector.queryNodes('vector_index', $k, $embedding) "
+            "YIELD node RETURN elementId(node) AS id",
+            {"k": args.k, "embedding": query.tolist()})
+        return [r["id"] for r in records]
+
+    print(f"📦 {len(index):,} exported node embeddings ({index.dtype}), {len(queries)} queries, k={args.k}")
+    _report("local (reference)", *measure(
+        lambda q: [index.ids[r] for r in index.search_rows(q, k=args.k)[0]], queries, truth, args.k))
+    _report("neo4j vector_index", *measure(neo4j_search, queries, truth, args.k))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local vector index vs exact / Neo4j search.")
+    parser.add_argument("--count", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ivf-lists", type=int, default=256)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--pca", type=int, default=256, help="PCA dimensions to compare (0 = skip)")
+    parser.add_argument("--neo4j", action="store_true",
+                        help="compare the exported index with the live Neo4j vector_index")
+    args = parser.parse_args()
+    run_neo4j(args) if args.neo4j else run_synthetic(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# chunk_dedup.py
+
+import hashlib
+import os
+import re
+from collections import defaultdict
+
+import numpy as np
+from dotenv import load_dotenv
+
+from greek_text import normalize_name
+
+load_dotenv()
+
+# Δύο chunks θεωρούνται ίδια όταν η (εκτιμώμενη) ομοιότητα Jaccard των shingles τους φτάνει το όριο
+CHUNK_DEDUP_THRESHOLD = float(os.getenv("CHUNK_DEDUP_THRESHOLD", "0.9"))
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 16               # 16 bands x 8 rows: candidate pairs from a Jaccard of ~0.7 upwards
+SHINGLE_WORDS = 3
+
+_PRIME = (1 << 31) - 1
+_WORD = re.compile(r"\w+")
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _shingles(text):
+    """Hashes (uint32) των τριάδων λέξεων του κανονικοποιημένου κειμένου."""
+    words = _WORD.findall(normalize_name(text))
+    grams = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little") for g in grams),
+        dtype=np.uint64, count=len(grams),
+    )
+
+
+class MinHasher:
+    """MinHash υπογραφές με οικογένεια καθολικών hash (a * x + b) mod p."""
+
+    def __init__(self, permutations=MINHASH_PERMUTATIONS, seed=0):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _PRIME, size=permutations, dtype=np.uint64)
+        self.b = rng.integers(0, _PRIME, size=permutations, dtype=np.uint64)
+
+    def signature(self, text):
+        shingles = _shingles(text)
+        if len(shingles) == 0:
+            return np.full(len(self.a), _PRIME, dtype=np.uint64)
+        return ((self.a[:, None] * shingles[None, :] + self.b[:, None]) % _PRIME).min(axis=1)
+
+
+def dedup_chunks(chunks, threshold=CHUNK_DEDUP_THRESHOLD, permutations=MINHASH_PERMUTATIONS, bands=LSH_BANDS):
+    """
+    Συγχωνεύει τα ίδια και σχεδόν ίδια chunks πριν το embedding.
+
+    :param chunks: iterable από (service_id, text), με τη σειρά του καταλόγου.
+    :return: (canonical, stats). Κάθε canonical είναι {"text", "service_ids", "members"}:
+             το πρώτο chunk κάθε ομάδας και οι υπηρεσίες όλων των μελών της, με τη σειρά τους.
+             Ένα chunk συγκρίνεται μόνο με τα canonical (όχι με άλλα μέλη), ώστε οι ομάδες να
+             μην «γλιστρούν» μέσω αλυσίδων από διαδοχικά όμοια κείμενα.
+    """
+    hasher = MinHasher(permutations)
+    rows = permutations // bands
+    canonical, signatures = [], []
+    by_hash = {}                  # content hash -> canonical index (exact duplicates)
+    buckets = defaultdict(list)   # (band, band hash) -> canonical indexes
+    stats = {"chunks": 0, "exact": 0, "near": 0}
+
+    for service_id, text in chunks:
+        stats["chunks"] += 1
+        digest = content_hash(text)
+        target = by_hash.get(digest)
+        if target is not None:
+            stats["exact"] += 1
+        else:
+            signature = hasher.signature(text)
+            keys = [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(bands)]
+            candidates = {c for key in keys for c in buckets.get(key, ())}
+            best, best_score = None, threshold
+            for c in sorted(candidates):
+                score = float(np.mean(signatures[c] == signature))
+                if score >= best_score:
+                    best, best_score = c, score
+            target = best
+            if target is None:
+                target = len(canonical)
+                canonical.append({"text": text, "service_ids": {}, "members": 0})
+                signatures.append(signature)
+                for key in keys:
+                    buckets[key].append(target)
+            else:
+                stats["near"] += 1
+            by_hash[digest] = target
+
+        entry = canonical[target]
+        entry["members"] += 1
+        entry["service_ids"].setdefault(service_id)
+
+    for entry in canonical:
+        entry["service_ids"] = list(entry["service_ids"])
+    stats["canonical"] = len(canonical)
+    stats["ratio"] = 1 - len(canonical) / stats["chunks"] if stats["chunks"] else 0.0
+    return canonical, stats
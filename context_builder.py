@@ -0,0 +1,157 @@
+# context_builder.py
+
+import os
+import re
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Μέγιστο πλήθος tokens για το context του prompt (χωρίς το πρότυπο και την ερώτηση)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+# Ένα απόσπασμα εγγράφου (SIMPLE_RAG) δεν καταλαμβάνει ποτέ περισσότερα από τόσα tokens
+CHUNK_TOKEN_LIMIT = int(os.getenv("CONTEXT_CHUNK_TOKEN_LIMIT", "400"))
+TOKENIZER_MODEL = "gpt-4o"
+
+# Εγγραφές που είναι ολόκληρα κείμενα και όχι τριπλέτες (Simple RAG / Hybrid Simple + Graph)
+DOCUMENT_RELATIONSHIPS = {"SIMPLE_RAG", "—"}
+# Εγγραφές που δηλώνουν μόνο ότι ο κόμβος βρέθηκε· δεν μεταφέρουν κάποιο γεγονός στο LLM
+MATCH_RELATIONSHIPS = {"MATCHED_BY_FULLTEXT", "MATCHED_BY_VECTOR"}
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """Ο tokenizer του μοντέλου (tiktoken), ή False όταν δεν είναι διαθέσιμος."""
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.encoding_for_model(TOKENIZER_MODEL)
+            except Exception as e:
+                print(f"⚠️ tiktoken unavailable ({e}), using an approximate token count.")
+                _encoding = False
+        return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    # Προσέγγιση: το ελληνικό κείμενο σπάει σε ~2.5 χαρακτήρες ανά token
+    return -(-len(text) * 2 // 5)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    encoding = _get_encoding()
+    if encoding:
+        tokens = encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens]).rstrip() + " …"
+    max_chars = max_tokens * 5 // 2
+    return text if len(text) <= max_chars else text[:max_chars].rstrip() + " …"
+
+
+def _clean(value) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip()
+
+
+def render_triples(graph_data: list[dict]) -> str:
+    """Η αρχική μορφή του context: μία γραμμή ανά τριπλέτα, χωρίς ομαδοποίηση ή όριο."""
+    return "\n".join(
+        f"➤ **{item.get('node_1', '')}** → {item.get('relationship', '')} → **{item.get('node_2', '')}**"
+        for item in graph_data
+    )
+
+
+def _compress_document(text: str) -> str:
+    """Συμπτύσσει τα κενά και αφαιρεί επαναλαμβανόμενες γραμμές μέσα στο απόσπασμα."""
+    lines, seen = [], set()
+    for line in str(text).splitlines():
+        line = _clean(line)
+        key = line.casefold()
+        if line and key not in seen:
+            seen.add(key)
+            lines.append(line)
+    return _truncate(" ".join(lines), CHUNK_TOKEN_LIMIT)
+
+
+def _group(graph_data):
+    """
+    Ομαδοποιεί τις τριπλέτες ανά υποκείμενο, με τη σειρά της πρώτης εμφάνισης (= σειρά
+    συνάφειας των retrievers). Μέσα σε κάθε ομάδα οι ίδιες σχέσεις συγχωνεύονται σε μία γραμμή
+    και οι διπλότυπες τριπλέτες αφαιρούνται. Επιστρέφει λίστα από (header, [γραμμές σχέσεων]).
+    """
+    groups = {}
+    documents = set()
+    for item in graph_data:
+        relationship = _clean(item.get("relationship"))
+        if relationship in DOCUMENT_RELATIONSHIPS and not _clean(item.get("node_2")):
+            text = _compress_document(item.get("node_1", ""))
+            if text and text.casefold() not in documents:
+                documents.add(text.casefold())
+                groups[("doc", text)] = {"header": f"📄 {text}", "relations": {}}
+            continue
+
+        subject = _clean(item.get("node_1"))
+        if not subject:
+            continue
+        group = groups.setdefault(("node", subject.casefold()),
+                                  {"header": f"➤ **{subject}**", "relations": {}})
+        if relationship in MATCH_RELATIONSHIPS:
+            continue
+        objects = group["relations"].setdefault(relationship, {})
+        obj = _clean(item.get("node_2"))
+        if obj:
+            objects.setdefault(obj.casefold(), obj)
+
+    return [
+        (group["header"],
+         [f"  → {rel}: " + "; ".join(f"**{obj}**" for obj in objects.values())
+          for rel, objects in group["relations"].items() if objects])
+        for group in groups.values()
+    ]
+
+
+def build_context(graph_data: list[dict], token_budget: int = CONTEXT_TOKEN_BUDGET):
+    """
+    Πακετάρει τα αποτελέσματα ανάκτησης σε context που χωρά στο token_budget. Οι ομάδες
+    μπαίνουν με σειρά συνάφειας· από μια ομάδα που δεν χωρά ολόκληρη κρατούνται όσες
+    σχέσεις χωρούν, και οι υπόλοιπες ομάδες αγνοούνται μόλις εξαντληθεί το budget.
+
+    :return: (context, stats) — το stats έχει τα tokens του context, της αρχικής μορφής
+             (render_triples) και πόσα εξοικονομήθηκαν.
+    """
+    lines, used, groups_used = [], 0, 0
+    grouped = _group(graph_data)
+    for header, relation_lines in grouped:
+        cost = count_tokens(header) + 1
+        if used + cost > token_budget:
+            continue
+        lines.append(header)
+        used += cost
+        groups_used += 1
+        for line in relation_lines:
+            cost = count_tokens(line) + 1
+            if used + cost > token_budget:
+                break
+            lines.append(line)
+            used += cost
+
+    context = "\n".join(lines)
+    tokens = count_tokens(context)
+    baseline = count_tokens(render_triples(graph_data))
+    stats = {
+        "tokens": tokens,
+        "baseline_tokens": baseline,
+        "saved_tokens": baseline - tokens,
+        "budget": token_budget,
+        "triples_in": len(graph_data),
+        "groups": len(grouped),
+        "groups_used": groups_used,
+    }
+    return context, stats
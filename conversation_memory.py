@@ -0,0 +1,170 @@
+# conversation_memory.py
+
+import os
+import re
+from collections import Counter, OrderedDict
+
+from dotenv import load_dotenv
+
+from context_builder import DOCUMENT_RELATIONSHIPS, MATCH_RELATIONSHIPS
+from greek_text import normalize_name
+from query_neo4j import expand_from_seeds, find_nodes_named, full_text_seeds, MAX_SEEDS
+from tracing import span
+
+load_dotenv()
+
+# Μέγιστο πλήθος τριπλετών που κρατά μία συνεδρία· οι λιγότερο πρόσφατα χρησιμοποιημένες αποβάλλονται
+MEMORY_MAX_TRIPLES = int(os.getenv("MEMORY_MAX_TRIPLES", "500"))
+# Τόσες τοπικές τριπλέτες που ταιριάζουν στην ερώτηση αρκούν για απάντηση χωρίς επέκταση
+MEMORY_MIN_MATCHES = int(os.getenv("MEMORY_MIN_MATCHES", "5"))
+# Ένα full-text hit τουλάχιστον τόσο ισχυρό (ίδια κλίμακα με το CASCADE_MIN_SCORE), σε κόμβο
+# που δεν είναι στη μνήμη, σημαίνει νέο θέμα και όχι συνέχεια της συζήτησης
+MEMORY_NEW_TOPIC_SCORE = float(os.getenv("MEMORY_NEW_TOPIC_SCORE", "3.0"))
+MEMORY_EXPAND_BUDGET = 50     # triples fetched per incremental frontier expansion
+MEMORY_CONTEXT_TRIPLES = 100  # triples handed to the LLM for a follow-up
+
+# Λέξεις (κανονικοποιημένες) που αναφέρονται ρητά σε κάτι που ειπώθηκε ήδη στη συζήτηση
+ANAPHORA_WORDS = frozenset({
+    "αυτο", "αυτη", "αυτα", "αυτου", "αυτης", "αυτων", "αυτον", "αυτην", "αυτες", "αυτους", "αυτοι",
+    "εκει", "εκεινο", "εκεινη", "εκεινα", "εκεινου", "εκεινης",
+    "ιδιο", "ιδια", "ιδιου", "ιδιας", "επισης", "ακομα", "ακομη", "αλλο", "αλλη", "αλλες", "αλλους",
+})
+
+_WORD = re.compile(r"\w+")
+
+
+def _stems(text):
+    """Χοντρικά θέματα λέξεων (πρώτοι 6 χαρακτήρες), ώστε να ταιριάζουν οι κλίσεις των ελληνικών."""
+    return {word[:6] for word in _WORD.findall(normalize_name(text)) if len(word) >= 4}
+
+
+def _has_anaphora(text):
+    return any(word in ANAPHORA_WORDS for word in _WORD.findall(normalize_name(text)))
+
+
+def _key(triple):
+    return (triple.get("node_1"), triple.get("relationship"), triple.get("node_2"))
+
+
+class ConversationMemory:
+    """
+    Το υπογράφημα εργασίας μιας συνεδρίας: οι τριπλέτες που έχουν ήδη ανακτηθεί στη συζήτηση.
+    Οι ερωτήσεις συνέχειας απαντώνται πρώτα από εδώ και επεκτείνονται σταδιακά μόνο από το
+    σύνορο (frontier) του υπογραφήματος, αντί για νέα ανάκτηση βάθους 3 από την αρχή.
+    """
+
+    def __init__(self, max_triples=MEMORY_MAX_TRIPLES):
+        self.max_triples = max_triples
+        self._triples = OrderedDict()  # key -> (triple, stems); the order is least recently used first
+        self._degree = Counter()       # node name -> triples touching it
+        self._expanded = set()         # nodes whose neighbourhood has already been fetched
+        self._focus = set()            # nodes of the last answer
+
+    def __len__(self):
+        return len(self._triples)
+
+    def clear(self):
+        self._triples.clear()
+        self._degree.clear()
+        self._expanded.clear()
+        self._focus.clear()
+
+    @staticmethod
+    def _is_graph(triple):
+        return triple.get("relationship") not in DOCUMENT_RELATIONSHIPS | MATCH_RELATIONSHIPS
+
+    def _add(self, triple):
+        key = _key(triple)
+        if key in self._triples:
+            self._triples.move_to_end(key)
+            return False
+        self._triples[key] = (triple, _stems(" ".join(str(part or "") for part in key)))
+        if self._is_graph(triple):
+            self._degree.update(name for name in (key[0], key[2]) if name)
+        return True
+
+    def _evict(self):
+        while len(self._triples) > self.max_triples:
+            (node_1, relationship, node_2), (triple, _) = self._triples.popitem(last=False)
+            if self._is_graph(triple):
+                for name in (node_1, node_2):
+                    if name:
+                        self._degree[name] -= 1
+                        if self._degree[name] <= 0:
+                            del self._degree[name]
+                            self._expanded.discard(name)
+
+    def remember(self, triples):
+        """Προσθέτει το αποτέλεσμα μιας ανάκτησης από τη βάση· γίνεται το νέο κέντρο της συζήτησης."""
+        if not triples:
+            return
+        for triple in triples:
+            self._add(triple)
+        self._focus = {name for t in triples if self._is_graph(t) for name in (t.get("node_1"), t.get("node_2")) if name}
+        self._evict()
+
+    def is_follow_up(self, user_query):
+        """
+        Συνέχεια της συζήτησης μόνο όταν η ερώτηση δείχνει προς τη μνήμη: τουλάχιστον
+        MEMORY_MIN_MATCHES τριπλέτες ταιριάζουν στις λέξεις της ή αναφέρεται ρητά σε κάτι
+        προηγούμενο (ANAPHORA_WORDS). Ακόμη και τότε, ένα ισχυρό full-text hit σε κόμβο
+        εκτός μνήμης σημαίνει νέο θέμα. Κάθε άλλη ερώτηση πηγαίνει στον retriever του mode.
+        """
+        if not self._triples:
+            return False
+        if len(self._match(_stems(user_query))) < MEMORY_MIN_MATCHES and not _has_anaphora(user_query):
+            return False
+        seeds = full_text_seeds(user_query, top_k=1)
+        if not seeds or seeds[0]["score"] < MEMORY_NEW_TOPIC_SCORE:
+            return True
+        return seeds[0]["name"] in self._degree
+
+    def _match(self, stems):
+        # Most recently used first among equal scores
+        scored = [(len(stems & triple_stems), key) for key, (_, triple_stems) in reversed(self._triples.items())]
+        return [key for score, key in sorted(scored, key=lambda item: -item[0]) if score > 0]
+
+    def _frontier(self):
+        """Κόμβοι του κέντρου της συζήτησης που δεν έχουν επεκταθεί· πρώτα τα «φύλλα» του υπογραφήματος."""
+        candidates = [name for name in self._focus if name in self._degree and name not in self._expanded]
+        return sorted(candidates, key=lambda name: (self._degree[name], name))[:MAX_SEEDS]
+
+    def _expand_frontier(self):
+        names = self._frontier()
+        if not names:
+            return 0
+        with span("memory.expand") as s:
+            seeds = find_nodes_named(names)
+            triples = expand_from_seeds(seeds, budget=MEMORY_EXPAND_BUDGET, max_hops=1)
+            self._expanded.update(names)
+            added = sum(self._add(t) for t in triples)
+            self._focus.update(name for t in triples for name in (t["node_1"], t["node_2"]) if name)
+            self._evict()
+            s["rows"] = added
+        return added
+
+    def recall(self, user_query, limit=MEMORY_CONTEXT_TRIPLES):
+        """
+        Τριπλέτες για μια ερώτηση συνέχειας: όσες ταιριάζουν στις λέξεις της ερώτησης και μετά το
+        κέντρο της συζήτησης. Αν ταιριάζουν λιγότερες από MEMORY_MIN_MATCHES, το υπογράφημα
+        επεκτείνεται κατά ένα hop από το σύνορό του. Επιστρέφει (triples, stats).
+        """
+        stems = _stems(user_query)
+        matched = self._match(stems)
+        expanded = 0
+        if len(matched) < MEMORY_MIN_MATCHES:
+            expanded = self._expand_frontier()
+            if expanded:
+                matched = self._match(stems)
+
+        focus = [key for key, (triple, _) in self._triples.items()
+                 if self._is_graph(triple) and (key[0] in self._focus or key[2] in self._focus)]
+        keys = list(dict.fromkeys(matched + focus))[:limit]
+        for key in keys:
+            self._triples.move_to_end(key)
+        if matched:
+            self._focus = {name for key in matched[:limit] for name in (key[0], key[2])
+                           if name in self._degree}
+        stats = {"source": "memory+frontier" if expanded else "memory", "matched": len(matched),
+                 "expanded": expanded, "triples": len(keys), "memory_triples": len(self._triples)}
+        return [self._triples[key][0] for key in keys], stats
@@ -0,0 +1,161 @@
+# embedding_cache.py
+
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+
+import openai
+from dotenv import load_dotenv
+
+from startup_profile import startup_step
+
+load_dotenv()
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.sqlite")
+EMBEDDING_CACHE_MEMORY_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "10000"))
+EMBEDDING_API_BATCH_SIZE = 100
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Κανονικοποίηση κειμένου για το κλειδί της cache (NFC, συμπτυγμένα κενά)."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", str(text))).strip()
+
+
+class EmbeddingCache:
+    """
+    Cache embeddings με κλειδί (model, normalized text).
+    Μια LRU στη μνήμη μπροστά από ένα SQLite αρχείο που κρατά τα διανύσματα ως float32.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, memory_size=EMBEDDING_CACHE_MEMORY_SIZE):
+        self.path = path
+        self.memory_size = memory_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, text TEXT NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, text))"
+        )
+        self._conn.commit()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get_many(self, model, texts):
+        """Επιστρέφει dict text -> embedding για όσα κείμενα υπάρχουν στην cache."""
+        found = {}
+        with self._lock:
+            pending = []
+            for text in texts:
+                key = (model, text)
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[text] = self._lru[key]
+                    self.memory_hits += 1
+                else:
+                    pending.append(text)
+
+            # SQLite περιορίζει τον αριθμό των παραμέτρων ανά statement
+            for i in range(0, len(pending), 500):
+                part = pending[i:i + 500]
+                rows = self._conn.execute(
+                    "SELECT text, vector FROM embeddings WHERE model = ? AND text IN (%s)"
+                    % ",".join("?" * len(part)),
+                    [model, *part],
+                ).fetchall()
+                for text, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[text] = vector.tolist()
+                    self._remember(model, text, found[text])
+                    self.disk_hits += 1
+            self.misses += sum(1 for text in pending if text not in found)
+        return found
+
+    def put_many(self, model, items):
+        """Αποθηκεύει ζεύγη (text, embedding) στη μνήμη και στο δίσκο."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text, vector) VALUES (?, ?, ?)",
+                [(model, text, array("f", vector).tobytes()) for text, vector in items],
+            )
+            self._conn.commit()
+            for text, vector in items:
+                self._remember(model, text, vector)
+
+    def _remember(self, model, text, vector):
+        self._lru[(model, text)] = vector
+        self._lru.move_to_end((model, text))
+        while len(self._lru) > self.memory_size:
+            self._lru.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "lookups": lookups,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+_cache = None
+_client = None
+_init_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _cache
+    with _init_lock:
+        if _cache is None:
+            with startup_step("init embedding cache"):
+                _cache = EmbeddingCache()
+        return _cache
+
+
+def _get_client():
+    global _client
+    with _init_lock:
+        if _client is None:
+            _client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return _client
+
+
+def embed_texts(texts, model=EMBEDDING_MODEL):
+    """
+    Επιστρέφει τα embeddings των κειμένων με την ίδια σειρά.
+    Μόνο τα κείμενα που λείπουν από την cache στέλνονται στο OpenAI, και κάθε
+    διαφορετικό κείμενο στέλνεται μία φορά.
+    """
+    normalized = [normalize_text(t) for t in texts]
+    cache = get_embedding_cache()
+    found = cache.get_many(model, list(dict.fromkeys(normalized)))
+
+    missing = [t for t in dict.fromkeys(normalized) if t not in found]
+    for i in range(0, len(missing), EMBEDDING_API_BATCH_SIZE):
+        batch = missing[i:i + EMBEDDING_API_BATCH_SIZE]
+        response = _get_client().embeddings.create(input=batch, model=model)
+        vectors = [item.embedding for item in response.data]
+        cache.put_many(model, list(zip(batch, vectors)))
+        found.update(zip(batch, vectors))
+
+    return [found[t] for t in normalized]
+
+
+def embed_text(text, model=EMBEDDING_MODEL):
+    return embed_texts([text], model=model)[0]
+
+
+def cache_stats() -> dict:
+    return get_embedding_cache().stats()
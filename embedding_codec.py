@@ -0,0 +1,86 @@
+# embedding_codec.py
+
+import os
+import struct
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Μορφή αποθήκευσης των embeddings στους κόμβους της Neo4j:
+#   float64 — λίστα από floats (η αρχική μορφή και η προεπιλογή, 8 bytes / διάσταση)
+#   float32 — vector property μέσω db.create.setNodeVectorProperty (4 bytes / διάσταση, με vector_index·
+#             θέλει Neo4j >= 5.13 και μετατρέπει στο επόμενο update όλα τα υπάρχοντα embeddings)
+#   int8    — byte array με κλίμακα ανά διάνυσμα (1 byte / διάσταση, χωρίς vector_index:
+#             η αναζήτηση γίνεται από το τοπικό ευρετήριο, VECTOR_BACKEND=local)
+STORAGE_FORMATS = ("float64", "float32", "int8")
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "float64")
+
+_SCALE = struct.Struct("<f")
+
+
+def bytes_per_vector(dim, storage):
+    return {"float64": 8 * dim, "float32": 4 * dim, "int8": dim + _SCALE.size}[storage]
+
+
+def quantize_int8(vectors):
+    """Συμμετρική κβάντιση ανά γραμμή: codes (int8) και κλίμακα (float32) με vector ≈ codes * scale."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize_int8(codes, scales):
+    return np.asarray(codes, dtype=np.float32) * np.asarray(scales, dtype=np.float32)[:, None]
+
+
+def encode_int8(vector) -> bytes:
+    """Ένα διάνυσμα ως bytes: κλίμακα float32 (little-endian) και μετά τα int8 codes."""
+    codes, scales = quantize_int8(vector)
+    return _SCALE.pack(float(scales[0])) + codes[0].tobytes()
+
+
+def decode_int8(blob) -> np.ndarray:
+    blob = bytes(blob)
+    (scale,) = _SCALE.unpack_from(blob)
+    return np.frombuffer(blob, dtype=np.int8, offset=_SCALE.size).astype(np.float32) * scale
+
+
+class PCA:
+    """
+    Μείωση διαστάσεων με PCA, που εκπαιδεύεται offline σε δείγμα των embeddings και
+    αποθηκεύεται (.npz) ώστε τα ερωτήματα να προβάλλονται με τον ίδιο ακριβώς τρόπο.
+    """
+
+    def __init__(self, components, mean):
+        self.components = np.asarray(components, dtype=np.float32)  # (k, dim)
+        self.mean = np.asarray(mean, dtype=np.float32)              # (dim,)
+
+    @property
+    def n_components(self):
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(cls, vectors, n_components, sample_size=50_000, seed=0):
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False))
+        sample = np.asarray(vectors[rows], dtype=np.float32)
+        mean = sample.mean(axis=0)
+        # Right singular vectors of the centred sample are the principal axes
+        _, _, vt = np.linalg.svd(sample - mean, full_matrices=False)
+        return cls(vt[:n_components], mean)
+
+    def transform(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return (vectors - self.mean) @ self.components.T
+
+    def save(self, path):
+        np.savez(path, components=self.components, mean=self.mean)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["components"], data["mean"])
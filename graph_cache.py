@@ -0,0 +1,122 @@
+# graph_cache.py
+
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from neo4j_connector import neo4j_db
+
+load_dotenv()
+
+GRAPH_CACHE_TTL = float(os.getenv("GRAPH_CACHE_TTL", "3600"))
+GRAPH_CACHE_MAX_ENTRIES = int(os.getenv("GRAPH_CACHE_MAX_ENTRIES", "512"))
+# Πόσο συχνά ελέγχεται ο δείκτης έκδοσης του γράφου στη Neo4j
+GRAPH_VERSION_CHECK_SECONDS = float(os.getenv("GRAPH_VERSION_CHECK_SECONDS", "30"))
+
+
+def read_graph_version():
+    rows = neo4j_db.read("MATCH (v:GraphVersion {id: 'mitos'}) RETURN v.version AS version")
+    return rows[0]["version"] if rows else 0
+
+
+def bump_graph_version():
+    """Καλείται από τα scripts εισαγωγής όταν αλλάζει ο γράφος· ακυρώνει τις caches όλων των διεργασιών."""
+    rows = neo4j_db.write(
+        "MERGE (v:GraphVersion {id: 'mitos'}) "
+        "SET v.version = coalesce(v.version, 0) + 1, v.updated_at = datetime() "
+        "RETURN v.version AS version"
+    )
+    return rows[0]["version"]
+
+
+class GraphCache:
+    """
+    Cache για αναγνώσεις από τη Neo4j, κοινή για όλες τις συνεδρίες της διεργασίας.
+    Οι εγγραφές λήγουν με TTL, οι παλαιότερες αποβάλλονται (LRU) και όλες ακυρώνονται
+    όταν αλλάξει ο δείκτης έκδοσης του γράφου.
+    """
+
+    def __init__(self, ttl=GRAPH_CACHE_TTL, max_entries=GRAPH_CACHE_MAX_ENTRIES,
+                 version_check_seconds=GRAPH_VERSION_CHECK_SECONDS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_check_seconds = version_check_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked = 0.0
+        # Αυξάνεται σε κάθε άδειασμα, ώστε ένας υπολογισμός που ξεκίνησε πριν να μην αποθηκευτεί
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self._version_checked < self.version_check_seconds:
+            return
+        version = read_graph_version()
+        with self._lock:
+            self._version_checked = now
+            if version != self._version:
+                self._entries.clear()
+                self._generation += 1
+                self._version = version
+
+    def version(self):
+        """Ο δείκτης έκδοσης του γράφου, όπως ελέγχθηκε τελευταία (το πολύ κάθε version_check_seconds)."""
+        self._check_version()
+        return self._version
+
+    def get_or_compute(self, key, compute):
+        self._check_version()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        value = compute()
+        with self._lock:
+            if generation != self._generation:
+                # The graph changed (or the cache was cleared) while computing: the value may be stale
+                return value
+            self._entries[key] = (now, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "version": self._version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+graph_cache = GraphCache()
+
+
+def graph_cached(fn):
+    """Decorator: αποθηκεύει το αποτέλεσμα της fn ανά ορίσματα στην κοινή graph_cache."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (fn.__module__, fn.__qualname__, args, tuple(sorted(kwargs.items())))
+        return graph_cache.get_or_compute(key, lambda: fn(*args, **kwargs))
+    return wrapper
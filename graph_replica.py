@@ -0,0 +1,441 @@
+# graph_replica.py
+
+import argparse
+import bisect
+import json
+import mmap
+import os
+import shutil
+import threading
+import time
+from array import array
+
+import numpy as np
+from dotenv import load_dotenv
+
+from graph_cache import GRAPH_VERSION_CHECK_SECONDS, graph_cache, read_graph_version
+from greek_text import normalize_name
+from neo4j_connector import neo4j_db
+
+load_dotenv()
+
+# Φάκελος των στιγμιότυπων· το αρχείο "current" δείχνει το ενεργό (snapshot-<version>-<time>)
+GRAPH_REPLICA_DIR = os.getenv("GRAPH_REPLICA_DIR", "./graph_replica")
+_FORMAT = 1  # bump when the snapshot layout changes
+
+_EXPORT_NODES = "MATCH (n) RETURN elementId(n) AS id, n.name AS name"
+_EXPORT_RELATIONSHIPS = (
+    "MATCH (a)-[r]->(b) RETURN elementId(a) AS start, type(r) AS type, elementId(b) AS end"
+)
+# Both counts come from Neo4j's count store, without touching the graph
+_GRAPH_COUNTS = (
+    "CALL { MATCH (n) RETURN count(n) AS nodes } "
+    "CALL { MATCH ()-[r]->() RETURN count(r) AS relationships } "
+    "RETURN nodes, relationships"
+)
+
+
+def _write_strings(directory, name, strings):
+    """
+    Πίνακας συμβολοσειρών: όλες σε ένα αρχείο UTF-8 χωρισμένες με "\\n" και οι θέσεις έναρξής
+    τους (n + 1, η τελευταία είναι το τέλος). Η αναζήτηση υποσυμβολοσειράς γίνεται με ένα
+    find πάνω στο memory map και η θέση αντιστοιχίζεται σε κόμβο με searchsorted.
+    """
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(s) + 1 for s in encoded], out=offsets[1:])
+    with open(os.path.join(directory, f"{name}.bin"), "wb") as f:
+        f.write(b"".join(s + b"\n" for s in encoded))
+    np.save(os.path.join(directory, f"{name}_offsets.npy"), offsets)
+
+
+def build_replica(directory, graph_version, ids, names, starts, ends, types, rel_types):
+    """
+    Γράφει ένα στιγμιότυπο του γράφου σε μορφή CSR (compressed sparse row): κάθε σχέση
+    εμφανίζεται στη λίστα γειτνίασης και των δύο άκρων της, με την κατεύθυνσή της.
+
+    :param ids, names: elementId και όνομα (ή None) ανά κόμβο· ο δείκτης είναι η θέση στη λίστα.
+    :param starts, ends, types: αρχή, τέλος και κωδικός τύπου ανά σχέση (ακέραιοι).
+    :param rel_types: τα ονόματα των τύπων, με θέση τον κωδικό τους.
+
+    Οι γείτονες κάθε κόμβου ταξινομούνται κατά (τύπο σχέσης, όνομα γείτονα), τη σειρά με την
+    οποία το _EXPAND_HOP του query_neo4j κρατά τους πρώτους fanout ανά τύπο.
+    """
+    os.makedirs(directory, exist_ok=True)
+    count = len(names)
+    has_name = np.array([name is not None for name in names], dtype=bool)
+    names = [name if name is not None else "" for name in names]
+    normalized = [normalize_name(name) for name in names]
+
+    # Interned types are renumbered alphabetically, so comparing codes compares type names
+    type_order = sorted(range(len(rel_types)), key=lambda code: rel_types[code])
+    recode = np.empty(len(rel_types), dtype=np.int64)
+    recode[type_order] = np.arange(len(rel_types))
+    rel_types = [rel_types[code] for code in type_order]
+
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    types = recode[np.asarray(types, dtype=np.int64)] if len(types) else np.empty(0, dtype=np.int64)
+    relationships = len(starts)
+    edge = np.arange(relationships, dtype=np.int64)
+    owner = np.concatenate([starts, ends])
+    neighbor = np.concatenate([ends, starts])
+    outgoing = np.concatenate([np.ones(relationships, dtype=bool), np.zeros(relationships, dtype=bool)])
+    slot_types = np.concatenate([types, types])
+    slot_edges = np.concatenate([edge, edge])
+    # A self-loop is listed once, as outgoing, like MATCH (n)-[r]-(m) returns it
+    keep = ~((owner == neighbor) & ~outgoing)
+
+    # Neighbours without a name sort last (the expansion skips them)
+    name_rank = np.empty(count, dtype=np.int64)
+    name_rank[sorted(range(count), key=lambda n: (not has_name[n], names[n]))] = np.arange(count)
+    slots = np.flatnonzero(keep)
+    slots = slots[np.lexsort((name_rank[neighbor[slots]], slot_types[slots], owner[slots]))]
+
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owner[slots], minlength=count), out=offsets[1:])
+    type_dtype = np.min_scalar_type(max(len(rel_types) - 1, 0))
+    np.save(os.path.join(directory, "offsets.npy"), offsets)
+    np.save(os.path.join(directory, "neighbors.npy"), neighbor[slots].astype(np.int32))
+    np.save(os.path.join(directory, "rel_types.npy"), slot_types[slots].astype(type_dtype))
+    np.save(os.path.join(directory, "outgoing.npy"), outgoing[slots])
+    np.save(os.path.join(directory, "edges.npy"), slot_edges[slots].astype(np.int32))
+    np.save(os.path.join(directory, "has_name.npy"), has_name)
+
+    _write_strings(directory, "names", names)
+    _write_strings(directory, "ids", ids)
+    _write_strings(directory, "norm", normalized)
+    # Named nodes in name_norm order: the STARTS WITH lookups bisect it
+    norm_order = sorted((n for n in range(count) if has_name[n]), key=lambda n: normalized[n])
+    np.save(os.path.join(directory, "norm_order.npy"), np.array(norm_order, dtype=np.int32))
+
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"format": _FORMAT, "graph_version": graph_version, "nodes": count,
+                   "relationships": relationships, "rel_types": rel_types, "created_at": time.time()},
+                  f, ensure_ascii=False)
+
+
+def export_graph_replica(directory=None):
+    """
+    Εξάγει ολόκληρο τον γράφο από τη Neo4j σε νέο στιγμιότυπο και το κάνει ενεργό. Η έκδοση
+    διαβάζεται πριν την εξαγωγή: αν ο γράφος αλλάξει στο μεταξύ, το στιγμιότυπο είναι ήδη
+    παλιό και δεν χρησιμοποιείται. Τα παλαιότερα στιγμιότυπα διαγράφονται.
+    """
+    directory = directory or GRAPH_REPLICA_DIR
+    graph_version = read_graph_version()
+    ids, names, index = [], [], {}
+    for record in neo4j_db.stream(_EXPORT_NODES):
+        index[record["id"]] = len(ids)
+        ids.append(record["id"])
+        names.append(record["name"])
+
+    starts, ends, types = array("i"), array("i"), array("i")
+    type_codes = {}
+    for record in neo4j_db.stream(_EXPORT_RELATIONSHIPS):
+        start, end = index.get(record["start"]), index.get(record["end"])
+        if start is None or end is None:
+            continue  # endpoint created after the node pass; picked up by the next export
+        starts.append(start)
+        ends.append(end)
+        types.append(type_codes.setdefault(record["type"], len(type_codes)))
+
+    os.makedirs(directory, exist_ok=True)
+    snapshot = f"snapshot-{graph_version}-{int(time.time() * 1000)}"
+    build_replica(os.path.join(directory, snapshot), graph_version, ids, names,
+                  starts, ends, types, list(type_codes))
+    tmp_path = os.path.join(directory, "current.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(snapshot)
+    os.replace(tmp_path, os.path.join(directory, "current"))
+    for entry in os.listdir(directory):
+        if entry.startswith("snapshot-") and entry != snapshot:
+            # Still mapped by a running process (Windows); removed on a later export
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+    print(f"✅ Exported {len(ids)} nodes and {len(starts)} relationships "
+          f"(graph version {graph_version}) to {os.path.join(directory, snapshot)}.")
+    return snapshot
+
+
+def _load(directory, name):
+    # A plain ndarray view of the memory map: same pages, without np.memmap's per-item overhead
+    return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r").view(np.ndarray)
+
+
+class _Strings:
+    """Memory-mapped πίνακας συμβολοσειρών του _write_strings."""
+
+    def __init__(self, directory, name):
+        self.offsets = _load(directory, f"{name}_offsets")
+        with open(os.path.join(directory, f"{name}.bin"), "rb") as f:
+            # mmap cannot map an empty file (a graph without nodes)
+            self.blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.offsets[-1] else b""
+
+    def __getitem__(self, node):
+        return self.blob[int(self.offsets[node]):int(self.offsets[node + 1]) - 1].decode("utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def find(self, text):
+        """Οι θέσεις (αύξουσα σειρά) των συμβολοσειρών που περιέχουν το text."""
+        pattern = text.encode("utf-8")
+        hits, position = [], self.blob.find(pattern)
+        while position >= 0:
+            node = int(np.searchsorted(self.offsets, position, side="right")) - 1
+            end = int(self.offsets[node + 1]) - 1
+            if position + len(pattern) <= end:
+                hits.append(node)
+                position = end + 1  # one hit per string
+            else:
+                position += 1
+            position = self.blob.find(pattern, position)
+        return hits
+
+
+class GraphReplica:
+    """
+    Ο γράφος σε μορφή CSR, memory-mapped: επέκταση k hops, αναζήτηση κόμβων εκκίνησης και
+    γειτονιές χωρίς round-trip στη Neo4j. Οι κόμβοι αναγνωρίζονται από τη θέση τους (int).
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["format"] != _FORMAT:
+            raise RuntimeError(f"Graph replica {directory} has format {meta['format']}, expected {_FORMAT}.")
+        self.directory = directory
+        self.graph_version = meta["graph_version"]
+        self.nodes = meta["nodes"]
+        self.relationships = meta["relationships"]
+        self.rel_types = meta["rel_types"]
+        self.offsets = _load(directory, "offsets")
+        self.neighbors = _load(directory, "neighbors")
+        self.types = _load(directory, "rel_types")
+        self.outgoing = _load(directory, "outgoing")
+        self.edges = _load(directory, "edges")
+        self.has_name = _load(directory, "has_name")
+        self.norm_order = _load(directory, "norm_order")
+        self.names = _Strings(directory, "names")
+        self.ids = _Strings(directory, "ids")
+        self.normalized = _Strings(directory, "norm")
+        self._by_id = self._by_name = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def name(self, node):
+        return self.names[node] if self.has_name[node] else None
+
+    def _slots(self, node, fanout=None):
+        """(γείτονας, τύπος, εξερχόμενη, σχέση) ανά σχέση του κόμβου· με fanout έως τόσες ανά τύπο."""
+        lo, hi = int(self.offsets[node]), int(self.offsets[node + 1])
+        if fanout is not None and hi - lo > fanout:
+            # Slots are grouped by type, so only the head of every run is read
+            types = self.types[lo:hi]
+            runs = np.flatnonzero(types[1:] != types[:-1]) + 1
+            heads = np.concatenate([np.arange(s, min(s + fanout, e)) for s, e in
+                                    zip(np.r_[0, runs], np.r_[runs, hi - lo])]) + lo
+            return zip(self.neighbors[heads].tolist(), self.types[heads].tolist(),
+                       self.outgoing[heads].tolist(), self.edges[heads].tolist())
+        return zip(self.neighbors[lo:hi].tolist(), self.types[lo:hi].tolist(),
+                   self.outgoing[lo:hi].tolist(), self.edges[lo:hi].tolist())
+
+    # --- name / id lookups ---
+
+    def _dictionaries(self):
+        # Built on first use: most processes only expand from seeds found by substring search
+        with self._lock:
+            if self._by_id is None:
+                by_name = {}
+                for node in range(len(self)):
+                    if self.has_name[node]:
+                        by_name.setdefault(self.names[node], []).append(node)
+                self._by_name = by_name
+                self._by_id = {self.ids[node]: node for node in range(len(self))}
+
+    def nodes_named(self, name):
+        self._dictionaries()
+        return self._by_name.get(name, [])
+
+    def seed(self, node, score):
+        """
+        Seed του στιγμιότυπου: 'id' η θέση του κόμβου, 'element_id' το elementId του, ώστε να
+        μεταφράζεται ξανά αν στο μεταξύ αλλάξει το στιγμιότυπο ή η ανάπτυξη γυρίσει στη Neo4j.
+        """
+        return {"id": node, "element_id": self.ids[node], "name": self.names[node], "score": score}
+
+    def local_seeds(self, seeds):
+        """Seeds με elementId (από τη Neo4j ή άλλο στιγμιότυπο) σε seeds αυτού· όσα λείπουν παραλείπονται."""
+        self._dictionaries()
+        local = []
+        for seed in seeds:
+            node = self._by_id.get(seed.get("element_id", seed["id"]))
+            if node is not None:
+                local.append(dict(seed, id=node, element_id=self.ids[node]))
+        return local
+
+    def find_seeds(self, params, lookup, limit=None):
+        """
+        Οι κόμβοι εκκίνησης του get_graph_data για κάθε τρόπο του SEED_LOOKUP, από τις
+        παραμέτρους του query_neo4j.seed_lookup_params: dicts με 'id', 'name' και 'score'.
+        """
+        if lookup in ("contains", "prefix") and not params["lookup"]:
+            hits = []  # CONTAINS / STARTS WITH '' would match every node
+        elif lookup == "scan":
+            hits = [(n, 1.0) for n in self.names.find(params["user_query"]) if self.has_name[n]]
+        elif lookup == "contains":
+            hits = [(n, 1.0) for n in self.normalized.find(params["lookup"]) if self.has_name[n]]
+        elif lookup == "prefix":
+            hits = [(n, 1.0) for n in self._prefix(params["lookup"], limit)]
+        elif lookup == "token":
+            counts = {}
+            for token in params["tokens"]:
+                for n in self.normalized.find(token):
+                    if self.has_name[n]:
+                        counts[n] = counts.get(n, 0) + 1
+            hits = [(n, float(c)) for n, c in
+                    sorted(counts.items(), key=lambda item: (-item[1], len(self.normalized[item[0]]), item[0]))]
+        else:
+            raise ValueError(f"Unknown seed lookup: {lookup}")
+        if limit is not None:
+            hits = hits[:limit]
+        return [self.seed(n, score) for n, score in hits]
+
+    def _prefix(self, text, limit=None):
+        order = self.norm_order
+        hits = []
+        for i in range(bisect.bisect_left(order, text, key=lambda n: self.normalized[n]), len(order)):
+            node = int(order[i])
+            if not self.normalized[node].startswith(text) or (limit is not None and len(hits) >= limit):
+                break
+            hits.append(node)
+        return hits
+
+    # --- traversal ---
+
+    def expand_hop(self, frontier, fanout):
+        """
+        Ένα hop του query_neo4j._expand_many, με τις ίδιες γραμμές και την ίδια σειρά που
+        επιστρέφει το _EXPAND_HOP: έως fanout γείτονες με όνομα ανά κόμβο και τύπο σχέσης.
+        """
+        rows = []
+        for f in sorted(frontier, key=lambda f: (f["seed"], f["pos"])):
+            node, node_name = f["id"], self.name(f["id"])
+            by_type = {}
+            # Unnamed neighbours sort last within a type, so the first fanout slots are the named ones
+            for other, rel_type, outgoing, edge in self._slots(node, fanout):
+                taken = by_type.setdefault(rel_type, [])
+                if len(taken) >= fanout or not self.has_name[other]:
+                    continue
+                other_name = self.names[other]
+                node_1, node_2 = (node_name, other_name) if outgoing else (other_name, node_name)
+                taken.append({"seed": f["seed"], "node_1": node_1, "relationship": self.rel_types[rel_type],
+                              "node_2": node_2, "edge_id": edge, "next_id": other})
+            for rel_type in sorted(by_type):
+                rows.extend(sorted(by_type[rel_type], key=lambda row: (row["node_2"] or "", row["edge_id"])))
+        return rows
+
+    def subgraph_triples(self, seeds, limit, max_level=3):
+        """
+        Το apoc.path.subgraphAll(maxLevel, ">|<") + RETURN DISTINCT του get_graph_data: για κάθε
+        κόμβο εκκίνησης οι σχέσεις μεταξύ των κόμβων που απέχουν έως max_level hops, ως
+        (όνομα εκκίνησης, τύπος, όνομα τέλους της σχέσης). Σταματά μόλις συμπληρωθεί το limit.
+        """
+        rows, seen = [], set()
+        for seed in seeds:
+            seed_name = self.name(seed)
+            visited, frontier, edges = {seed}, [seed], set()
+            for level in range(max_level + 1):
+                next_frontier = []
+                for node in frontier:
+                    for other, rel_type, outgoing, edge in self._slots(node):
+                        if edge in edges:
+                            continue
+                        if other not in visited:
+                            # Relationships of the outermost level only join nodes already reached
+                            if level == max_level:
+                                continue
+                            visited.add(other)
+                            next_frontier.append(other)
+                        edges.add(edge)
+                        key = (seed_name, self.rel_types[rel_type], self.name(node if not outgoing else other))
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                        rows.append({"node_1": key[0], "relationship": key[1], "node_2": key[2]})
+                        if len(rows) >= limit:
+                            return rows
+                frontier = next_frontier
+        return rows
+
+    def neighborhood(self, name):
+        """Οι γείτονες με όνομα των κόμβων με αυτό το όνομα: dicts {'source', 'relationship', 'target'}."""
+        return [{"source": name, "relationship": self.rel_types[rel_type], "target": self.names[other]}
+                for node in self.nodes_named(name)
+                for other, rel_type, _, _ in self._slots(node) if self.has_name[other]]
+
+
+_replica = None
+_replica_lock = threading.Lock()
+_counts = None
+_counts_checked = 0.0
+_stale_warned = None
+
+
+def _current_snapshot(directory):
+    try:
+        with open(os.path.join(directory, "current"), encoding="utf-8") as f:
+            return os.path.join(directory, f.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def _graph_counts():
+    """Πλήθος κόμβων και σχέσεων του γράφου, ελεγμένο το πολύ κάθε GRAPH_VERSION_CHECK_SECONDS."""
+    global _counts, _counts_checked
+    now = time.monotonic()
+    if _counts is None or now - _counts_checked >= GRAPH_VERSION_CHECK_SECONDS:
+        row = neo4j_db.read(_GRAPH_COUNTS)[0]
+        _counts, _counts_checked = (row["nodes"], row["relationships"]), now
+    return _counts
+
+
+def get_graph_replica(directory=None):
+    """
+    Το ενεργό στιγμιότυπο (αυτό που δείχνει το "current"), αν είναι τρέχον, αλλιώς None.
+    Τρέχον σημαίνει ίδια έκδοση γράφου (όπως την ελέγχει η graph_cache) και ίδιο πλήθος
+    κόμβων και σχέσεων: ο δείκτης έκδοσης αλλάζει μόνο από τα scripts που τον αυξάνουν,
+    ενώ τα πλήθη πιάνουν και προσθήκες / διαγραφές που δεν τον άλλαξαν. Μια νέα εξαγωγή
+    φορτώνεται αμέσως, ακόμη και στην ίδια έκδοση.
+    """
+    global _replica, _stale_warned
+    directory = directory or GRAPH_REPLICA_DIR
+    version = graph_cache.version()
+    with _replica_lock:
+        path = _current_snapshot(directory)
+        if path is None:
+            _replica = None
+        elif _replica is None or _replica.directory != path:
+            _replica = GraphReplica(path)
+        counts = _graph_counts() if _replica is not None else None
+        if _replica is not None and _replica.graph_version == version \
+                and counts == (_replica.nodes, _replica.relationships):
+            return _replica
+        state = (path, version, counts)
+        if _stale_warned != state:
+            _stale_warned = state
+            print(f"⚠️ No current graph replica in {directory} (graph version {version}); "
+                  "using Neo4j. Run `python graph_replica.py` to export it.")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the Neo4j graph to a local CSR replica.")
+    parser.add_argument("--dir", default=GRAPH_REPLICA_DIR)
+    args = parser.parse_args()
+    export_graph_replica(args.dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+# greek_text.py
+
+import re
+import unicodedata
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_name(text: str) -> str:
+    """
+    Κανονικοποίηση ονομάτων για αναζήτηση: πεζά, χωρίς τόνους/διαλυτικά, τελικό σίγμα ως σ,
+    συμπτυγμένα κενά. Έτσι το "Πιστοποιητικό" και το "πιστοποιητικο" γίνονται ίδια.
+    """
+    decomposed = unicodedata.normalize("NFD", str(text).casefold())
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _WHITESPACE.sub(" ", stripped.replace("ς", "σ")).strip()
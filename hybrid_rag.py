@@ -1,15 +1,126 @@
-from query_neo4j import hybrid_search, full_text_search, get_graph_data
-from simple_rag import simple_rag_query, init_chroma_collection
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from query_neo4j import hybrid_search, full_text_search, get_graph_data, get_embedding, \
+    full_text_seeds, expand_from_seeds
+from simple_rag import simple_rag_query, get_collection
+from tracing import span, traced, propagate, record_span
 
-collection = init_chroma_collection()
+# Per-retriever timeouts in seconds, measured from the start of the fan-out
+RETRIEVER_TIMEOUTS = {
+    "embedding": 10.0,
+    "vector_graph": 15.0,
+    "simple": 10.0,
+    "fulltext": 5.0,
+    "graph": 15.0,
+}
 
-def hybrid_simple_graph_search(user_query, top_k=5):
-    # Simple RAG (ChromaDB)
-    simple_results = simple_rag_query(user_query, collection, top_k)
-    simple_data = [{"node_1": doc, "relationship": "SIMPLE_RAG", "node_2": ""} for doc in simple_results]
+# Cascade mode: the full-text stage is trusted when its top Lucene score is at least
+# CASCADE_MIN_SCORE and leads the runner-up by at least CASCADE_MIN_MARGIN (relative)
+CASCADE_MIN_SCORE = float(os.getenv("CASCADE_MIN_SCORE", "3.0"))
+CASCADE_MIN_MARGIN = float(os.getenv("CASCADE_MIN_MARGIN", "0.15"))
+CASCADE_GRAPH_BUDGET = 50
+RRF_K = 60
 
-    # Graph RAG (Neo4j)
-    graph_results = hybrid_search(user_query, top_k=top_k)
+# Shared pool: a stalled retriever keeps its worker busy, but never blocks the caller
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="retriever")
+# A call that missed its timeout cannot be interrupted and holds its worker until it returns.
+# At most this many such calls per retriever (and for the embedding); past that the retriever
+# is skipped until one of them finishes, so stalled backends can never take the whole pool
+RETRIEVER_MAX_ABANDONED = int(os.getenv("RETRIEVER_MAX_ABANDONED", "2"))
+_abandoned = {}  # retriever name -> timed-out calls still running
+_abandoned_lock = threading.Lock()
+
+def _embedding_task(user_query, query_embedding):
+    if query_embedding is not None:
+        return lambda: query_embedding
+    return lambda: get_embedding(user_query)
+
+def _abandon(name, future):
+    """Cancels a timed-out call that has not started, or counts it until it returns."""
+    if future.cancel():
+        return
+    with _abandoned_lock:
+        _abandoned[name] = _abandoned.get(name, 0) + 1
+
+    def release(_):
+        with _abandoned_lock:
+            _abandoned[name] -= 1
+    future.add_done_callback(release)
+
+def _stalled(name):
+    with _abandoned_lock:
+        return _abandoned.get(name, 0) >= RETRIEVER_MAX_ABANDONED
+
+def _run_retrievers(tasks, embedding_task=None, timeouts=RETRIEVER_TIMEOUTS):
+    """
+    Runs the retriever callables concurrently and collects what finishes in time.
+    Retrievers that need the query vector receive it as their only argument, so the
+    query is embedded once and shared. A retriever that fails or misses its timeout
+    contributes an empty list instead of failing the whole search, and so does one that
+    is skipped because RETRIEVER_MAX_ABANDONED of its earlier calls are still running.
+    """
+    start = time.perf_counter()
+    stalled = {name for name in [*tasks, "embedding"] if _stalled(name)}
+    if "embedding" in stalled:
+        stalled.update(name for name, (_, needs_embedding) in tasks.items() if needs_embedding)
+    results = {}
+    for name in stalled.intersection(tasks):
+        record_span(f"retriever.{name}.skipped", start, error="stalled")
+        print(f"⚠️ Retriever '{name}' skipped: {RETRIEVER_MAX_ABANDONED} earlier calls are still running.")
+        results[name] = []
+    tasks = {name: task for name, task in tasks.items() if name not in stalled}
+    if not any(needs_embedding for _, needs_embedding in tasks.values()):
+        embedding_task = None
+    embedding_future = _executor.submit(propagate(embedding_task)) if embedding_task else None
+
+    def with_embedding(fn):
+        def run():
+            remaining = timeouts["embedding"] - (time.perf_counter() - start)
+            return fn(embedding_future.result(timeout=max(remaining, 0)))
+        return run
+
+    def traced_task(name, fn):
+        def run():
+            with span(f"retriever.{name}") as s:
+                result = fn()
+                s["rows"] = len(result)
+                return result
+        return run
+
+    futures = {
+        name: _executor.submit(propagate(traced_task(name, with_embedding(fn) if needs_embedding else fn)))
+        for name, (fn, needs_embedding) in tasks.items()
+    }
+
+    for name, future in futures.items():
+        remaining = timeouts.get(name, 10.0) - (time.perf_counter() - start)
+        try:
+            results[name] = future.result(timeout=max(remaining, 0))
+        except FutureTimeout:
+            _abandon(name, future)
+            record_span(f"retriever.{name}.timeout", start, error="timeout")
+            print(f"⚠️ Retriever '{name}' timed out after {timeouts.get(name, 10.0):.1f}s, using partial results.")
+            results[name] = []
+        except Exception as e:
+            print(f"❌ Retriever '{name}' failed: {e}")
+            results[name] = []
+    if embedding_future is not None and not embedding_future.done():
+        _abandon("embedding", embedding_future)
+    return results
+
+@traced("hybrid.simple_graph")
+def hybrid_simple_graph_search(user_query, top_k=5, query_embedding=None):
+    results = _run_retrievers({
+        # Simple RAG (ChromaDB)
+        "simple": (lambda emb: simple_rag_query(user_query, get_collection(), top_k, query_embedding=emb), True),
+        # Graph RAG (Neo4j)
+        "vector_graph": (lambda emb: hybrid_search(user_query, top_k=top_k, user_embedding=emb), True),
+    }, embedding_task=_embedding_task(user_query, query_embedding))
+
+    simple_data = [{"node_1": doc, "relationship": "SIMPLE_RAG", "node_2": ""} for doc in results["simple"]]
+    graph_results = results["vector_graph"]
 
     combined_context = simple_data + graph_results
 
@@ -26,11 +137,19 @@ def hybrid_simple_graph_search(user_query, top_k=5):
 
     return unique_results
 
-def enhanced_hybrid_search(user_query, top_k=5):
-    vector_graph_results = hybrid_search(user_query, top_k)
-    simple_results = simple_rag_query(user_query, collection, top_k)
-    fulltext_results = full_text_search(user_query, top_k)
-    graph_results = get_graph_data(user_query)
+@traced("hybrid.enhanced")
+def enhanced_hybrid_search(user_query, top_k=5, query_embedding=None):
+    results = _run_retrievers({
+        "vector_graph": (lambda emb: hybrid_search(user_query, top_k, user_embedding=emb), True),
+        "simple": (lambda emb: simple_rag_query(user_query, get_collection(), top_k, query_embedding=emb), True),
+        "fulltext": (lambda: full_text_search(user_query, top_k), False),
+        "graph": (lambda: get_graph_data(user_query), False),
+    }, embedding_task=_embedding_task(user_query, query_embedding))
+
+    vector_graph_results = results["vector_graph"]
+    simple_results = results["simple"]
+    fulltext_results = results["fulltext"]
+    graph_results = results["graph"]
 
     combined_results = vector_graph_results + fulltext_results + graph_results + \
                        [{"node_1": doc, "relationship": "SIMPLE_RAG", "node_2": ""} for doc in simple_results]
@@ -46,3 +165,67 @@ def enhanced_hybrid_search(user_query, top_k=5):
             break
 
     return unique_results
+
+def reciprocal_rank_fusion(ranked_lists, k=RRF_K):
+    """
+    Merges ranked result lists with reciprocal-rank fusion: each triple scores
+    sum(1 / (k + rank)) over the lists it appears in. Returns the triples ordered by
+    that score, each with an added 'rrf_score'.
+    """
+    fused = {}
+    for results in ranked_lists:
+        for rank, item in enumerate(results, start=1):
+            key = (item["node_1"], item["relationship"], item["node_2"])
+            if key not in fused:
+                fused[key] = [0.0, item]
+            fused[key][0] += 1.0 / (k + rank)
+    ordered = sorted(fused.values(), key=lambda entry: entry[0], reverse=True)
+    return [dict(item, rrf_score=score) for score, item in ordered]
+
+@traced("hybrid.cascade")
+def cascade_search(user_query, top_k=5, min_score=None, min_margin=None, query_embedding=None):
+    """
+    Cost-aware retrieval: the full-text index runs first, and its hits seed a budgeted graph
+    expansion. Only when the full-text evidence is weak (top score below min_score, or a margin
+    over the runner-up below min_margin) does it escalate to the embedding-based retrievers
+    (vector + graph and Chroma). Every fetched list is merged with reciprocal-rank fusion.
+
+    :return: (results, stats), where stats lists the stages that ran with their time and rows.
+    """
+    min_score = CASCADE_MIN_SCORE if min_score is None else min_score
+    min_margin = CASCADE_MIN_MARGIN if min_margin is None else min_margin
+    stats = {"stages": [], "escalated": False}
+
+    def stage(name, fn):
+        start = time.perf_counter()
+        rows = fn()
+        stats["stages"].append({"stage": name, "ms": (time.perf_counter() - start) * 1000, "rows": len(rows)})
+        return rows
+
+    seeds = stage("fulltext", lambda: full_text_seeds(user_query, top_k))
+    fulltext_results = [{"node_1": s["name"], "relationship": "MATCHED_BY_FULLTEXT",
+                         "node_2": f"Score: {s['score']:.2f}", "score": s["score"]} for s in seeds]
+    graph_results = stage("graph", lambda: expand_from_seeds(seeds, budget=CASCADE_GRAPH_BUDGET))
+    ranked_lists = [fulltext_results, graph_results]
+
+    top_score = seeds[0]["score"] if seeds else 0.0
+    runner_up = seeds[1]["score"] if len(seeds) > 1 else 0.0
+    margin = (top_score - runner_up) / top_score if top_score else 0.0
+    stats.update(top_score=top_score, margin=margin)
+
+    if not seeds or top_score < min_score or margin < min_margin:
+        stats["escalated"] = True
+        start = time.perf_counter()
+        results = _run_retrievers({
+            "vector_graph": (lambda emb: hybrid_search(user_query, top_k, user_embedding=emb), True),
+            "simple": (lambda emb: simple_rag_query(user_query, get_collection(), top_k, query_embedding=emb), True),
+        }, embedding_task=_embedding_task(user_query, query_embedding))
+        simple_data = [{"node_1": doc, "relationship": "SIMPLE_RAG", "node_2": ""} for doc in results["simple"]]
+        stats["stages"].append({"stage": "vector_graph+simple", "ms": (time.perf_counter() - start) * 1000,
+                                "rows": len(results["vector_graph"]) + len(simple_data)})
+        ranked_lists += [results["vector_graph"], simple_data]
+
+    fused = reciprocal_rank_fusion(ranked_lists)[:top_k]
+    print(f"🪜 Cascade: {' → '.join(s['stage'] for s in stats['stages'])} "
+          f"(top score {top_score:.2f}, margin {margin:.2f})")
+    return fused, stats
@@ -1,22 +1,37 @@
 # llm_response.py
 
 import os
+import threading
+import time
 from dotenv import load_dotenv
-from langchain.chat_models import ChatOpenAI
 from langchain.prompts import PromptTemplate
+from startup_profile import startup_step
+from context_builder import build_context, count_tokens, CONTEXT_TOKEN_BUDGET
+from tracing import span, record_span
 
 # Load environment variables from .env
 load_dotenv()
-openai_api_key = os.getenv("OPENAI_API_KEY")
-if not openai_api_key:
-    raise ValueError("Missing OpenAI API Key. Set it in the .env file.")
-
-# Initialize the ChatOpenAI client (GPT-4o) with zero temperature for deterministic outputs
-llm = ChatOpenAI(
-    model_name="gpt-4o",
-    temperature=0,
-    openai_api_key=openai_api_key
-)
+
+_llm = None
+_llm_lock = threading.Lock()
+
+def get_llm():
+    """Το κοινό ChatOpenAI client, που δημιουργείται με την πρώτη χρήση."""
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            openai_api_key = os.getenv("OPENAI_API_KEY")
+            if not openai_api_key:
+                raise ValueError("Missing OpenAI API Key. Set it in the .env file.")
+            with startup_step("init LLM client"):
+                from langchain.chat_models import ChatOpenAI
+                # Initialize the ChatOpenAI client (GPT-4o) with zero temperature for deterministic outputs
+                _llm = ChatOpenAI(
+                    model_name="gpt-4o",
+                    temperature=0,
+                    openai_api_key=openai_api_key
+                )
+        return _llm
 
 # Prompt template for structured Greek responses
 _prompt = PromptTemplate(
@@ -34,6 +49,28 @@ _prompt = PromptTemplate(
 """
 )
 
+# Απάντηση όταν δεν υπάρχουν δεδομένα από RAG (χωρίς χρήση LLM)
+NO_DATA_RESPONSE = (
+    "Αγαπητέ χρήστη,\n\n"
+    "Η ερώτησή σας δεν συσχετίζεται με πληροφορίες που περιέχονται στον Εθνικό Κατάλογο Υπηρεσιών (ΜΗΤΩΣ), "
+    "ο οποίος αφορά αποκλειστικά δημόσιες υπηρεσίες και διοικητικές διαδικασίες στην Ελλάδα.\n\n"
+    "Παρακαλώ διατυπώστε ένα ερώτημα σχετικό με δημόσιες υπηρεσίες, πιστοποιητικά, διαδικασίες πολιτών ή συναφείς θεματικές.\n\n"
+    "Με εκτίμηση,\nΟ Ψηφιακός Βοηθός σας."
+)
+
+def build_prompt(user_query: str, graph_data: list[dict], token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """Κατασκευάζει το prompt από το ερώτημα και τα δεδομένα της βάσης γνώσης."""
+    # Ομαδοποιημένο context ανά κόμβο, με την ίδια δομή για text-only και hybrid, μέσα στο token budget
+    with span("context.build") as s:
+        context, stats = build_context(graph_data, token_budget)
+        s.update(rows=stats["triples_in"], context_tokens=stats["tokens"], saved_tokens=stats["saved_tokens"])
+    saved = stats["saved_tokens"] / stats["baseline_tokens"] if stats["baseline_tokens"] else 0.0
+    print(f"🧮 Context: {stats['tokens']} tokens ({stats['groups_used']}/{stats['groups']} groups, "
+          f"baseline {stats['baseline_tokens']}, saved {stats['saved_tokens']} / {saved:.0%})")
+
+    # Γεμίζουμε το πρότυπο
+    return _prompt.format(context=context, question=user_query)
+
 def generate_response(user_query: str, graph_data: list[dict], mode: str = "text_only") -> str:
     """
     Γεννά μια απάντηση στα ελληνικά, χρησιμοποιώντας δεδομένα από τη βάση γνώσης.
@@ -46,26 +83,42 @@ def generate_response(user_query: str, graph_data: list[dict], mode: str = "text
     
     # Αν δεν υπάρχουν δεδομένα από RAG, επιστρέφει απάντηση χωρίς χρήση LLM
     if not graph_data:
-        return (
-            "Αγαπητέ χρήστη,\n\n"
-            "Η ερώτησή σας δεν συσχετίζεται με πληροφορίες που περιέχονται στον Εθνικό Κατάλογο Υπηρεσιών (ΜΗΤΩΣ), "
-            "ο οποίος αφορά αποκλειστικά δημόσιες υπηρεσίες και διοικητικές διαδικασίες στην Ελλάδα.\n\n"
-            "Παρακαλώ διατυπώστε ένα ερώτημα σχετικό με δημόσιες υπηρεσίες, πιστοποιητικά, διαδικασίες πολιτών ή συναφείς θεματικές.\n\n"
-            "Με εκτίμηση,\nΟ Ψηφιακός Βοηθός σας."
-        )
-
-    # Κατασκευάζουμε το context με την ίδια δομή για text-only και hybrid:
-    context_lines = []
-    for item in graph_data:
-        node1 = item.get("node_1", "")
-        rel   = item.get("relationship", "")
-        node2 = item.get("node_2", "")
-        context_lines.append(f"➤ **{node1}** → {rel} → **{node2}**")
-    context = "\n".join(context_lines)
+        return NO_DATA_RESPONSE
 
-    # Γεμίζουμε το πρότυπο
-    prompt = _prompt.format(context=context, question=user_query)
+    prompt = build_prompt(user_query, graph_data)
 
     # Καλούμε το LLM για πρόβλεψη
-    response = llm.predict(prompt)
-    return response
\ No newline at end of file
+    with span("llm.predict", prompt_tokens=count_tokens(prompt)):
+        response = get_llm().predict(prompt)
+    return response
+
+def generate_response_stream(user_query: str, graph_data: list[dict], mode: str = "text_only"):
+    """
+    Όπως η generate_response, αλλά επιστρέφει τα tokens της απάντησης καθώς φτάνουν (generator).
+    Ο χρόνος μέχρι το πρώτο token (TTFT) και ο συνολικός χρόνος καταγράφονται για κάθε αίτημα.
+    """
+    if not graph_data:
+        yield NO_DATA_RESPONSE
+        return
+
+    prompt = build_prompt(user_query, graph_data)
+    prompt_tokens = count_tokens(prompt)
+
+    start = time.perf_counter()
+    ttft = None
+    chunks = 0
+    for chunk in get_llm().stream(prompt):
+        token = chunk.content
+        if not token:
+            continue
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        chunks += 1
+        yield token
+
+    total = time.perf_counter() - start
+    ttft_text = f"{ttft:.2f}s" if ttft is not None else "n/a"
+    print(f"⏱️ LLM stream: TTFT {ttft_text}, total {total:.2f}s, {chunks} chunks")
+    # Recorded without a context manager: the generator may be resumed from another context
+    record_span("llm.stream", start, prompt_tokens=prompt_tokens, chunks=chunks,
+                ttft_ms=ttft * 1000 if ttft is not None else None)
\ No newline at end of file
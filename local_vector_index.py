@@ -0,0 +1,320 @@
+# local_vector_index.py
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from embedding_codec import PCA, decode_int8, quantize_int8
+from graph_cache import GRAPH_VERSION_CHECK_SECONDS
+from neo4j_connector import neo4j_db
+
+load_dotenv()
+
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "./vector_index")
+SEARCH_BLOCK_ROWS = 65536  # rows scored per matrix product, bounds temporary memory
+# With re-ranking, the compact vectors pick k * RERANK_OVERSAMPLE candidates and only
+# those rows of the full-precision copy are read to order the final k
+RERANK_OVERSAMPLE = 4
+
+
+def _normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _kmeans(vectors, n_clusters, iterations=10, sample_size=50_000, seed=0):
+    """Spherical k-means (Lloyd) on a sample of unit vectors; returns unit centroids."""
+    rng = np.random.default_rng(seed)
+    sample_idx = rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False)
+    sample = _normalize_rows(np.asarray(vectors[np.sort(sample_idx)], dtype=np.float32))
+    centroids = sample[rng.choice(len(sample), size=n_clusters, replace=False)]
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(n_clusters):
+            members = sample[assignment == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+        centroids = _normalize_rows(centroids)
+    return centroids
+
+
+def _assign(vectors, centroids):
+    assignment = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), SEARCH_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+        assignment[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignment
+
+
+def _compact_blocks(vectors, pca):
+    """Κανονικοποιημένα (και, με PCA, προβεβλημένα και ξανά κανονικοποιημένα) μπλοκ γραμμών."""
+    for start in range(0, len(vectors), SEARCH_BLOCK_ROWS):
+        block = _normalize_rows(np.asarray(vectors[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32))
+        if pca is not None:
+            block = _normalize_rows(pca.transform(block))
+        yield start, block
+
+
+def _staged(directory, name):
+    """Προσωρινό όνομα ενός αρχείου του ευρετηρίου (ίδια κατάληξη, για τα np.save / np.savez)."""
+    stem, ext = os.path.splitext(name)
+    return os.path.join(directory, f"{stem}.tmp{ext}")
+
+
+def build_index(directory, ids, names, vectors, dtype="float32", ivf_lists=0, pca_components=0, rerank=None):
+    """
+    Γράφει το ευρετήριο στον φάκελο: τα διανύσματα (κανονικοποιημένα) ως συνεχής πίνακας .npy
+    σε float32, float16 ή int8 με κλίμακα ανά διάνυσμα, και προαιρετικά ένα IVF διαμέρισμα
+    (κεντροειδή + λίστες) για μεγάλους γράφους. Με pca_components τα διανύσματα προβάλλονται
+    πρώτα σε λιγότερες διαστάσεις (PCA εκπαιδευμένο σε δείγμα). Με rerank (προεπιλογή όταν
+    η αναπαράσταση δεν είναι πλήρης float32) κρατείται και αντίγραφο float32 πλήρων διαστάσεων
+    στον δίσκο, από το οποίο διαβάζονται μόνο οι τελικοί υποψήφιοι.
+
+    Κάθε αρχείο γράφεται με προσωρινό όνομα και αντικαθιστά το παλιό στο τέλος, με το
+    meta.json τελευταίο: μια διεργασία που έχει ήδη ανοιχτό (memory-mapped) το προηγούμενο
+    ευρετήριο το διαβάζει ανέπαφο ώσπου να φορτώσει το νέο.
+    """
+    if dtype not in ("float32", "float16", "int8"):
+        raise ValueError(f"Unsupported dtype: {dtype}")
+    os.makedirs(directory, exist_ok=True)
+    count, full_dim = vectors.shape
+    if rerank is None:
+        rerank = dtype != "float32" or bool(pca_components)
+
+    written = []
+    pca = None
+    if pca_components:
+        pca = PCA.fit(vectors, pca_components)
+        pca.save(_staged(directory, "pca.npz"))
+        written.append("pca.npz")
+    dim = pca.n_components if pca is not None else full_dim
+
+    if rerank:
+        full = np.lib.format.open_memmap(_staged(directory, "full.npy"), mode="w+",
+                                         dtype=np.float32, shape=(count, full_dim))
+        written.append("full.npy")
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            full[start:start + SEARCH_BLOCK_ROWS] = _normalize_rows(
+                np.asarray(vectors[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32))
+        full.flush()
+        del full
+
+    if dtype == "int8":
+        matrix = np.lib.format.open_memmap(_staged(directory, "vectors.npy"), mode="w+",
+                                           dtype=np.int8, shape=(count, dim))
+        scales = np.empty(count, dtype=np.float32)
+    else:
+        matrix = np.lib.format.open_memmap(_staged(directory, "vectors.npy"), mode="w+",
+                                           dtype=np.dtype(dtype), shape=(count, dim))
+    written.append("vectors.npy")
+    for start, block in _compact_blocks(vectors, pca):
+        end = start + len(block)
+        if dtype == "int8":
+            matrix[start:end], scales[start:end] = quantize_int8(block)
+        else:
+            matrix[start:end] = block
+    matrix.flush()
+    del matrix
+    if dtype == "int8":
+        np.save(_staged(directory, "scales.npy"), scales)
+        written.append("scales.npy")
+
+    if ivf_lists:
+        # Partition on the full-precision (projected) input; the row norm does not change the nearest centroid
+        partition_input = vectors if pca is None else np.concatenate([b for _, b in _compact_blocks(vectors, pca)])
+        centroids = _kmeans(partition_input, ivf_lists)
+        assignment = _assign(partition_input, centroids)
+        order = np.argsort(assignment, kind="stable").astype(np.int64)
+        offsets = np.searchsorted(assignment[order], np.arange(ivf_lists + 1)).astype(np.int64)
+        np.save(_staged(directory, "ivf_centroids.npy"), centroids.astype(np.float32))
+        np.save(_staged(directory, "ivf_order.npy"), order)
+        np.save(_staged(directory, "ivf_offsets.npy"), offsets)
+        written += ["ivf_centroids.npy", "ivf_order.npy", "ivf_offsets.npy"]
+
+    with open(_staged(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"ids": list(ids), "names": list(names), "dim": int(dim), "full_dim": int(full_dim),
+                   "count": int(count), "dtype": dtype, "ivf_lists": int(ivf_lists),
+                   "pca_components": int(pca_components), "rerank": bool(rerank), "created_at": time.time()},
+                  f, ensure_ascii=False)
+    for name in written + ["meta.json"]:
+        os.replace(_staged(directory, name), os.path.join(directory, name))
+
+
+def export_node_embeddings(directory=VECTOR_INDEX_DIR, dtype="float32", ivf_lists=0, pca_components=0, rerank=None):
+    """
+    Εξάγει τα embeddings των κόμβων (όπως τα γράφει το update_neo4j_embeddings) από τη Neo4j
+    στο τοπικό ευρετήριο. Τα διανύσματα περνούν από ένα προσωρινό memmap, ώστε να μη
+    κρατείται ποτέ ολόκληρος ο γράφος ως λίστες Python στη μνήμη. Διαβάζει και τα int8
+    embeddings (embedding_q) όσων κόμβων αποθηκεύονται έτσι.
+    """
+    header = neo4j_db.read(
+        "MATCH (n) WHERE n.embedding IS NOT NULL OR n.embedding_q IS NOT NULL WITH count(n) AS count "
+        "MATCH (m) WHERE m.embedding IS NOT NULL OR m.embedding_q IS NOT NULL "
+        "RETURN count, coalesce(size(m.embedding), size(m.embedding_q) - 4) AS dim LIMIT 1"
+    )[0]
+    if not header["count"]:
+        raise RuntimeError("No node embeddings found. Run update_neo4j_embeddings.py first.")
+
+    os.makedirs(directory, exist_ok=True)
+    staging_path = os.path.join(directory, "staging.f32")
+    staging = np.memmap(staging_path, dtype=np.float32, mode="w+", shape=(header["count"], header["dim"]))
+    ids, names = [], []
+    records = neo4j_db.stream(
+        "MATCH (n) WHERE n.embedding IS NOT NULL OR n.embedding_q IS NOT NULL "
+        "RETURN elementId(n) AS id, n.name AS name, n.embedding AS embedding, n.embedding_q AS embedding_q"
+    )
+    for row, record in enumerate(records):
+        if row >= header["count"]:
+            break  # nodes added after the count are picked up by the next export
+        if record["embedding"] is not None:
+            staging[row] = record["embedding"]
+        else:
+            staging[row] = decode_int8(record["embedding_q"])
+        ids.append(record["id"])
+        names.append(record["name"])
+
+    build_index(directory, ids, names, staging[:len(ids)], dtype=dtype, ivf_lists=ivf_lists,
+                pca_components=pca_components, rerank=rerank)
+    del staging
+    os.remove(staging_path)
+    print(f"✅ Exported {len(ids)} node embeddings to {directory} "
+          f"({dtype}, ivf_lists={ivf_lists}, pca={pca_components or 'off'}).")
+
+
+class LocalVectorIndex:
+    """Top-k αναζήτηση συνημιτόνου πάνω σε memory-mapped πίνακα embeddings."""
+
+    def __init__(self, directory=VECTOR_INDEX_DIR):
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.ids = meta["ids"]
+        self.names = meta["names"]
+        self.dtype = meta["dtype"]
+        self.vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        self.scales = (np.load(os.path.join(directory, "scales.npy"), mmap_mode="r")
+                       if self.dtype == "int8" else None)
+        self.pca = (PCA.load(os.path.join(directory, "pca.npz"))
+                    if meta.get("pca_components") else None)
+        self.full = (np.load(os.path.join(directory, "full.npy"), mmap_mode="r")
+                     if meta.get("rerank") else None)
+        self.centroids = self.ivf_order = self.ivf_offsets = None
+        if meta["ivf_lists"]:
+            self.centroids = np.load(os.path.join(directory, "ivf_centroids.npy"))
+            self.ivf_order = np.load(os.path.join(directory, "ivf_order.npy"), mmap_mode="r")
+            self.ivf_offsets = np.load(os.path.join(directory, "ivf_offsets.npy"))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _scores(self, rows, query):
+        block = np.asarray(self.vectors[rows], dtype=np.float32)
+        scores = block @ query
+        if self.scales is not None:
+            scores *= self.scales[rows]
+        return scores
+
+    @property
+    def footprint(self):
+        """Bytes των συμπαγών διανυσμάτων που σαρώνει κάθε αναζήτηση (χωρίς το αντίγραφο re-ranking)."""
+        return self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def search_rows(self, query, k=5, nprobe=8, rerank=True):
+        """Επιστρέφει (γραμμές, scores) των k πλησιέστερων, με φθίνουσα σειρά."""
+        query = np.asarray(query, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        if self.full is None or not rerank:
+            return self._search_compact(query, k, nprobe)
+
+        # Compact vectors shortlist the candidates; full precision orders the final k
+        candidates, _ = self._search_compact(query, k * RERANK_OVERSAMPLE, nprobe)
+        candidates = np.sort(candidates)  # sequential reads from the memory map
+        scores = np.asarray(self.full[candidates], dtype=np.float32) @ query
+        top = np.argsort(-scores)[:k]
+        return candidates[top], scores[top]
+
+    def _search_compact(self, query, k, nprobe):
+        if self.pca is not None:
+            query = self.pca.transform(query)
+            query = query / (np.linalg.norm(query) or 1.0)
+
+        if self.centroids is not None:
+            lists = np.argsort(-(self.centroids @ query))[:nprobe]
+            candidates = np.concatenate(
+                [self.ivf_order[self.ivf_offsets[c]:self.ivf_offsets[c + 1]] for c in lists])
+            candidates.sort()  # sequential reads from the memory map
+            scores = self._scores(candidates, query)
+            rows = candidates
+        else:
+            rows = np.arange(len(self.ids))
+            scores = np.concatenate([self._scores(slice(start, start + SEARCH_BLOCK_ROWS), query)
+                                     for start in range(0, len(self.ids), SEARCH_BLOCK_ROWS)])
+
+        k = min(k, len(scores))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return rows[top], scores[top]
+
+    def search(self, query, k=5, nprobe=8):
+        """
+        Επιστρέφει λίστα από dicts {'id', 'name', 'score'} (id = elementId του κόμβου). Το score
+        είναι (1 + cos) / 2, στην κλίμακα [0, 1] του cosine vector_index της Neo4j, ώστε τα
+        κατώφλια και η ένωση με τα full-text hits να μη εξαρτώνται από το VECTOR_BACKEND.
+        """
+        rows, scores = self.search_rows(query, k=k, nprobe=nprobe)
+        return [{"id": self.ids[r], "name": self.names[r], "score": (1.0 + float(s)) / 2}
+                for r, s in zip(rows, scores)]
+
+
+_index = None
+_index_mtime = None
+_index_checked = 0.0
+_index_lock = threading.Lock()
+
+
+def get_local_vector_index() -> LocalVectorIndex:
+    """
+    Το ευρετήριο του VECTOR_INDEX_DIR. Το πολύ κάθε GRAPH_VERSION_CHECK_SECONDS ελέγχεται αν
+    το meta.json άλλαξε (νέα εξαγωγή), οπότε το ευρετήριο ξαναφορτώνεται χωρίς επανεκκίνηση.
+    """
+    global _index, _index_mtime, _index_checked
+    meta_path = os.path.join(VECTOR_INDEX_DIR, "meta.json")
+    with _index_lock:
+        now = time.monotonic()
+        if _index is not None and now - _index_checked < GRAPH_VERSION_CHECK_SECONDS:
+            return _index
+        _index_checked = now
+        try:
+            mtime = os.stat(meta_path).st_mtime_ns
+        except FileNotFoundError:
+            if _index is not None:
+                return _index
+            raise RuntimeError(
+                f"No local vector index in {VECTOR_INDEX_DIR}. "
+                "Run `python local_vector_index.py` to export it from Neo4j."
+            )
+        if mtime != _index_mtime:
+            if _index is not None:
+                print(f"🔁 Reloading the local vector index from {VECTOR_INDEX_DIR} (new export).")
+            _index, _index_mtime = LocalVectorIndex(VECTOR_INDEX_DIR), mtime
+        return _index
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export Neo4j node embeddings to a local vector index.")
+    parser.add_argument("--dtype", choices=["float32", "float16", "int8"], default="float32")
+    parser.add_argument("--ivf-lists", type=int, default=0, help="number of IVF partitions (0 = exact search)")
+    parser.add_argument("--pca", type=int, default=0, help="reduce to this many dimensions with PCA (0 = off)")
+    parser.add_argument("--no-rerank", action="store_true",
+                        help="do not keep a full-precision copy for re-ranking the final candidates")
+    args = parser.parse_args()
+    export_node_embeddings(dtype=args.dtype, ivf_lists=args.ivf_lists, pca_components=args.pca,
+                           rerank=False if args.no_rerank else None)
@@ -0,0 +1,163 @@
+# mitos_loader.py
+
+import argparse
+import glob
+import hashlib
+import os
+import subprocess
+import sys
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from dotenv import load_dotenv
+
+from mitos_text import columns_to_embed, prepare_combined_text
+
+load_dotenv()
+
+# Φάκελος με τα CSV του ΜΙΤΟΣ και φάκελος της cache (Arrow IPC, ένα αρχείο ανά πίνακα)
+DATA_DIR = os.getenv("MITOS_DATA_DIR", r"C:\Users\sisma\OneDrive\Υπολογιστής\Mitos_Data")
+MITOS_CACHE_DIR = os.getenv("MITOS_CACHE_DIR", "./mitos_cache")
+CSV_BLOCK_BYTES = 4 << 20        # CSV text parsed per block; bounds the memory of a cold load
+SERVICE_CHUNK_SIZE = 500         # services per chunk in iter_service_texts
+_CACHE_FORMAT = 1                # bump when the cache layout changes
+
+# Μόνο οι στήλες που χρησιμοποιούνται (columns_to_embed + service_id), με ρητούς τύπους. Το
+# service_id ως κείμενο: δέχεται και αριθμητικά και αλφαριθμητικά ids, σε κάθε μπλοκ του CSV
+TABLE_SCHEMAS = {
+    table: pa.schema([("service_id", pa.string())] + [(col, pa.string()) for col in cols])
+    for table, cols in columns_to_embed.items()
+}
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_path(table, source_hash, schema, cache_dir):
+    # The key covers the source bytes and the requested columns / types
+    key = hashlib.sha256(f"{_CACHE_FORMAT}\n{source_hash}\n{schema}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{table}-{key}.arrow")
+
+
+def _build_cache(source, schema, path):
+    """Διαβάζει το CSV σε μπλοκ (μόνο τις στήλες του schema) και γράφει κάθε μπλοκ στην cache."""
+    reader = pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_BYTES),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=schema.names,
+            column_types={field.name: field.type for field in schema},
+            strings_can_be_null=True,
+        ),
+    )
+    tmp_path = path + ".tmp"
+    rows = 0
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch.select(schema.names))
+            rows += batch.num_rows
+    os.replace(tmp_path, path)
+    # Caches of older versions of the same CSV are no longer reachable
+    for stale in glob.glob(os.path.join(os.path.dirname(path), f"{os.path.basename(path).rsplit('-', 1)[0]}-*.arrow")):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass  # still mapped by another process (Windows); removed on a later build
+    return rows
+
+
+def _map_cache(path):
+    """Ο πίνακας από την cache με memory map: τα δεδομένα μένουν στο αρχείο, χωρίς αντιγραφή."""
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def load_tables(data_dir=DATA_DIR, cache_dir=MITOS_CACHE_DIR, rebuild=False):
+    """
+    Επιστρέφει {table: DataFrame} με τις στήλες του columns_to_embed. Κάθε CSV διαβάζεται μία
+    φορά ανά περιεχόμενο: η cache έχει κλειδί το hash του αρχείου, άρα ένα αλλαγμένο CSV
+    ξαναδιαβάζεται και τα υπόλοιπα φορτώνονται με memory map. Επιστρέφει και στατιστικά.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    dataframes, stats = {}, {"parsed": [], "cached": [], "mapped_bytes": 0}
+    for table, schema in TABLE_SCHEMAS.items():
+        source = os.path.join(data_dir, f"{table}.csv")
+        path = _cache_path(table, _file_hash(source), schema, cache_dir)
+        if rebuild or not os.path.exists(path):
+            _build_cache(source, schema, path)
+            stats["parsed"].append(table)
+        else:
+            stats["cached"].append(table)
+        dataframes[table] = _map_cache(path)
+        stats["mapped_bytes"] += os.path.getsize(path)
+    return dataframes, stats
+
+
+def iter_service_texts(dataframes, chunk_size=SERVICE_CHUNK_SIZE):
+    """
+    Τα κείμενα των υπηρεσιών ({service_id: text}) σε κομμάτια των chunk_size υπηρεσιών, ώστε
+    να μην υπάρχουν ποτέ στη μνήμη τα ενδιάμεσα όλου του καταλόγου μαζί.
+    """
+    service_ids = dataframes["services"]["service_id"].dropna().unique()
+    for start in range(0, len(service_ids), chunk_size):
+        chunk = set(service_ids[start:start + chunk_size])
+        subset = {table: df[df["service_id"].isin(chunk)] for table, df in dataframes.items()}
+        yield prepare_combined_text(subset, columns_to_embed)
+
+
+def _peak_rss_mib():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+def _run_phase(phase, data_dir, cache_dir):
+    """Μία μέτρηση σε καθαρή διεργασία, ώστε η μέγιστη μνήμη (peak RSS) να αφορά μόνο αυτήν."""
+    start = time.perf_counter()
+    if phase == "baseline":
+        # What simple_rag used to do: every column of every CSV through read_csv
+        dataframes = {table: pd.read_csv(os.path.join(data_dir, f"{table}.csv"), encoding="utf-8-sig")
+                      for table in TABLE_SCHEMAS}
+        mapped = 0
+    else:
+        dataframes, stats = load_tables(data_dir, cache_dir, rebuild=phase == "cold")
+        mapped = stats["mapped_bytes"]
+    loaded = time.perf_counter()
+    texts = sum(len(chunk) for chunk in iter_service_texts(dataframes))
+    done = time.perf_counter()
+    rss = _peak_rss_mib()
+    print(f"📦 {phase:<8} load {loaded - start:6.2f} s  texts {done - loaded:6.2f} s  {texts:,} services  "
+          f"peak RSS {f'{rss:.0f} MiB' if rss is not None else 'n/a'}  mapped cache {mapped / 2**20:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build / check the MITOS CSV cache and report load cost.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--cache-dir", default=MITOS_CACHE_DIR)
+    parser.add_argument("--phase", choices=["cold", "warm", "baseline"],
+                        help="measure one phase only (the default runs each in its own process)")
+    args = parser.parse_args()
+
+    if args.phase:
+        _run_phase(args.phase, args.data_dir, args.cache_dir)
+        return
+    # Load + per-service text, for the cached loader (cold, then warm) and plain read_csv
+    for phase in ("cold", "warm", "baseline"):
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--phase", phase,
+                        "--data-dir", args.data_dir, "--cache-dir", args.cache_dir], check=True)
+
+
+if __name__ == "__main__":
+    main()
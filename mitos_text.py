@@ -0,0 +1,61 @@
+# mitos_text.py
+
+import numpy as np
+import pandas as pd
+
+# Select columns for embedding
+columns_to_embed = {
+    'services': ['official_title', 'description', 'org_owner_title_el', 'url'],
+    'conditions': ['conditions_type', 'conditions_name', 'conditions_url'],
+    'evidences': ['evidence_type_el', 'evidence_description', 'evidence_note'],
+    'rules': ['rule_type', 'rule_description', 'rule_url'],
+    'steps': ['step_title', 'step_description', 'step_note'],
+    'digital_steps': ['step_digital_title', 'step_digital_implementation', 'step_digital_url'],
+    'useful_links': ['useful_link_title', 'useful_link_url'],
+    'provision_digital_locations': ['provision_digital_location_title', 'provision_digital_location_url']
+}
+
+def _join_non_null(frame, sep):
+    """Column-wise equivalent of sep.join(v for v in row if pd.notnull(v)) for every row."""
+    text = np.full(len(frame), "", dtype=object)
+    has_value = np.zeros(len(frame), dtype=bool)
+    for col in frame.columns:
+        present = frame[col].notna().to_numpy()
+        cells = np.where(present, frame[col].to_numpy(dtype=object), "").astype(str)
+        separator = np.where(has_value & present, sep, "")
+        text = text + separator.astype(object) + cells.astype(object)
+        has_value |= present
+    return pd.Series(text, index=frame.index, dtype=object)
+
+def _row_text(df, cols):
+    return _join_non_null(df[cols], " | ")
+
+def _group_join(keys, texts, sep):
+    """Joins the texts of each key with sep, keeping row order inside each group."""
+    codes, uniques = pd.factorize(keys)
+    if len(codes) == 0:
+        return pd.Series(dtype=object)
+    order = np.argsort(codes, kind="stable")
+    sorted_texts = texts.to_numpy(dtype=object)[order]
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    return pd.Series([sep.join(group) for group in np.split(sorted_texts, bounds)],
+                     index=uniques, dtype=object)
+
+# Combine textual data per service_id
+def prepare_combined_text(dataframes, columns_to_embed):
+    """
+    Returns {service_id: text}, where the text of a service is every row of every
+    table that belongs to it, in table order and then row order.
+    Each table is grouped by service_id once, instead of being filtered per service.
+    """
+    service_ids = pd.Index(dataframes['services']['service_id'].unique())
+
+    per_table = {}
+    for table, cols in columns_to_embed.items():
+        df = dataframes[table]
+        rows = df['service_id'].isin(service_ids)
+        per_table[table] = _group_join(df.loc[rows, 'service_id'], _row_text(df[rows], cols), " ")
+
+    combined = pd.DataFrame(per_table).reindex(service_ids)
+    texts = _join_non_null(combined, " ")
+    return dict(zip(service_ids, texts))
@@ -0,0 +1,91 @@
+# name_index.py
+
+import argparse
+import time
+
+from dotenv import load_dotenv
+
+from answer_cache import invalidate_answer_cache
+from graph_cache import GRAPH_VERSION_CHECK_SECONDS, bump_graph_version
+from greek_text import normalize_name
+from neo4j_connector import neo4j_db
+
+load_dotenv()
+
+# name_norm = greek_text.normalize_name(name): πεζά, χωρίς τόνους, συμπτυγμένα κενά.
+# Το text index εξυπηρετεί CONTAINS, το range index STARTS WITH και ισότητα (βλ. SEED_LOOKUP).
+NAME_INDEXES = (
+    "CREATE TEXT INDEX node_name_norm_text IF NOT EXISTS FOR (n:Node) ON (n.name_norm)",
+    "CREATE RANGE INDEX node_name_norm_range IF NOT EXISTS FOR (n:Node) ON (n.name_norm)",
+)
+
+
+_INDEXED = (
+    "SHOW INDEXES YIELD name, state WHERE name = 'node_name_norm_text' AND state = 'ONLINE' "
+    "RETURN count(*) > 0 AS indexed"
+)
+# Ολοκληρωμένο backfill: κανένας κόμβος με όνομα χωρίς name_norm ή χωρίς την ετικέτα :Node
+_BACKFILLED = (
+    "MATCH (n) WHERE n.name IS NOT NULL AND (n.name_norm IS NULL OR NOT n:Node) "
+    "RETURN count(n) = 0 AS backfilled"
+)
+
+_ready = False
+_ready_checked = None
+
+
+def ensure_name_indexes():
+    for statement in NAME_INDEXES:
+        neo4j_db.write(statement)
+
+
+def name_indexes_ready():
+    """
+    Αν ο γράφος έχει περάσει ολόκληρος από το name_index.py: το text index του name_norm
+    είναι online και κάθε κόμβος με όνομα έχει name_norm και ετικέτα :Node (ένα διακοπτόμενο
+    backfill αφήνει κόμβους που οι τρόποι name_norm δεν θα έβρισκαν). Η απάντηση, θετική ή
+    αρνητική, ξαναελέγχεται το πολύ κάθε GRAPH_VERSION_CHECK_SECONDS.
+    """
+    global _ready, _ready_checked
+    now = time.monotonic()
+    if _ready_checked is None or now - _ready_checked >= GRAPH_VERSION_CHECK_SECONDS:
+        _ready_checked = now
+        _ready = neo4j_db.read(_INDEXED)[0]["indexed"] and neo4j_db.read(_BACKFILLED)[0]["backfilled"]
+    return _ready
+
+
+def update_name_norm():
+    """
+    Γράφει το name_norm (και την ετικέτα :Node, στην οποία ορίζονται τα indexes) μόνο στους
+    κόμβους που δεν το έχουν ή που το όνομά τους άλλαξε από την προηγούμενη εκτέλεση.
+    """
+    stale = []
+    scanned = 0
+    records = neo4j_db.stream(
+        "MATCH (n) WHERE n.name IS NOT NULL "
+        "RETURN elementId(n) AS id, n.name AS name, n.name_norm AS name_norm, n:Node AS labelled"
+    )
+    for record in records:
+        scanned += 1
+        normalized = normalize_name(record["name"])
+        if record["name_norm"] != normalized or not record["labelled"]:
+            stale.append({"id": record["id"], "name": record["name"], "name_norm": normalized})
+
+    if stale:
+        neo4j_db.write_batch(
+            "UNWIND $rows AS row "
+            "MATCH (n) WHERE elementId(n) = row.id AND n.name = row.name "
+            "SET n.name_norm = row.name_norm, n:Node",
+            stale,
+        )
+        invalidate_answer_cache()
+        bump_graph_version()
+    print(f"🔤 name_norm: {scanned} nodes scanned, {len(stale)} updated.")
+    return len(stale)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the normalized node names and their indexes.")
+    parser.parse_args()
+    ensure_name_indexes()
+    update_name_norm()
@@ -1,16 +1,120 @@
-from neo4j import GraphDatabase
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from neo4j import GraphDatabase, Query, READ_ACCESS, WRITE_ACCESS
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+from startup_profile import startup_step
+
+# Errors worth retrying: the same statement may succeed on another attempt or server
+RETRYABLE_ERRORS = (ServiceUnavailable, SessionExpired, TransientError)
+
+load_dotenv()
 
 class Neo4jConnector:
-    def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+    def __init__(self, uri, user, password, database=None,
+                 max_connection_pool_size=50, fetch_size=1000,
+                 connection_timeout=30.0, connection_acquisition_timeout=60.0,
+                 max_transaction_retry_time=30.0, query_timeout=None, stream_retries=3):
+        # A neo4j:// URI enables routing, so read transactions can be served by any cluster member
+        self.driver = GraphDatabase.driver(
+            uri, auth=(user, password),
+            max_connection_pool_size=max_connection_pool_size,
+            connection_timeout=connection_timeout,
+            connection_acquisition_timeout=connection_acquisition_timeout,
+            max_transaction_retry_time=max_transaction_retry_time,
+        )
+        self.database = database
+        self.fetch_size = fetch_size
+        self.query_timeout = query_timeout
+        self.stream_retries = stream_retries
 
     def close(self):
         self.driver.close()
 
+    def _session(self, access_mode):
+        return self.driver.session(database=self.database, default_access_mode=access_mode,
+                                   fetch_size=self.fetch_size)
+
+    def _query(self, cypher_query):
+        return Query(cypher_query, timeout=self.query_timeout) if self.query_timeout else cypher_query
+
     def query(self, cypher_query, parameters=None):
-        with self.driver.session() as session:
-            result = session.run(cypher_query, parameters or {})
+        """Auto-commit query that returns the whole result as a list of Records."""
+        with self._session(WRITE_ACCESS) as session:
+            result = session.run(self._query(cypher_query), parameters or {})
             return [record for record in result]
 
-# Replace with your Neo4j credentials
-neo4j_db = Neo4jConnector(uri="bolt://localhost:7687", user="neo4j", password="...")
+    def stream(self, cypher_query, parameters=None):
+        """
+        Yields each record as a dict while the result is fetched in batches of fetch_size,
+        so large results are never held in memory at once. Runs with read access; transient
+        errors are retried as long as no record has been yielded yet.
+        """
+        attempt = 0
+        while True:
+            yielded = False
+            try:
+                with self._session(READ_ACCESS) as session:
+                    for record in session.run(self._query(cypher_query), parameters or {}):
+                        yielded = True
+                        yield record.data()
+                return
+            except RETRYABLE_ERRORS:
+                attempt += 1
+                if yielded or attempt > self.stream_retries:
+                    raise
+                time.sleep(min(0.1 * 2 ** attempt, 2.0))
+
+    def read(self, cypher_query, parameters=None):
+        """Managed read transaction, retried by the driver on transient errors."""
+        def work(tx):
+            return [record.data() for record in tx.run(self._query(cypher_query), parameters or {})]
+        with self._session(READ_ACCESS) as session:
+            return session.execute_read(work)
+
+    def write(self, cypher_query, parameters=None):
+        """Managed write transaction, retried by the driver on transient errors."""
+        def work(tx):
+            return [record.data() for record in tx.run(self._query(cypher_query), parameters or {})]
+        with self._session(WRITE_ACCESS) as session:
+            return session.execute_write(work)
+
+    def write_batch(self, cypher_query, rows, batch_size=1000, parameter="rows"):
+        """
+        Runs an UNWIND statement over rows in batches, one managed write transaction per batch.
+        The statement receives each batch as $rows (or the name given in parameter).
+        Returns the number of rows written.
+        """
+        rows = list(rows)
+        with self._session(WRITE_ACCESS) as session:
+            for i in range(0, len(rows), batch_size):
+                batch = rows[i:i + batch_size]
+                session.execute_write(lambda tx: tx.run(self._query(cypher_query), {parameter: batch}).consume())
+        return len(rows)
+
+_connector = None
+_connector_lock = threading.Lock()
+
+def get_neo4j_db():
+    """The shared connector; the driver and its pool are created on first use."""
+    global _connector
+    with _connector_lock:
+        if _connector is None:
+            with startup_step("init Neo4j driver"):
+                # Replace with your Neo4j credentials
+                _connector = Neo4jConnector(
+                    uri=os.getenv("NEO4J_URI", "bolt://localhost:7687"), user="neo4j", password="...",
+                    max_connection_pool_size=int(os.getenv("NEO4J_POOL_SIZE", "50")),
+                    fetch_size=int(os.getenv("NEO4J_FETCH_SIZE", "1000")),
+                    connection_timeout=float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "30")),
+                    query_timeout=float(os.getenv("NEO4J_QUERY_TIMEOUT")) if os.getenv("NEO4J_QUERY_TIMEOUT") else None,
+                )
+        return _connector
+
+class _LazyConnector:
+    """Stands in for the shared connector so `from neo4j_connector import neo4j_db` stays cheap."""
+    def __getattr__(self, name):
+        return getattr(get_neo4j_db(), name)
+
+neo4j_db = _LazyConnector()
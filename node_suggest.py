@@ -0,0 +1,143 @@
+# node_suggest.py
+
+import heapq
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from Levenshtein import ratio
+
+from greek_text import normalize_name
+from neo4j_connector import neo4j_db
+from startup_profile import startup_step
+
+# Πόσο συχνά (δευτερόλεπτα) συγχρονίζεται το ευρετήριο με τους κόμβους PROCESS της Neo4j
+SUGGESTION_REFRESH_SECONDS = 300
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SuggestionIndex:
+    """
+    Ευρετήριο τριγράμματων χαρακτήρων πάνω σε κανονικοποιημένα ονόματα (χωρίς τόνους, πεζά).
+    Τα υποψήφια ονόματα προκύπτουν μετρώντας κοινά τριγράμματα με το ερώτημα, και μόνο τα
+    max_candidates καλύτερα βαθμολογούνται με Levenshtein, αντί για σύγκριση με κάθε όνομα.
+    """
+
+    def __init__(self, names=(), max_candidates=200):
+        self.max_candidates = max_candidates
+        self._names = []          # id -> όνομα (None για όσα αφαιρέθηκαν)
+        self._normalized = []     # id -> κανονικοποιημένο όνομα
+        self._ids = {}            # όνομα -> id
+        self._postings = defaultdict(set)
+        self._arrays = {}         # τρίγραμμα -> np.ndarray των ids, χτίζεται με την πρώτη χρήση
+        self._lock = threading.Lock()
+        with self._lock:
+            for name in names:
+                self._add(name)
+            for gram in self._postings:
+                self._posting_array(gram)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, name):
+        with self._lock:
+            self._add(name)
+
+    def remove(self, name):
+        with self._lock:
+            self._remove(name)
+
+    def sync(self, names):
+        """Φέρνει το ευρετήριο στο δοσμένο σύνολο ονομάτων, αγγίζοντας μόνο όσα άλλαξαν."""
+        names = {name for name in names if name}
+        with self._lock:
+            added = names - self._ids.keys()
+            removed = self._ids.keys() - names
+            for name in removed:
+                self._remove(name)
+            for name in added:
+                self._add(name)
+        return len(added), len(removed)
+
+    def _add(self, name):
+        if not name or name in self._ids:
+            return
+        name_id = len(self._names)
+        normalized = normalize_name(name)
+        self._names.append(name)
+        self._normalized.append(normalized)
+        self._ids[name] = name_id
+        for gram in _trigrams(normalized):
+            self._postings[gram].add(name_id)
+            self._arrays.pop(gram, None)
+
+    def _remove(self, name):
+        name_id = self._ids.pop(name, None)
+        if name_id is None:
+            return
+        for gram in _trigrams(self._normalized[name_id]):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(name_id)
+                self._arrays.pop(gram, None)
+                if not postings:
+                    del self._postings[gram]
+        self._names[name_id] = None
+
+    def _posting_array(self, gram):
+        array = self._arrays.get(gram)
+        if array is None:
+            array = self._arrays[gram] = np.fromiter(self._postings[gram], dtype=np.int32)
+        return array
+
+    def suggest(self, query, limit=5):
+        normalized_query = normalize_name(query)
+        with self._lock:
+            grams = [g for g in _trigrams(normalized_query) if g in self._postings]
+            if not grams:
+                return []
+            # Πλήθος κοινών τριγράμματων ανά όνομα, και μόνο τα max_candidates καλύτερα
+            overlap = np.bincount(np.concatenate([self._posting_array(g) for g in grams]),
+                                  minlength=len(self._names))
+            matched = np.count_nonzero(overlap)
+            k = min(self.max_candidates, matched)
+            candidates = np.argpartition(-overlap, k - 1)[:k]
+            scored = ((ratio(normalized_query, self._normalized[i]), self._names[i]) for i in candidates)
+            return [name for _, name in heapq.nlargest(limit, scored)]
+
+
+_index = None
+_last_refresh = 0.0
+_refresh_lock = threading.Lock()
+
+
+def _process_names():
+    return (r["nodeName"] for r in neo4j_db.stream(
+        "MATCH (n:PROCESS) WHERE n.name IS NOT NULL RETURN DISTINCT n.name AS nodeName"))
+
+
+def get_suggestion_index() -> SuggestionIndex:
+    """Χτίζει το ευρετήριο με την πρώτη χρήση και το συγχρονίζει σταδιακά κάθε SUGGESTION_REFRESH_SECONDS."""
+    global _index, _last_refresh
+    with _refresh_lock:
+        now = time.monotonic()
+        if _index is None:
+            with startup_step("build suggestion index"):
+                _index = SuggestionIndex(_process_names())
+            _last_refresh = now
+        elif now - _last_refresh > SUGGESTION_REFRESH_SECONDS:
+            added, removed = _index.sync(_process_names())
+            _last_refresh = now
+            if added or removed:
+                print(f"🔄 Suggestion index: +{added} / -{removed} PROCESS nodes.")
+        return _index
+
+
+def suggest_nodes(query, limit=5):
+    return get_suggestion_index().suggest(query, limit=limit)
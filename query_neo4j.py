@@ -1,37 +1,341 @@
 from neo4j_connector import neo4j_db
-import openai
-import os
+from embedding_cache import embed_text, embed_texts
+from local_vector_index import get_local_vector_index
+from graph_replica import get_graph_replica
+from greek_text import normalize_name
+from name_index import name_indexes_ready
+from tracing import span, traced
 from dotenv import load_dotenv
+import os
+import re
+from collections import deque
 
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
-def full_text_search(user_query, top_k=5):
+# "neo4j" queries the database vector_index, "local" the exported in-process index (local_vector_index.py)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "neo4j")
+
+# "subgraph" runs apoc.path.subgraphAll with a fixed LIMIT, "budgeted" the seed-fair expansion below
+EXPANSION_MODE = os.getenv("EXPANSION_MODE", "subgraph")
+TRIPLE_BUDGET = 100      # triples per page in budgeted mode
+FANOUT_PER_TYPE = 10     # neighbours followed per node and relationship type
+MAX_HOPS = 3
+MAX_SEEDS = 20
+
+# "neo4j" expands every query with Cypher / APOC, "replica" from the in-process CSR snapshot
+# (graph_replica.py), falling back to Neo4j while the snapshot is missing or older than the graph
+GRAPH_BACKEND = os.getenv("GRAPH_BACKEND", "neo4j")
+
+# How get_graph_data finds its start nodes. "contains", "prefix" and "token" match the
+# normalized name_norm (accent / case insensitive) through the indexes on :Node (name_index.py):
+#   contains — name_norm CONTAINS the normalized query (text index)
+#   prefix   — name_norm STARTS WITH the normalized query (range index)
+#   token    — one text index seek per query word, nodes ranked by how many words they contain;
+#              matches sentence-like questions too, but costs more the more common the words are
+# "scan" is the original exact-substring CONTAINS over every node. The name_norm modes need
+# the backfill of name_index.py and fall back to "scan" (with a warning) until it is complete.
+SEED_LOOKUP = os.getenv("SEED_LOOKUP", "contains")
+SEED_LOOKUP_MODES = ("contains", "prefix", "token", "scan")
+MIN_TOKEN_LENGTH = 4   # shorter words (articles, prepositions) match most of the graph
+MAX_TOKENS = 4         # the longest, usually most selective, words of the query
+
+_WORD = re.compile(r"\w+")
+
+_backfill_warned = False
+
+def seed_lookup_params(user_query):
+    """
+    Παράμετροι του seed lookup: το κανονικοποιημένο ερώτημα και οι λέξεις του. Ένα ερώτημα
+    μόνο από σημεία στίξης δίνει κενό lookup και καμία λέξη, άρα κανέναν κόμβο εκκίνησης.
+    """
+    # Surrounding punctuation (the Greek question mark normalizes to ";") never occurs in names
+    normalized = normalize_name(user_query).strip(" ;?.!,·")
+    tokens = list(dict.fromkeys(w for w in _WORD.findall(normalized) if len(w) >= MIN_TOKEN_LENGTH))
+    tokens = sorted(tokens, key=len, reverse=True)[:MAX_TOKENS]
+    return {"user_query": user_query, "lookup": normalized, "tokens": tokens or ([normalized] if normalized else [])}
+
+def _seed_lookup(lookup=None):
+    """The lookup mode to run against Neo4j: the name_norm modes only once name_index.py has run."""
+    global _backfill_warned
+    lookup = lookup or SEED_LOOKUP
+    if lookup not in ("contains", "prefix", "token"):
+        return lookup
+    if name_indexes_ready():
+        _backfill_warned = False
+        return lookup
+    if not _backfill_warned:
+        _backfill_warned = True
+        print(f"⚠️ The :Node name_norm backfill is missing or incomplete; SEED_LOOKUP '{lookup}' "
+              "falls back to 'scan'. Run `python name_index.py` to complete it.")
+    return "scan"
+
+def _seed_match(lookup=None, ref="$"):
+    """
+    Cypher that binds startNode and its score for the lookup mode. ref is "$" for a single
+    query or "q." inside the UNWIND $queries statements of the batched variants.
+    """
+    lookup = _seed_lookup(lookup)
+    if lookup == "scan":
+        return f"""
+    MATCH (startNode)
+    WHERE startNode.name CONTAINS {ref}user_query
+    WITH startNode, 1.0 AS score"""
+    if lookup == "contains":
+        return f"""
+    MATCH (startNode:Node)
+    WHERE {ref}lookup <> '' AND startNode.name_norm CONTAINS {ref}lookup
+    WITH startNode, 1.0 AS score"""
+    if lookup == "prefix":
+        return f"""
+    MATCH (startNode:Node)
+    WHERE {ref}lookup <> '' AND startNode.name_norm STARTS WITH {ref}lookup
+    WITH startNode, 1.0 AS score"""
+    if lookup == "token":
+        return f"""
+    UNWIND {ref}tokens AS token
+    MATCH (startNode:Node)
+    WHERE startNode.name_norm CONTAINS token
+    WITH startNode, toFloat(count(*)) AS score
+    ORDER BY score DESC, size(startNode.name_norm)"""
+    raise ValueError(f"Unknown seed lookup: {lookup}")
+
+def _graph_replica():
+    return get_graph_replica() if GRAPH_BACKEND == "replica" else None
+
+@traced("neo4j.fulltext")
+def full_text_seeds(user_query, top_k=5):
+    """Full-text hits as seeds: dicts with 'id' (elementId), 'name' and the Lucene 'score'."""
     cypher_query = """
     CALL db.index.fulltext.queryNodes('mitosFullTextIndex', $user_query) 
     YIELD node, score
-    RETURN node, score
+    RETURN elementId(node) AS id, node.name AS name, score
     ORDER BY score DESC
     LIMIT $top_k
     """
-    records = neo4j_db.query(cypher_query, {
+    return list(neo4j_db.stream(cypher_query, {
     "user_query": user_query,
     "top_k": top_k
-})
-    
+}))
+
+def full_text_search(user_query, top_k=5):
     return [
         {
-            "node_1": record["node"]["name"],
+            "node_1": seed["name"],
             "relationship": "MATCHED_BY_FULLTEXT",
-            "node_2": f"Score: {record['score']:.2f}"
+            "node_2": f"Score: {seed['score']:.2f}",
+            "score": seed["score"]
         }
-        for record in records
+        for seed in full_text_seeds(user_query, top_k)
     ]
 
-def get_graph_data(user_query):
-    cypher_query = """
-    MATCH (startNode)
-    WHERE startNode.name CONTAINS $user_query
+_EXPAND_HOP = """
+    UNWIND $frontier AS f
+    MATCH (n) WHERE elementId(n) = f.id
+    MATCH (n)-[r]-(m)
+    WHERE m.name IS NOT NULL
+    WITH f, r, m ORDER BY type(r), m.name, elementId(r)
+    WITH f, type(r) AS relationship, collect([r, m])[..$fanout] AS edges
+    UNWIND edges AS edge
+    WITH f, relationship, edge[0] AS r, edge[1] AS m
+    RETURN f.seed AS seed,
+        startNode(r).name AS node_1,
+        relationship,
+        endNode(r).name AS node_2,
+        elementId(r) AS edge_id,
+        elementId(m) AS next_id
+    ORDER BY f.seed, f.pos, relationship, node_2, edge_id
+    """
+
+@traced("neo4j.expand")
+def expand_from_seeds(seeds, budget=TRIPLE_BUDGET, page=0, max_hops=MAX_HOPS, fanout=FANOUT_PER_TYPE):
+    """
+    Breadth-first expansion with an explicit triple budget instead of subgraphAll + LIMIT.
+
+    Every seed is expanded breadth-first on its own, following at most `fanout` relationships
+    per node and relationship type; each hop is one Cypher round-trip over the frontiers of
+    all seeds. The seeds' triples are interleaved round-robin (seeds by descending score),
+    skipping relationships already listed, which gives one fixed order of the query's
+    triples: page p is its slice [p * budget, (p + 1) * budget), so pages never repeat or
+    skip a triple, and every seed is only expanded as far as pages 0..p need. Within a page
+    triples are ordered by hop distance and then seed score.
+
+    :param seeds: dicts with 'id' (elementId, or a replica position with its 'element_id'),
+        'name' and optionally 'score'.
+
+    With GRAPH_BACKEND=replica the hops run over the local snapshot, without round-trips.
+    """
+    return _expand_many({0: seeds}, budget, page, max_hops, fanout)[0]
+
+@traced("neo4j.expand_many")
+def expand_from_seeds_many(seed_lists, budget=TRIPLE_BUDGET, page=0, max_hops=MAX_HOPS, fanout=FANOUT_PER_TYPE):
+    """expand_from_seeds for several queries at once: one round-trip per hop for all of them."""
+    return _expand_many(seed_lists, budget, page, max_hops, fanout)
+
+def _neo4j_hop(frontier, fanout):
+    return neo4j_db.stream(_EXPAND_HOP, {"frontier": frontier, "fanout": fanout})
+
+def _expand_many(seed_lists, budget, page, max_hops, fanout):
+    target = budget * (page + 1)
+    replica = _graph_replica()
+    expand_hop = _neo4j_hop
+    if replica is not None:
+        # Seeds found in Neo4j (full-text, vector, memory) carry elementIds; the replica uses positions
+        seed_lists = {key: replica.local_seeds(seeds) for key, seeds in seed_lists.items()}
+        expand_hop = replica.expand_hop
+    else:
+        # The replica may have gone stale since these seeds were found in it
+        seed_lists = {key: [dict(s, id=s["element_id"]) if "element_id" in s else s for s in seeds]
+                      for key, seeds in seed_lists.items()}
+    # Seeds are numbered across all queries, so one frontier can carry every query's nodes
+    streams, refs = [], {}  # ref -> per-seed expansion; key -> its refs by descending score
+    for key, seeds in seed_lists.items():
+        unique_seeds = {}
+        for s in seeds:
+            unique_seeds.setdefault(s["id"], s)
+        ranked = sorted(unique_seeds.values(), key=lambda s: -s.get("score", 1.0))
+        refs[key] = list(range(len(streams), len(streams) + len(ranked)))
+        for s in ranked:
+            streams.append({"score": s.get("score", 1.0), "triples": [], "pending": deque(),
+                            "frontier": [s["id"]], "visited": {s["id"]}, "edges": set(), "hop": 0,
+                            "cap": max(1, -(-target // len(ranked)))})
+
+    results, open_keys = {}, set(refs)
+    while open_keys:
+        _advance(streams, expand_hop, fanout, max_hops)
+        for key in list(open_keys):
+            triples, complete = _interleave([streams[ref] for ref in refs[key]], target, max_hops)
+            if complete:
+                # Stable sort: the interleaved order is kept within the same hop and score
+                results[key] = sorted(triples[page * budget:(page + 1) * budget],
+                                      key=lambda t: (t["hop"], -t["score"]))
+                open_keys.discard(key)
+            else:
+                # Every seed of the query that stopped at its cap may be needed next; one more
+                # round of _advance fetches all of them together
+                for ref in refs[key]:
+                    if len(streams[ref]["triples"]) >= streams[ref]["cap"] and not _exhausted(streams[ref], max_hops):
+                        streams[ref]["cap"] *= 2
+    return results
+
+def _exhausted(stream, max_hops):
+    return not stream["pending"] and (not stream["frontier"] or stream["hop"] >= max_hops)
+
+def _consume(stream):
+    """Τριπλέτες από τις γραμμές του τρέχοντος hop, μέχρι το cap του seed."""
+    pending = stream["pending"]
+    while pending and len(stream["triples"]) < stream["cap"]:
+        rec = pending.popleft()
+        if rec["edge_id"] in stream["edges"]:
+            continue
+        stream["edges"].add(rec["edge_id"])
+        stream["triples"].append((rec["edge_id"], {
+            "node_1": rec["node_1"], "relationship": rec["relationship"], "node_2": rec["node_2"],
+            "hop": stream["hop"], "score": stream["score"]}))
+        if rec["next_id"] not in stream["visited"]:
+            stream["visited"].add(rec["next_id"])
+            stream["frontier"].append(rec["next_id"])
+
+def _advance(streams, expand_hop, fanout, max_hops):
+    """
+    Επεκτείνει κάθε seed μέχρι να έχει cap τριπλέτες ή να εξαντληθεί, με ένα round-trip ανά
+    hop για όλα μαζί. Ένα seed που σταμάτησε στο cap συνεχίζει αργότερα από το ίδιο σημείο,
+    άρα οι τριπλέτες του είναι πάντα πρόθεμα της ίδιας σειράς BFS, όποιο κι αν είναι το cap.
+    """
+    while True:
+        frontier = []
+        for ref, stream in enumerate(streams):
+            _consume(stream)
+            if (len(stream["triples"]) < stream["cap"] and not stream["pending"]
+                    and stream["frontier"] and stream["hop"] < max_hops):
+                frontier.extend({"id": node, "seed": ref, "pos": pos} for pos, node in enumerate(stream["frontier"]))
+                stream["frontier"] = []
+                stream["hop"] += 1
+        if not frontier:
+            return
+        for rec in expand_hop(frontier, fanout):
+            streams[rec["seed"]]["pending"].append(rec)
+
+def _interleave(streams, target, max_hops):
+    """
+    Οι τριπλέτες των seeds ενός ερωτήματος εναλλάξ (μία ανά seed σε κάθε γύρο), χωρίς σχέσεις
+    που έχουν ήδη εμφανιστεί, έως target. Επιστρέφει (triples, True), ή (μερικό αποτέλεσμα,
+    False) όταν η σειρά εξαρτάται από τριπλέτες κάποιου seed που δεν έχουν ανακτηθεί ακόμη.
+    """
+    triples, edges = [], set()
+    positions = [0] * len(streams)
+    active = list(range(len(streams)))
+    while active and len(triples) < target:
+        still_active = []
+        for i in active:
+            stream = streams[i]
+            if positions[i] == len(stream["triples"]):
+                if _exhausted(stream, max_hops):
+                    continue
+                return triples, False
+            edge, triple = stream["triples"][positions[i]]
+            positions[i] += 1
+            still_active.append(i)
+            if edge not in edges:
+                edges.add(edge)
+                triples.append(triple)
+                if len(triples) >= target:
+                    break
+        active = still_active
+    return triples, True
+
+@traced("neo4j.seeds")
+def find_seeds(user_query, lookup=None, limit=MAX_SEEDS):
+    """Κόμβοι εκκίνησης για το ερώτημα: dicts με 'id' (elementId, ή θέση στο replica), 'name' και 'score'."""
+    replica = _graph_replica()
+    if replica is not None:
+        with span("replica.seeds") as s:
+            seeds = replica.find_seeds(seed_lookup_params(user_query), lookup or SEED_LOOKUP, limit)
+            s["rows"] = len(seeds)
+        return seeds
+    cypher_query = _seed_match(lookup) + """
+    RETURN elementId(startNode) AS id, startNode.name AS name, score
+    LIMIT $max_seeds
+    """
+    return list(neo4j_db.stream(cypher_query, dict(seed_lookup_params(user_query), max_seeds=limit)))
+
+@traced("neo4j.names")
+def find_nodes_named(names):
+    """
+    Οι κόμβοι με ακριβώς αυτά τα ονόματα, ως seeds με score 1.0: index seek στο name_norm,
+    ή σάρωση του name πριν από το backfill του name_index.py.
+    """
+    replica = _graph_replica()
+    if replica is not None:
+        return [replica.seed(node, 1.0) for name in names for node in replica.nodes_named(name)]
+    if name_indexes_ready():
+        cypher_query = """
+    UNWIND $names AS name
+    MATCH (n:Node) WHERE n.name_norm = name.norm AND n.name = name.name
+    RETURN elementId(n) AS id, n.name AS name, 1.0 AS score
+    """
+    else:
+        cypher_query = """
+    UNWIND $names AS name
+    MATCH (n) WHERE n.name = name.name
+    RETURN elementId(n) AS id, n.name AS name, 1.0 AS score
+    """
+    return list(neo4j_db.stream(cypher_query, {
+        "names": [{"name": name, "norm": normalize_name(name)} for name in names]}))
+
+@traced("neo4j.graph")
+def get_graph_data(user_query, expansion=None, budget=TRIPLE_BUDGET, page=0, lookup=None):
+    if (expansion or EXPANSION_MODE) == "budgeted":
+        return expand_from_seeds(find_seeds(user_query, lookup), budget=budget, page=page)
+
+    replica = _graph_replica()
+    if replica is not None:
+        with span("replica.subgraph") as s:
+            seeds = replica.find_seeds(seed_lookup_params(user_query), lookup or SEED_LOOKUP)
+            triples = replica.subgraph_triples([seed["id"] for seed in seeds], limit=200)
+            s["rows"] = len(triples)
+        return triples
+
+    cypher_query = _seed_match(lookup) + """
     CALL apoc.path.subgraphAll(startNode, {
         maxLevel: 3,
         relationshipFilter: ">|<"
@@ -44,24 +348,19 @@ def get_graph_data(user_query):
         endNode(r).name AS node_2
     LIMIT 200
     """
-    records = neo4j_db.query(cypher_query, {"user_query": user_query})
+    records = neo4j_db.stream(cypher_query, seed_lookup_params(user_query))
     return [{"node_1": rec["node_1"], "relationship": rec["relationship"], "node_2": rec["node_2"]} for rec in records]
 
 def get_embedding(text):
-    client = openai.OpenAI(api_key=openai.api_key)
-    response = client.embeddings.create(input=[text], model="text-embedding-ada-002")
-    return response.data[0].embedding
+    with span("embedding"):
+        return embed_text(text)
 
-def hybrid_search(user_query: str, top_k: int = 5) -> list[dict]:
-    user_embedding = get_embedding(user_query)
-    cypher = """
-    CALL {
-      CALL db.index.vector.queryNodes('vector_index', $top_k, $user_embedding)
-      YIELD node, score RETURN node, score
-      UNION
-      CALL db.index.fulltext.queryNodes('mitosFullTextIndex', $user_query)
-      YIELD node, score RETURN node, score
-    }
+def get_embeddings(texts):
+    """Όλα τα embeddings με ένα (batched) αίτημα, με τη σειρά των texts."""
+    with span("embedding", rows=len(texts)):
+        return embed_texts(texts)
+
+_HYBRID_EXPANSION = """
     WITH node, score ORDER BY score DESC LIMIT $top_k
     CALL apoc.path.subgraphAll(node, { maxLevel: 3, relationshipFilter: ">|<" })
     YIELD relationships
@@ -72,5 +371,280 @@ def hybrid_search(user_query: str, top_k: int = 5) -> list[dict]:
         endNode(r).name AS node_2
     LIMIT 100
     """
-    records = neo4j_db.query(cypher, {"top_k": top_k, "user_embedding": user_embedding, "user_query": user_query})
+
+_HYBRID_SEEDS = """
+    WITH node, score ORDER BY score DESC LIMIT $top_k
+    RETURN elementId(node) AS id, node.name AS name, score
+    """
+
+@traced("neo4j.hybrid")
+def hybrid_search(user_query: str, top_k: int = 5, user_embedding: list[float] | None = None,
+                  backend: str | None = None, expansion: str | None = None,
+                  budget: int = TRIPLE_BUDGET, page: int = 0) -> list[dict]:
+    if user_embedding is None:
+        user_embedding = get_embedding(user_query)
+    backend = backend or VECTOR_BACKEND
+
+    if backend == "local":
+        # Vector top-k is answered in-process; only the matching element ids travel over Bolt
+        with span("local_vector.search") as s:
+            hits = get_local_vector_index().search(user_embedding, k=top_k)
+            s["rows"] = len(hits)
+        seed_query = """
+    CALL {
+      UNWIND $hits AS hit
+      MATCH (node) WHERE elementId(node) = hit.id
+      RETURN node, hit.score AS score
+      UNION
+      CALL db.index.fulltext.queryNodes('mitosFullTextIndex', $user_query)
+      YIELD node, score RETURN node, score
+    }"""
+        params = {"top_k": top_k, "user_query": user_query,
+                  "hits": [{"id": h["id"], "score": h["score"]} for h in hits]}
+    else:
+        seed_query = """
+    CALL {
+      CALL db.index.vector.queryNodes('vector_index', $top_k, $user_embedding)
+      YIELD node, score RETURN node, score
+      UNION
+      CALL db.index.fulltext.queryNodes('mitosFullTextIndex', $user_query)
+      YIELD node, score RETURN node, score
+    }"""
+        params = {"top_k": top_k, "user_embedding": user_embedding, "user_query": user_query}
+
+    budgeted = (expansion or EXPANSION_MODE) == "budgeted"
+    replica = _graph_replica()
+    if budgeted or replica is not None:
+        with span("neo4j.hybrid_seeds") as s:
+            seeds = list(neo4j_db.stream(seed_query + _HYBRID_SEEDS, params))
+            s["rows"] = len(seeds)
+        if budgeted:
+            return expand_from_seeds(seeds, budget=budget, page=page)
+        # Only the index lookups go to Neo4j; subgraphAll runs over the replica
+        with span("replica.subgraph") as s:
+            triples = replica.subgraph_triples([seed["id"] for seed in replica.local_seeds(seeds)], limit=100)
+            s["rows"] = len(triples)
+        return triples
+
+    records = neo4j_db.stream(seed_query + _HYBRID_EXPANSION, params)
     return [{"node_1": rec["node_1"], "relationship": rec["relationship"], "node_2": rec["node_2"]} for rec in records]
+
+
+# --- Batched variants: one embedding request and one Cypher statement for many queries ---
+#
+# Every query becomes a map q = {key, text[, embedding | hits]} of $queries, the per-query
+# work runs in a CALL {} subquery, and each row carries q.key back. The results are
+# {query: rows}; repeated queries are retrieved once.
+
+_FULLTEXT_MANY = """
+    UNWIND $queries AS q
+    CALL {
+      WITH q
+      CALL db.index.fulltext.queryNodes('mitosFullTextIndex', q.text)
+      YIELD node, score
+      RETURN node, score
+      ORDER BY score DESC
+      LIMIT $top_k
+    }
+    RETURN q.key AS key, elementId(node) AS id, node.name AS name, score
+    """
+
+_SUBGRAPH_MANY = """
+    UNWIND $queries AS q
+    CALL {
+      WITH q%s
+      CALL apoc.path.subgraphAll(startNode, {
+          maxLevel: 3,
+          relationshipFilter: ">|<"
+      })
+      YIELD relationships
+      UNWIND relationships AS r
+      WITH DISTINCT startNode.name AS node_1, type(r) AS relationship, endNode(r).name AS node_2
+      RETURN node_1, relationship, node_2
+      LIMIT 200
+    }
+    RETURN q.key AS key, node_1, relationship, node_2
+    """
+
+_SEEDS_MANY = """
+    UNWIND $queries AS q
+    CALL {
+      WITH q%s
+      RETURN startNode, score
+      LIMIT $max_seeds
+    }
+    RETURN q.key AS key, elementId(startNode) AS id, startNode.name AS name, score
+    """
+
+_HYBRID_VECTOR_MANY = """
+        WITH q
+        CALL db.index.vector.queryNodes('vector_index', $top_k, q.embedding)
+        YIELD node, score RETURN node, score"""
+
+_HYBRID_LOCAL_MANY = """
+        WITH q
+        UNWIND q.hits AS hit
+        MATCH (node) WHERE elementId(node) = hit.id
+        RETURN node, hit.score AS score"""
+
+_HYBRID_MANY = """
+    UNWIND $queries AS q
+    CALL {
+      WITH q
+      CALL {%s
+        UNION
+        WITH q
+        CALL db.index.fulltext.queryNodes('mitosFullTextIndex', q.text)
+        YIELD node, score RETURN node, score
+      }
+      WITH node, score ORDER BY score DESC LIMIT $top_k
+      %s
+    }
+    %s
+    """
+
+_HYBRID_EXPANSION_MANY = (
+    """CALL apoc.path.subgraphAll(node, { maxLevel: 3, relationshipFilter: ">|<" })
+      YIELD relationships
+      UNWIND relationships AS r
+      WITH DISTINCT node.name AS node_1, type(r) AS relationship, endNode(r).name AS node_2
+      RETURN node_1, relationship, node_2
+      LIMIT 100""",
+    "RETURN q.key AS key, node_1, relationship, node_2",
+)
+
+_HYBRID_SEEDS_MANY = (
+    "RETURN node, score",
+    "RETURN q.key AS key, elementId(node) AS id, node.name AS name, score",
+)
+
+def _by_query(queries, records, row):
+    """Μοιράζει τις γραμμές του batched ερωτήματος ανά query, κρατώντας τη σειρά τους."""
+    grouped = {key: [] for key in range(len(queries))}
+    for rec in records:
+        grouped[rec["key"]].append(row(rec))
+    return {query: grouped[key] for key, query in enumerate(queries)}
+
+def _triple(rec):
+    return {"node_1": rec["node_1"], "relationship": rec["relationship"], "node_2": rec["node_2"]}
+
+def _seed(rec):
+    return {"id": rec["id"], "name": rec["name"], "score": rec["score"]}
+
+@traced("neo4j.fulltext_many")
+def full_text_seeds_many(queries, top_k=5):
+    queries = list(dict.fromkeys(queries))
+    records = neo4j_db.stream(_FULLTEXT_MANY, {
+        "queries": [{"key": key, "text": text} for key, text in enumerate(queries)],
+        "top_k": top_k,
+    })
+    return _by_query(queries, records, _seed)
+
+def full_text_search_many(queries, top_k=5):
+    return {
+        query: [
+            {
+                "node_1": seed["name"],
+                "relationship": "MATCHED_BY_FULLTEXT",
+                "node_2": f"Score: {seed['score']:.2f}",
+                "score": seed["score"]
+            }
+            for seed in seeds
+        ]
+        for query, seeds in full_text_seeds_many(queries, top_k).items()
+    }
+
+def _indent(cypher, spaces=4):
+    return cypher.replace("\n", "\n" + " " * spaces)
+
+@traced("neo4j.graph_many")
+def get_graph_data_many(queries, expansion=None, budget=TRIPLE_BUDGET, page=0, lookup=None):
+    queries = list(dict.fromkeys(queries))
+    budgeted = (expansion or EXPANSION_MODE) == "budgeted"
+    replica = _graph_replica()
+    if replica is not None:
+        # Every lookup and expansion is local, so there is no round-trip left to batch
+        with span("replica.graph_many") as s:
+            seeds = {text: replica.find_seeds(seed_lookup_params(text), lookup or SEED_LOOKUP,
+                                              MAX_SEEDS if budgeted else None) for text in queries}
+            if budgeted:
+                return expand_from_seeds_many(seeds, budget=budget, page=page)
+            triples = {text: replica.subgraph_triples([seed["id"] for seed in found], limit=200)
+                       for text, found in seeds.items()}
+            s["rows"] = sum(len(v) for v in triples.values())
+        return triples
+
+    params = {"queries": [dict(seed_lookup_params(text), key=key) for key, text in enumerate(queries)]}
+    seed_match = _indent(_seed_match(lookup, ref="q."))
+    if budgeted:
+        with span("neo4j.seeds_many") as s:
+            records = neo4j_db.stream(_SEEDS_MANY % seed_match, dict(params, max_seeds=MAX_SEEDS))
+            seeds = _by_query(queries, records, _seed)
+            s["rows"] = sum(len(v) for v in seeds.values())
+        return expand_from_seeds_many(seeds, budget=budget, page=page)
+
+    return _by_query(queries, neo4j_db.stream(_SUBGRAPH_MANY % seed_match, params), _triple)
+
+@traced("neo4j.hybrid_many")
+def hybrid_search_many(queries: list[str], top_k: int = 5, embeddings: list[list[float]] | None = None,
+                       backend: str | None = None, expansion: str | None = None,
+                       budget: int = TRIPLE_BUDGET, page: int = 0) -> dict[str, list[dict]]:
+    """
+    hybrid_search για πολλά ερωτήματα: ένα batched αίτημα embeddings και ένα Cypher round-trip
+    (ανά hop στο budgeted expansion) για όλο το batch. Επιστρέφει {query: triples}.
+    """
+    if embeddings is not None:
+        by_text = dict(zip(queries, embeddings))
+        queries = list(by_text)
+        embeddings = [by_text[q] for q in queries]
+    else:
+        queries = list(dict.fromkeys(queries))
+        embeddings = get_embeddings(queries)
+    backend = backend or VECTOR_BACKEND
+
+    if backend == "local":
+        with span("local_vector.search", rows=0) as s:
+            index = get_local_vector_index()
+            batch = []
+            for key, (text, embedding) in enumerate(zip(queries, embeddings)):
+                hits = index.search(embedding, k=top_k)
+                s["rows"] += len(hits)
+                batch.append({"key": key, "text": text,
+                              "hits": [{"id": h["id"], "score": h["score"]} for h in hits]})
+        vector_branch = _HYBRID_LOCAL_MANY
+    else:
+        batch = [{"key": key, "text": text, "embedding": embedding}
+                 for key, (text, embedding) in enumerate(zip(queries, embeddings))]
+        vector_branch = _HYBRID_VECTOR_MANY
+    params = {"queries": batch, "top_k": top_k}
+
+    budgeted = (expansion or EXPANSION_MODE) == "budgeted"
+    replica = _graph_replica()
+    if budgeted or replica is not None:
+        with span("neo4j.hybrid_seeds_many") as s:
+            seeds = _by_query(queries, neo4j_db.stream(_HYBRID_MANY % ((vector_branch,) + _HYBRID_SEEDS_MANY), params), _seed)
+            s["rows"] = sum(len(v) for v in seeds.values())
+        if budgeted:
+            return expand_from_seeds_many(seeds, budget=budget, page=page)
+        with span("replica.subgraph") as s:
+            triples = {text: replica.subgraph_triples([seed["id"] for seed in replica.local_seeds(found)], limit=100)
+                       for text, found in seeds.items()}
+            s["rows"] = sum(len(v) for v in triples.values())
+        return triples
+
+    records = neo4j_db.stream(_HYBRID_MANY % ((vector_branch,) + _HYBRID_EXPANSION_MANY), params)
+    return _by_query(queries, records, _triple)
+
+@traced("neo4j.neighborhood")
+def get_node_neighborhood(selected_node):
+    """Οι γείτονες με όνομα ενός κόμβου, για την οπτικοποίηση: dicts {'source', 'relationship', 'target'}."""
+    replica = _graph_replica()
+    if replica is not None:
+        return replica.neighborhood(selected_node)
+    query = """
+        MATCH (n)-[r]-(m)
+        WHERE n.name = $selected_node AND m.name IS NOT NULL
+        RETURN n.name AS source, type(r) AS relationship, m.name AS target
+    """
+    return [{"source": rec["source"], "relationship": rec["relationship"], "target": rec["target"]}
+            for rec in neo4j_db.stream(query, {"selected_node": selected_node})]
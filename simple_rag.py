@@ -1,11 +1,21 @@
 # simple_rag.py
 
 import os
+import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import chromadb
-from chromadb.utils import embedding_functions
+from chromadb.api.types import EmbeddingFunction
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from dotenv import load_dotenv
+from embedding_cache import embed_texts, cache_stats, EMBEDDING_MODEL
+from mitos_loader import DATA_DIR, load_tables, iter_service_texts
+from chunk_dedup import content_hash, dedup_chunks
+from answer_cache import invalidate_answer_cache
+from startup_profile import startup_step
+from tracing import traced
 
 # Load environment variables
 load_dotenv()
@@ -14,93 +24,184 @@ openai_api_key = os.getenv("OPENAI_API_KEY")
 if not openai_api_key:
     raise ValueError("Missing OpenAI API Key in the .env file.")
 
-# Paths and setup
-DATA_DIR = r"C:\Users\sisma\OneDrive\Υπολογιστής\Mitos_Data"
+# Paths and setup (the CSV folder is MITOS_DATA_DIR, see mitos_loader.py)
 CHROMA_DB_PATH = "./chromadb_db"
 
-# Load CSV files into DataFrames
-tables = [
-    "services.csv",
-    "conditions.csv",
-    "evidences.csv",
-    "rules.csv",
-    "steps.csv",
-    "digital_steps.csv",
-    "useful_links.csv",
-    "provision_digital_locations.csv"
-]
-
-dataframes = {name.split('.')[0]: pd.read_csv(os.path.join(DATA_DIR, name), encoding='utf-8-sig')
-              for name in tables}
-
-# Select columns for embedding
-columns_to_embed = {
-    'services': ['official_title', 'description', 'org_owner_title_el', 'url'],
-    'conditions': ['conditions_type', 'conditions_name', 'conditions_url'],
-    'evidences': ['evidence_type_el', 'evidence_description', 'evidence_note'],
-    'rules': ['rule_type', 'rule_description', 'rule_url'],
-    'steps': ['step_title', 'step_description', 'step_note'],
-    'digital_steps': ['step_digital_title', 'step_digital_implementation', 'step_digital_url'],
-    'useful_links': ['useful_link_title', 'useful_link_url'],
-    'provision_digital_locations': ['provision_digital_location_title', 'provision_digital_location_url']
-}
-
-# Combine textual data per service_id
-def prepare_combined_text(dataframes, columns_to_embed):
-    combined_text_per_service = {}
-
-    for service_id in dataframes['services']['service_id'].unique():
-        texts = []
-        for table, cols in columns_to_embed.items():
-            df = dataframes[table]
-            relevant_rows = df[df['service_id'] == service_id]
-            for _, row in relevant_rows.iterrows():
-                row_text = " | ".join(row[col] for col in cols if pd.notnull(row[col]))
-                texts.append(row_text)
-        combined_text_per_service[service_id] = " ".join(texts)
-
-    return combined_text_per_service
+_dataframes = None
+_collection = None
+_init_lock = threading.Lock()
+
+def load_dataframes():
+    """
+    Loads the MITOS tables on first use only; the chat app never needs them. Only the
+    columns_to_embed are read, and unchanged CSVs come memory-mapped from the cache.
+    """
+    global _dataframes
+    with _init_lock:
+        if _dataframes is None:
+            with startup_step("load MITOS dataframes"):
+                _dataframes, stats = load_tables()
+            print(f"📂 MITOS tables from {DATA_DIR}: {len(stats['cached'])} cached, "
+                  f"{len(stats['parsed'])} parsed ({', '.join(stats['parsed']) or '-'}).")
+        return _dataframes
+
+# Chroma embedding function backed by the shared embedding cache
+class CachedOpenAIEmbeddingFunction(EmbeddingFunction):
+    def __init__(self, model_name=EMBEDDING_MODEL):
+        self.model_name = model_name
+
+    def __call__(self, input):
+        return embed_texts(list(input), model=self.model_name)
 
 # ChromaDB client and embedding function
 def init_chroma_collection():
     client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-    openai_ef = embedding_functions.OpenAIEmbeddingFunction(
-        api_key=openai_api_key,
-        model_name="text-embedding-ada-002"
-    )
     collection = client.get_or_create_collection(
         name="mitos_simple_rag",
-        embedding_function=openai_ef
+        embedding_function=CachedOpenAIEmbeddingFunction()
     )
     return collection
 
+def get_collection():
+    """The shared Chroma collection, opened once per process on first use."""
+    global _collection
+    with _init_lock:
+        if _collection is None:
+            with startup_step("init Chroma collection"):
+                _collection = init_chroma_collection()
+        return _collection
+
 # Text splitter
 text_splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=100)
 
+# Bulk ingestion settings
+INGEST_BATCH_SIZE = 256        # chunks per embedding request and per upsert
+INGEST_MAX_WORKERS = 4         # concurrent embedding requests
+INGEST_CHECKPOINT_PATH = os.path.join(CHROMA_DB_PATH, "ingest_checkpoint.json")
+
+def _load_checkpoint(path):
+    """Returns {service_id: text hash} of the catalogue that was last fully ingested."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _save_checkpoint(path, checkpoint):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+def _canonical_chunks(df_embeddings):
+    """
+    Splits every service text and merges identical / near-identical chunks (chunk_dedup), so
+    shared boilerplate is embedded and stored once. Returns [(id, text, metadata)] and the
+    dedup stats; the id is derived from the text, and service_ids lists every service that
+    produced the chunk (comma-joined: Chroma metadata values are scalars).
+    """
+    pairs = ((service_id, chunk)
+             for service_id, text in zip(df_embeddings['service_id'], df_embeddings['text'])
+             for chunk in text_splitter.split_text(text))
+    canonical, stats = dedup_chunks(pairs)
+    print(f"🧬 Dedup: {stats['chunks']} chunks → {stats['canonical']} canonical, {stats['ratio']:.1%} removed "
+          f"({stats['exact']} exact, {stats['near']} near duplicates).")
+    chunks = []
+    for entry in canonical:
+        text_hash = content_hash(entry["text"])
+        chunks.append((f"chunk_{text_hash[:32]}", entry["text"], {
+            "service_id": entry["service_ids"][0],
+            "service_ids": ",".join(str(s) for s in entry["service_ids"]),
+            "members": entry["members"],
+            "content_hash": text_hash,
+        }))
+    return chunks, stats
+
+def _embed_batch(batch, collection):
+    """Embeds the chunks Chroma does not hold yet; stored chunks whose services changed are only re-tagged."""
+    stored = collection.get(ids=[doc_id for doc_id, _, _ in batch], include=["metadatas"])
+    stored = {doc_id: meta or {} for doc_id, meta in zip(stored["ids"], stored["metadatas"])}
+    pending = [c for c in batch if stored.get(c[0], {}).get("content_hash") != c[2]["content_hash"]]
+    retag = [c for c in batch if c[0] in stored and c not in pending and stored[c[0]] != c[2]]
+    embeddings = embed_texts([chunk for _, chunk, _ in pending]) if pending else []
+    return batch, pending, retag, embeddings
+
+def _write_batch(result, collection, stats):
+    batch, pending, retag, embeddings = result
+    if pending:
+        collection.upsert(
+            ids=[doc_id for doc_id, _, _ in pending],
+            documents=[chunk for _, chunk, _ in pending],
+            metadatas=[meta for _, _, meta in pending],
+            embeddings=embeddings
+        )
+    if retag:
+        collection.update(ids=[doc_id for doc_id, _, _ in retag], metadatas=[meta for _, _, meta in retag])
+
+    stats["upserted"] += len(pending)
+    stats["retagged"] += len(retag)
+    stats["unchanged"] += len(batch) - len(pending) - len(retag)
+    print(f"🔄 Batch of {len(batch)} chunks: {len(pending)} upserted, {len(retag)} re-tagged.")
+
 # Insert data into ChromaDB
-def insert_embeddings(df_embeddings, collection):
-    for idx, row in df_embeddings.iterrows():
-        service_id = row['service_id']
-        text = row['text']
-        chunks = text_splitter.split_text(text)
-        for i, chunk in enumerate(chunks):
-            doc_id = f"{service_id}_chunk_{i}"
-            # Avoid duplicate insertion
-            try:
-                collection.add(
-                    documents=[chunk],
-                    ids=[doc_id],
-                    metadatas=[{"service_id": service_id}]
-                )
-            except Exception as e:
-                print(f"Skipping duplicate or error for doc_id {doc_id}: {e}")
+def insert_embeddings(df_embeddings, collection, batch_size=INGEST_BATCH_SIZE,
+                      max_workers=INGEST_MAX_WORKERS, checkpoint_path=INGEST_CHECKPOINT_PATH):
+    """
+    Bulk, resumable ingestion of the deduplicated chunks: embedded in batches on a bounded
+    worker pool and written with one upsert per batch. Chunk ids come from the text, so a
+    chunk that is already stored is never re-embedded and an interrupted run resumes where
+    it stopped. Chunks no longer produced by any service are deleted at the end, and an
+    unchanged catalogue (checkpoint of the service text hashes) is skipped altogether.
+    Returns the dedup stats, or None when nothing changed.
+    """
+    checkpoint = _load_checkpoint(checkpoint_path)
+    current = {str(service_id): content_hash(text)
+               for service_id, text in zip(df_embeddings['service_id'], df_embeddings['text'])}
+    if current == checkpoint:
+        print("⏭️ Catalogue unchanged since the last run.")
+        return None
+    changed = sum(1 for service_id, text_hash in current.items() if checkpoint.get(service_id) != text_hash)
+    print(f"🔁 {changed} services new or changed since the last run.")
+
+    chunks, dedup_stats = _canonical_chunks(df_embeddings)
+    stats = {"upserted": 0, "retagged": 0, "unchanged": 0}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # At most 2 * max_workers batches in flight, written back in submission order
+        in_flight = deque()
+        for i in range(0, len(chunks), batch_size):
+            in_flight.append(executor.submit(_embed_batch, chunks[i:i + batch_size], collection))
+            if len(in_flight) >= 2 * max_workers:
+                _write_batch(in_flight.popleft().result(), collection, stats)
+        while in_flight:
+            _write_batch(in_flight.popleft().result(), collection, stats)
+
+    # Chunks no longer produced by any service, including the per-service chunk ids of older runs
+    wanted = {doc_id for doc_id, _, _ in chunks}
+    stale = [doc_id for doc_id in collection.get(include=[])["ids"] if doc_id not in wanted]
+    for i in range(0, len(stale), batch_size):
+        collection.delete(ids=stale[i:i + batch_size])
+    _save_checkpoint(checkpoint_path, current)
+
+    print(f"📥 Upserted {stats['upserted']} chunks, re-tagged {stats['retagged']}, skipped "
+          f"{stats['unchanged']} unchanged, deleted {len(stale)} stale.")
+    if stats["upserted"] or stats["retagged"] or stale:
+        invalidate_answer_cache()
+    return dedup_stats
 
 # Query function
-def simple_rag_query(query, collection, top_k=5):
-    results = collection.query(
-        query_texts=[query],
-        n_results=top_k
-    )
+@traced("chroma.query")
+def simple_rag_query(query, collection, top_k=5, query_embedding=None):
+    # A precomputed query vector avoids embedding the same text again inside Chroma
+    if query_embedding is not None:
+        results = collection.query(
+            query_embeddings=[query_embedding],
+            n_results=top_k
+        )
+    else:
+        results = collection.query(
+            query_texts=[query],
+            n_results=top_k
+        )
     return results['documents'][0]
 
 # Main execution
@@ -108,17 +209,18 @@ if __name__ == "__main__":
     try:
         print("⏳ Starting data preparation and embedding...")
         
-        combined_text_per_service = prepare_combined_text(dataframes, columns_to_embed)
+        service_ids, texts = [], []
+        for chunk in iter_service_texts(load_dataframes()):
+            service_ids.extend(chunk.keys())
+            texts.extend(chunk.values())
 
-        df_embeddings = pd.DataFrame({
-            'service_id': list(combined_text_per_service.keys()),
-            'text': list(combined_text_per_service.values())
-        })
+        df_embeddings = pd.DataFrame({'service_id': service_ids, 'text': texts})
 
-        collection = init_chroma_collection()
+        collection = get_collection()
 
         insert_embeddings(df_embeddings, collection)
         print("✅ Embeddings successfully stored in ChromaDB.")
+        print(f"📊 Embedding cache: {cache_stats()}")
 
         # Test a query explicitly
         user_query = "Πώς μπορώ να εκδώσω πιστοποιητικό γέννησης;"
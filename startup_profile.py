@@ -0,0 +1,41 @@
+# startup_profile.py
+
+import threading
+import time
+from contextlib import contextmanager
+
+_steps = {}
+_lock = threading.Lock()
+
+
+@contextmanager
+def startup_step(name):
+    """
+    Χρονομετρεί ένα βήμα εκκίνησης (import ή αρχικοποίηση πόρου). Κρατά τον χρόνο της πρώτης
+    εκτέλεσης (cold) και της τελευταίας, ώστε να φαίνεται τι κοστίζει ένα rerun του Streamlit.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            step = _steps.setdefault(name, {"step": name, "cold_s": elapsed, "count": 0})
+            step["last_s"] = elapsed
+            step["count"] += 1
+
+
+def startup_report() -> list[dict]:
+    """Τα βήματα με τη σειρά που εκτελέστηκαν για πρώτη φορά."""
+    with _lock:
+        return [dict(step) for step in _steps.values()]
+
+
+def format_startup_report() -> str:
+    rows = startup_report()
+    lines = [f"{'step':<34} {'cold':>9} {'last':>9} {'runs':>5}"]
+    for row in rows:
+        lines.append(f"{row['step']:<34} {row['cold_s'] * 1000:7.1f}ms {row['last_s'] * 1000:7.1f}ms {row['count']:>5}")
+    total = sum(row["cold_s"] for row in rows)
+    lines.append(f"{'total (cold)':<34} {total * 1000:7.1f}ms")
+    return "\n".join(lines)
@@ -0,0 +1,72 @@
+# tests/test_expand_pagination.py
+#
+# Pages of the budgeted expansion must partition one fixed order of triples, against the
+# FakeNeo4j stand-in over a synthetic MITOS-shaped graph.
+
+import pytest
+
+import graph_replica
+import neo4j_connector
+import query_neo4j
+from benchmarks.fakes import FakeNeo4j, SyntheticGraph
+
+
+@pytest.fixture(scope="module", autouse=True)
+def fake_neo4j():
+    previous = neo4j_connector._connector, query_neo4j.GRAPH_BACKEND
+    neo4j_connector._connector = FakeNeo4j(SyntheticGraph(services=300))
+    query_neo4j.GRAPH_BACKEND = "neo4j"
+    yield neo4j_connector._connector
+    neo4j_connector._connector, query_neo4j.GRAPH_BACKEND = previous
+
+
+def _key(triple):
+    return triple["node_1"], triple["relationship"], triple["node_2"]
+
+
+def _seeds(count):
+    return query_neo4j.find_seeds("Έκδοση", lookup="contains", limit=count)
+
+
+@pytest.mark.parametrize("seed_count, budget", [(2, 2), (3, 7), (20, 10)])
+def test_pages_partition_the_triples(seed_count, budget):
+    seeds = _seeds(seed_count)
+    assert len(seeds) == seed_count
+    pages = 6
+    triples = [t for page in range(pages)
+               for t in query_neo4j.expand_from_seeds(seeds, budget=budget, page=page)]
+    assert len(triples) == pages * budget
+    assert len({_key(t) for t in triples}) == pages * budget
+
+
+def test_pages_match_one_large_page():
+    seeds = _seeds(3)
+    pages = [query_neo4j.expand_from_seeds(seeds, budget=5, page=page) for page in range(4)]
+    whole = query_neo4j.expand_from_seeds(seeds, budget=20)
+    assert sorted(_key(t) for page in pages for t in page) == sorted(_key(t) for t in whole)
+
+
+def test_every_seed_is_reached_on_the_first_page():
+    seeds = _seeds(4)
+    page = query_neo4j.expand_from_seeds(seeds, budget=8)
+    assert {s["name"] for s in seeds} <= {name for t in page for name in (t["node_1"], t["node_2"])}
+
+
+def test_batched_variant_pages_like_the_single_one():
+    seed_lists = {"a": _seeds(2), "b": _seeds(5)}
+    for page in range(3):
+        batched = query_neo4j.expand_from_seeds_many(seed_lists, budget=6, page=page)
+        for key, seeds in seed_lists.items():
+            assert batched[key] == query_neo4j.expand_from_seeds(seeds, budget=6, page=page)
+
+
+def test_replica_seeds_expand_after_falling_back_to_neo4j(tmp_path, monkeypatch):
+    monkeypatch.setattr(graph_replica, "GRAPH_REPLICA_DIR", str(tmp_path))
+    monkeypatch.setattr(graph_replica, "_replica", None)
+    graph_replica.export_graph_replica()
+    monkeypatch.setattr(query_neo4j, "GRAPH_BACKEND", "replica")
+    seeds = _seeds(3)
+    assert all(isinstance(s["id"], int) for s in seeds)
+    from_replica = query_neo4j.expand_from_seeds(seeds, budget=10)
+    monkeypatch.setattr(query_neo4j, "GRAPH_BACKEND", "neo4j")
+    assert query_neo4j.expand_from_seeds(seeds, budget=10) == from_replica
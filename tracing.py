@@ -0,0 +1,248 @@
+# tracing.py
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Ένα JSON ανά ερώτημα (trace) με όλα τα spans του, π.χ. ./traces.jsonl· κενό (προεπιλογή) για
+# απενεργοποίηση. Το αρχείο μόνο μεγαλώνει: η εναλλαγή του (logrotate κ.λπ.) είναι εκτός εφαρμογής.
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH", "")
+# Θύρα του endpoint /metrics (Prometheus)· κενό για απενεργοποίηση
+METRICS_PORT = os.getenv("METRICS_PORT", "")
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Trace:
+    """Τα spans ενός ερωτήματος. Τα spans από τα νήματα των retrievers προστίθενται με κλείδωμα."""
+
+    def __init__(self, name, **attrs):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.total_ms = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def breakdown(self):
+        """Τα spans ως δέντρο (κάθε span ακολουθείται από τα παιδιά του), με σειρά έναρξης."""
+        with self._lock:
+            spans = sorted((dict(s) for s in self.spans), key=lambda s: s["start_ms"])
+        ids = {s["span_id"] for s in spans}
+        children = {}
+        for s in spans:
+            children.setdefault(s["parent"] if s["parent"] in ids else None, []).append(s)
+        ordered, stack = [], list(reversed(children.get(None, [])))
+        while stack:
+            s = stack.pop()
+            ordered.append(s)
+            stack.extend(reversed(children.get(s["span_id"], [])))
+        return ordered
+
+    def to_dict(self):
+        return {"trace_id": self.trace_id, "name": self.name, "attrs": self.attrs,
+                "timestamp": time.time(), "total_ms": self.total_ms, "spans": self.breakdown()}
+
+
+class _Metrics:
+    """Συγκεντρωτικά ανά στάδιο για όλη τη διεργασία: ιστόγραμμα διάρκειας, γραμμές, σφάλματα, tokens."""
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def observe(self, span):
+        seconds = span["duration_ms"] / 1000
+        with self._lock:
+            stage = self._stages.setdefault(span["stage"], {
+                "count": 0, "sum": 0.0, "buckets": [0] * len(DURATION_BUCKETS),
+                "rows": 0, "errors": 0, "prompt_tokens": 0})
+            stage["count"] += 1
+            stage["sum"] += seconds
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    stage["buckets"][i] += 1
+            stage["rows"] += span.get("rows") or 0
+            stage["prompt_tokens"] += span.get("prompt_tokens") or 0
+            stage["errors"] += 1 if span.get("error") else 0
+
+    def render(self):
+        """Τα metrics σε μορφή κειμένου Prometheus (exposition format 0.0.4)."""
+        with self._lock:
+            stages = {name: dict(stage, buckets=list(stage["buckets"])) for name, stage in self._stages.items()}
+        lines = [
+            "# HELP mitos_stage_duration_seconds Duration of query pipeline stages.",
+            "# TYPE mitos_stage_duration_seconds histogram",
+        ]
+        for name, stage in sorted(stages.items()):
+            for bound, count in zip(DURATION_BUCKETS, stage["buckets"]):
+                lines.append(f'mitos_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'mitos_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {stage["count"]}')
+            lines.append(f'mitos_stage_duration_seconds_sum{{stage="{name}"}} {stage["sum"]:.6f}')
+            lines.append(f'mitos_stage_duration_seconds_count{{stage="{name}"}} {stage["count"]}')
+        for metric, key, help_text in (
+            ("mitos_stage_rows_total", "rows", "Rows returned by query pipeline stages."),
+            ("mitos_stage_errors_total", "errors", "Failed or timed-out query pipeline stages."),
+            ("mitos_prompt_tokens_total", "prompt_tokens", "Prompt tokens sent to the LLM."),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, stage in sorted(stages.items()):
+                lines.append(f'{metric}{{stage="{name}"}} {stage[key]}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = _Metrics()
+
+
+@contextmanager
+def span(stage, **attrs):
+    """
+    Χρονομετρεί ένα στάδιο. Ο κώδικας μέσα στο block μπορεί να συμπληρώσει πεδία στο span
+    (π.χ. s["rows"], s["prompt_tokens"]). Καταγράφεται πάντα στα metrics και, όταν υπάρχει
+    ενεργό trace, και στο trace του ερωτήματος.
+    """
+    trace = _current_trace.get()
+    record = _new_record(stage, attrs)
+    token = _current_span.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish(record, start, trace)
+
+
+def _new_record(stage, attrs):
+    parent = _current_span.get()
+    return {"stage": stage, "span_id": uuid.uuid4().hex[:8],
+            "parent": parent["span_id"] if parent else None,
+            "depth": parent["depth"] + 1 if parent else 0,
+            "thread": threading.current_thread().name, **attrs}
+
+
+def _finish(record, start, trace):
+    record["duration_ms"] = (time.perf_counter() - start) * 1000
+    if trace is not None:
+        record["start_ms"] = (start - trace.start) * 1000
+        trace.add(record)
+    metrics.observe(record)
+
+
+def traced(stage):
+    """Decorator: span γύρω από τη συνάρτηση· για αποτέλεσμα-λίστα καταγράφεται και το πλήθος γραμμών."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage) as s:
+                result = fn(*args, **kwargs)
+                if isinstance(result, list):
+                    s["rows"] = len(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def record_span(stage, start, **attrs):
+    """
+    Καταγράφει ένα στάδιο που ξεκίνησε στο start (time.perf_counter) και τελειώνει τώρα, χωρίς
+    context manager· για generators (streaming) και για retrievers που έληξαν σε άλλο νήμα.
+    """
+    record = _new_record(stage, attrs)
+    _finish(record, start, _current_trace.get())
+    return record
+
+
+@contextmanager
+def start_trace(name, **attrs):
+    """Ανοίγει το trace ενός ερωτήματος· στο τέλος γράφεται ως μία γραμμή JSON στο TRACE_LOG_PATH."""
+    trace = Trace(name, **attrs)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        trace.total_ms = (time.perf_counter() - trace.start) * 1000
+        _write_trace(trace)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def propagate(fn):
+    """Τυλίγει το fn ώστε να τρέξει σε άλλο νήμα με το τρέχον trace (για ThreadPoolExecutor.submit)."""
+    context = contextvars.copy_context()
+    return functools.partial(context.run, fn)
+
+
+_log_lock = threading.Lock()
+
+
+def _write_trace(trace):
+    if not TRACE_LOG_PATH:
+        return
+    line = json.dumps(trace.to_dict(), ensure_ascii=False, default=str)
+    try:
+        with _log_lock, open(TRACE_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not write trace log: {e}")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_metrics_server = None
+_metrics_lock = threading.Lock()
+
+
+def start_metrics_server(port=None):
+    """Ξεκινά (μία φορά ανά διεργασία) το endpoint /metrics σε νήμα παρασκηνίου."""
+    global _metrics_server
+    port = int(port or METRICS_PORT or 0)
+    if not port:
+        return None
+    with _metrics_lock:
+        if _metrics_server is None:
+            try:
+                _metrics_server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            except OSError as e:
+                print(f"⚠️ Metrics endpoint not started on port {port}: {e}")
+                return None
+            threading.Thread(target=_metrics_server.serve_forever, name="metrics", daemon=True).start()
+            print(f"📈 Prometheus metrics on http://0.0.0.0:{port}/metrics")
+        return _metrics_server
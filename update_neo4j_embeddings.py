@@ -1,61 +1,256 @@
-import openai
+import hashlib
+import os
+import random
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from neo4j_connector import neo4j_db
-import os
+from embedding_cache import embed_texts, cache_stats, normalize_text, EMBEDDING_MODEL
+from embedding_codec import EMBEDDING_STORAGE, STORAGE_FORMATS, bytes_per_vector, encode_int8
+from context_builder import count_tokens
+from answer_cache import invalidate_answer_cache
+from graph_cache import bump_graph_version
+from name_index import ensure_name_indexes, update_name_norm
 from dotenv import load_dotenv
 
 load_dotenv()
 
-import openai
-openai.api_key = os.getenv("OPENAI_API_KEY")
-
 BATCH_SIZE = 100  # Προσαρμόστε ανάλογα με την απόδοση
+EMBED_MAX_WORKERS = int(os.getenv("EMBED_MAX_WORKERS", "4"))
+# Όρια του λογαριασμού OpenAI για το μοντέλο embeddings (ανά λεπτό)
+EMBED_REQUESTS_PER_MINUTE = float(os.getenv("EMBED_REQUESTS_PER_MINUTE", "3000"))
+EMBED_TOKENS_PER_MINUTE = float(os.getenv("EMBED_TOKENS_PER_MINUTE", "1000000"))
+EMBED_MAX_RETRIES = 5
+EMBED_BACKOFF_SECONDS = 1.0
+EMBED_MAX_BACKOFF_SECONDS = 60.0
+
+
+def embedding_hash(name, model=EMBEDDING_MODEL):
+    """Το hash που αποθηκεύεται στον κόμβο μαζί με το embedding: αλλάζει όταν αλλάζει το όνομα ή το μοντέλο."""
+    return hashlib.sha256(f"{model}\n{normalize_text(name)}".encode("utf-8")).hexdigest()
+
+
+class TokenBucket:
+    """Token bucket: γεμίζει με `rate` μονάδες ανά δευτερόλεπτο έως `capacity`· το acquire περιμένει."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1.0):
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_request_bucket = TokenBucket(EMBED_REQUESTS_PER_MINUTE / 60, max(1.0, EMBED_REQUESTS_PER_MINUTE / 60))
+_token_bucket = TokenBucket(EMBED_TOKENS_PER_MINUTE / 60, EMBED_TOKENS_PER_MINUTE / 60)
+
+
 def get_embeddings(texts):
-    try:
-        response = openai.Embedding.create(input=texts, model="text-embedding-ada-002")
-        return [item["embedding"] for item in response["data"]]
-    except Exception as e:
-        print(f"❌ OpenAI API error: {e}")
-        return [None] * len(texts)
+    """
+    Embeddings για τα κείμενα μέσα στα όρια ρυθμού, με επανάληψη και εκθετικό backoff.
+    Αν αποτύχουν όλες οι προσπάθειες η εξαίρεση περνά στον καλούντα.
+    """
+    for attempt in range(EMBED_MAX_RETRIES + 1):
+        _request_bucket.acquire()
+        _token_bucket.acquire(sum(count_tokens(t) for t in texts))
+        try:
+            return embed_texts(texts)
+        except Exception as e:
+            if attempt == EMBED_MAX_RETRIES:
+                raise
+            delay = min(EMBED_MAX_BACKOFF_SECONDS, EMBED_BACKOFF_SECONDS * 2 ** attempt)
+            delay *= random.uniform(0.5, 1.0)
+            print(f"⚠️ OpenAI API error ({e}), retry {attempt + 1}/{EMBED_MAX_RETRIES} in {delay:.1f}s")
+            time.sleep(delay)
 
 
-def update_embeddings_in_bulk():
-    """Ενημερώνει τους κόμβους που δεν έχουν embeddings σε παρτίδες."""
-    cypher_query = "MATCH (n) WHERE n.embedding IS NULL RETURN n.name AS name, ID(n) AS id"
-    nodes = neo4j_db.query(cypher_query)
+def find_stale_nodes(storage=EMBEDDING_STORAGE):
+    """
+    Διατρέχει τους κόμβους με όνομα και κρατά όσους δεν έχουν embedding ή το αποθηκευμένο
+    embedding_hash διαφέρει από το τρέχον όνομα. Επιστρέφει {hash: (κείμενο, [(elementId, όνομα)])},
+    ώστε κάθε διαφορετικό όνομα να γίνει embed μία φορά, και τους κόμβους που έχουν ήδη σωστό
+    embedding σε άλλη μορφή αποθήκευσης (float64 / float32), που απλώς ξαναγράφονται.
+    """
+    stale, reencode = {}, []
+    scanned = 0
+    records = neo4j_db.stream(
+        "MATCH (n) WHERE n.name IS NOT NULL "
+        "RETURN elementId(n) AS id, n.name AS name, n.embedding_hash AS hash, "
+        "coalesce(n.embedding_storage, CASE WHEN n.embedding IS NOT NULL THEN 'float64' END) AS storage"
+    )
+    for record in records:
+        scanned += 1
+        current = embedding_hash(record["name"])
+        # An int8 vector is not re-encoded into a wider format: that would keep the quantization error
+        if record["storage"] is None or record["hash"] != current or (
+                record["storage"] != storage and record["storage"] == "int8"):
+            entry = stale.setdefault(current, (normalize_text(record["name"]), []))
+            entry[1].append((record["id"], record["name"]))
+        elif record["storage"] != storage:
+            reencode.append((record["id"], record["name"], current))
+    print(f"🔍 {scanned} nodes scanned, {sum(len(n) for _, n in stale.values())} need embeddings "
+          f"({len(stale)} distinct names), {len(reencode)} need conversion to {storage}.")
+    return stale, reencode
 
-    if not nodes:
-        print("✅ Όλοι οι κόμβοι έχουν ήδη embeddings.")
-        return
 
-    # Διαχωρίζουμε τους κόμβους σε παρτίδες
-    node_batches = [nodes[i:i+BATCH_SIZE] for i in range(0, len(nodes), BATCH_SIZE)]
+def _write_query(storage):
+    """Το UNWIND που γράφει embedding + hash στη ζητούμενη μορφή αποθήκευσης."""
+    if storage not in STORAGE_FORMATS:
+        raise ValueError(f"Unsupported embedding storage: {storage}")
+    write_vector = {
+        "float64": "SET n.embedding = upd.embedding REMOVE n.embedding_q",
+        # Stored as a float32 array; still served by the Neo4j vector_index
+        "float32": "CALL db.create.setNodeVectorProperty(n, 'embedding', upd.embedding) REMOVE n.embedding_q",
+        # Not indexable by Neo4j: search it through the exported local index (VECTOR_BACKEND=local)
+        "int8": "SET n.embedding_q = upd.embedding_q REMOVE n.embedding",
+    }[storage]
+    # Ο έλεγχος ονόματος αφήνει εκτός όσους κόμβους μετονομάστηκαν κατά τη διάρκεια της εκτέλεσης
+    return f"""
+    UNWIND $updates AS upd
+    MATCH (n) WHERE elementId(n) = upd.id AND n.name = upd.name
+    {write_vector}
+    SET n.embedding_hash = upd.hash, n.embedding_storage = '{storage}', n:Node
+    """
+
+
+def _update_rows(nodes, embedding, text_hash, storage):
+    if storage == "int8":
+        vector = {"embedding_q": encode_int8(embedding)}
+    else:
+        vector = {"embedding": embedding}
+    return [{"id": node_id, "name": name, "hash": text_hash, **vector} for node_id, name in nodes]
+
 
-    for batch in node_batches:
-        names = [node["name"] for node in batch]
-        ids = [node["id"] for node in batch]
+def reencode_embeddings(nodes, storage=EMBEDDING_STORAGE, batch_size=1000):
+    """Ξαναγράφει υπάρχοντα embeddings στη νέα μορφή αποθήκευσης, χωρίς κλήσεις στο OpenAI."""
+    converted = 0
+    for i in range(0, len(nodes), batch_size):
+        batch = {node_id: (name, text_hash) for node_id, name, text_hash in nodes[i:i + batch_size]}
+        records = neo4j_db.read(
+            "UNWIND $ids AS id MATCH (n) WHERE elementId(n) = id AND n.embedding IS NOT NULL "
+            "RETURN id, n.embedding AS embedding",
+            {"ids": list(batch)},
+        )
+        updates = [row for record in records
+                   for row in _update_rows([(record["id"], batch[record["id"]][0])], record["embedding"],
+                                           batch[record["id"]][1], storage)]
+        neo4j_db.write_batch(_write_query(storage), updates, parameter="updates")
+        converted += len(updates)
+    print(f"🔁 {converted} embeddings converted to {storage}.")
+    return converted
 
-        print(f"🔄 Επεξεργασία παρτίδας {len(names)} κόμβων...")
-        embeddings = get_embeddings(names)
 
-        # Ετοιμάζουμε τη λίστα των updates
-        updates = []
-        for i, embedding in enumerate(embeddings):
-            if embedding:
-                updates.append({"id": ids[i], "embedding": embedding})
+def adopt_existing_embeddings():
+    """
+    Σφραγίζει με embedding_hash τους κόμβους που έχουν ήδη embedding από παλαιότερη εκτέλεση,
+    ώστε η πρώτη σταδιακή ενημέρωση να μην τα ξαναϋπολογίσει. Υποθέτει ότι τα υπάρχοντα
+    embeddings αντιστοιχούν στα τρέχοντα ονόματα.
+    """
+    rows = [
+        {"id": r["id"], "name": r["name"], "hash": embedding_hash(r["name"])}
+        for r in neo4j_db.stream(
+            "MATCH (n) WHERE n.name IS NOT NULL AND n.embedding IS NOT NULL AND n.embedding_hash IS NULL "
+            "RETURN elementId(n) AS id, n.name AS name"
+        )
+    ]
+    neo4j_db.write_batch(
+        "UNWIND $rows AS row MATCH (n) WHERE elementId(n) = row.id AND n.name = row.name "
+        "SET n.embedding_hash = row.hash",
+        rows,
+    )
+    print(f"🏷️ {len(rows)} existing embeddings stamped with their name hash.")
 
-        if updates:
-            update_query = """
-            UNWIND $updates as upd
-            MATCH (n) WHERE ID(n) = upd.id
-            SET n.embedding = upd.embedding, n:Node
-            """
-            neo4j_db.query(update_query, {"updates": updates})
-            print(f"✅ Ενημερώθηκαν {len(updates)} embeddings.")
 
-        time.sleep(1)  # Μικρή παύση για να αποφευχθούν τα rate limits
+def _embed_batch(batch):
+    try:
+        return batch, get_embeddings([text for _, (text, _) in batch]), None
+    except Exception as e:
+        return batch, None, e
 
-    print("🎯 Όλα τα missing embeddings ενημερώθηκαν στη Neo4j!")
+
+def _write_batch(result, stats, storage):
+    batch, embeddings, error = result
+    if error is not None:
+        # Οι κόμβοι μένουν με το παλιό hash και ξαναδοκιμάζονται στην επόμενη εκτέλεση
+        stats["failed"] += sum(len(nodes) for _, (_, nodes) in batch)
+        print(f"❌ Batch of {len(batch)} names failed after {EMBED_MAX_RETRIES} retries: {error}")
+        return
+
+    updates = [
+        row
+        for (text_hash, (_, nodes)), embedding in zip(batch, embeddings)
+        for row in _update_rows(nodes, embedding, text_hash, storage)
+    ]
+    neo4j_db.write_batch(_write_query(storage), updates, parameter="updates")
+    stats["updated"] += len(updates)
+    print(f"✅ Ενημερώθηκαν {len(updates)} embeddings ({len(batch)} διαφορετικά ονόματα).")
+
+
+def update_embeddings_in_bulk(batch_size=BATCH_SIZE, max_workers=EMBED_MAX_WORKERS, storage=EMBEDDING_STORAGE):
+    """
+    Σταδιακή ενημέρωση: υπολογίζει embeddings μόνο για νέους κόμβους ή κόμβους που άλλαξε το
+    όνομά τους, παράλληλα σε παρτίδες μέσα στα όρια ρυθμού του OpenAI. Κάθε παρτίδα γράφεται
+    μαζί με το embedding_hash, οπότε μια διακοπείσα εκτέλεση συνεχίζει από όπου σταμάτησε.
+    Τα embeddings αποθηκεύονται στη μορφή storage (βλ. embedding_codec.STORAGE_FORMATS).
+    """
+    if storage == "int8":
+        print("ℹ️ int8 embeddings are not indexed by Neo4j; export them with local_vector_index.py "
+              "and set VECTOR_BACKEND=local.")
+    stale, reencode = find_stale_nodes(storage)
+    converted = reencode_embeddings(reencode, storage) if reencode else 0
+    stale = list(stale.items())
+    if not stale:
+        print("✅ Όλοι οι κόμβοι έχουν ήδη ενημερωμένα embeddings.")
+        if converted:
+            invalidate_answer_cache()
+            bump_graph_version()
+        return
+
+    stats = {"updated": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # At most 2 * max_workers batches in flight, written back in submission order
+        in_flight = deque()
+        for i in range(0, len(stale), batch_size):
+            in_flight.append(executor.submit(_embed_batch, stale[i:i + batch_size]))
+            if len(in_flight) >= 2 * max_workers:
+                _write_batch(in_flight.popleft().result(), stats, storage)
+        while in_flight:
+            _write_batch(in_flight.popleft().result(), stats, storage)
+
+    print(f"🎯 {stats['updated']} embeddings ενημερώθηκαν στη Neo4j, {stats['failed']} απέτυχαν.")
+    if stats["updated"] or converted:
+        invalidate_answer_cache()
+        bump_graph_version()
+    print(f"📦 Storage {storage}: {bytes_per_vector(1536, storage)} bytes per ada-002 vector "
+          f"(float64 list: {bytes_per_vector(1536, 'float64')}).")
+    print(f"📊 Embedding cache: {cache_stats()}")
 
 if __name__ == '__main__':
-    update_embeddings_in_bulk()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Incremental embedding backfill for Neo4j nodes.")
+    parser.add_argument("--adopt-existing", action="store_true",
+                        help="stamp nodes that already have an embedding but no embedding_hash, instead of re-embedding them")
+    parser.add_argument("--storage", choices=STORAGE_FORMATS, default=EMBEDDING_STORAGE,
+                        help="how embeddings are stored on the nodes (default: EMBEDDING_STORAGE)")
+    args = parser.parse_args()
+    # Same pass over new / renamed nodes: keep the normalized names used for seed lookup current
+    ensure_name_indexes()
+    update_name_norm()
+    if args.adopt_existing:
+        adopt_existing_embeddings()
+    update_embeddings_in_bulk(storage=args.storage)